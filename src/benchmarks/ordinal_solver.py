@@ -0,0 +1,103 @@
+"""Benchmark the Newton ordinal logit solver against statsmodels' BFGS fit.
+
+Both solvers fit the ordinal models of the three modeling scripts. For every
+model, the fit times and the largest differences in the estimates are
+reported.
+
+Copyright (C) 2025.
+"""
+
+import time
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+from statsmodels.miscmodels.ordinal_model import OrderedModel, OrderedResults
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.modeling import interaction_model, ordinal_logistic_regression
+from src.modeling.fit_cache import FIT_CACHE
+from src.modeling.ordinal_newton import fit_ordered_model
+
+REPEATS = 3
+
+
+def fit_bfgs(x: pd.DataFrame, y: pd.Series) -> OrderedResults:
+    """Fit the ordinal model the way the modeling scripts used to.
+
+    Returns:
+        OrderedResultsWrapper: the statsmodels results.
+
+    """
+    return OrderedModel(y, x, distr="logit").fit(method="bfgs", disp=False)
+
+
+def best_time(
+    fit: Callable[[pd.DataFrame, pd.Series], OrderedResults],
+    x: pd.DataFrame,
+    y: pd.Series,
+    repeats: int = REPEATS,
+) -> tuple[float, OrderedResults]:
+    """Time a fit, keeping the fastest of several runs.
+
+    Returns:
+        tuple[float, OrderedResults]: the fastest time in seconds and the results.
+
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fit(x, y)
+        times.append(time.perf_counter() - start)
+
+    return min(times), result
+
+
+def compare(x: pd.DataFrame, y: pd.Series, repeats: int = REPEATS) -> dict:
+    """Fit a model with both solvers and compare time and estimates.
+
+    Returns:
+        dict: the fit times, speedup and largest differences in the estimates.
+
+    """
+    bfgs_time, bfgs = best_time(fit_bfgs, x, y, repeats)
+    with FIT_CACHE.disabled():
+        newton_time, newton = best_time(fit_ordered_model, x, y, repeats)
+
+    return {
+        "rows": len(y),
+        "parameters": len(newton.params),
+        "bfgs_s": bfgs_time,
+        "newton_s": newton_time,
+        "speedup": bfgs_time / newton_time,
+        "max_abs_diff_params": float(np.max(np.abs(newton.params - bfgs.params))),
+        "max_rel_diff_bse": float(np.max(np.abs(newton.bse / bfgs.bse - 1))),
+        "diff_llf": newton.llf - bfgs.llf,
+        "diff_aic": newton.aic - bfgs.aic,
+        "diff_bic": newton.bic - bfgs.bic,
+    }
+
+
+def main() -> None:
+    """Benchmark both solvers on the ordinal models of the modeling scripts."""
+    df = load_cleaned_data()
+
+    x, y = ordinal_logistic_regression.prepare_for_ordinal_regression(df)
+    models = {
+        "ordinal": (x, y),
+        "hereditary": (x[["family_history_with_overweight"]], y),
+        "lifestyle": (x.drop(columns=["family_history_with_overweight"]), y),
+        "interaction": (
+            interaction_model.prepare_for_ordinal_regression_with_interactions(df)
+        ),
+    }
+
+    results = pd.DataFrame.from_dict(
+        {name: compare(x, y) for name, (x, y) in models.items()},
+        orient="index",
+    )
+    print(results.to_string(float_format="{:.3g}".format))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
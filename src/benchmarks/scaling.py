@@ -0,0 +1,419 @@
+"""Benchmark how every pipeline stage scales with the number of rows.
+
+For every dataset size, a raw file of that many rows is generated, by default
+with the synthetic data generator, and every stage is run on it: cleaning,
+loading, the contingency tables and chi-square test, the binary logit, the
+ordinal fits of the three modeling modules and the exploratory figures. Each
+stage is timed, and then run again under `tracemalloc` for its peak memory.
+The memory covers the allocations of Python and NumPy, but not the internal
+buffers of the CSV parser.
+
+Every run is appended to a JSON lines history file and compared with the
+previous run in it. A stage that became slower by more than the tolerance is
+reported as a regression, and the scaling exponent of every stage, the slope
+of log time against log rows, is estimated from the sizes of the run.
+
+Copyright (C) 2025.
+"""
+
+import argparse
+import dataclasses
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.columnar_cache import read_columnar_cache, read_manifest
+from src.data_preparation.prepare_data import (
+    RAW_DATA_PATH,
+    clean_data_in_chunks,
+    read_cleaned_csv,
+)
+from src.data_preparation.synthetic import write_synthetic
+from src.exploratory_analysis import contingency_heatmap, family_history, lifestyle
+from src.exploratory_analysis.cube import build_cube
+from src.exploratory_analysis.rendering import render
+from src.modeling import (
+    binary_logistic_regression,
+    compare_hereditary_lifestyle,
+    interaction_model,
+    ordinal_logistic_regression,
+)
+from src.modeling.chi_square import chi_square_test, contingency_table
+from src.modeling.fit_cache import FIT_CACHE
+
+SIZES = (2_111, 10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_SIZES = (2_111, 10_000, 100_000, 1_000_000)
+HISTORY_PATH = "results/benchmarks/scaling_history.jsonl"
+SEED = 0
+# Rows of the untimed first pass, which imports and warms up every stage
+WARM_UP_ROWS = 1_000
+WRITE_CHUNK_ROWS = 1_000_000
+# A stage regressed if it is this much slower than in the previous run...
+TOLERANCE = 0.2
+# ...and at least this many seconds slower, to ignore noise in fast stages
+MIN_SLOWDOWN_S = 0.05
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """The time and peak memory of a stage on a dataset size."""
+
+    stage: str
+    n_rows: int
+    seconds: float
+    peak_mb: float
+
+
+def resample_raw(
+    raw_path: str | Path,
+    out_path: str | Path,
+    n_rows: int,
+    seed: int = SEED,
+) -> None:
+    """Write a raw file of `n_rows` rows drawn with replacement from a raw file."""
+    with Path(raw_path).open() as f:
+        header, *rows = f.read().splitlines()
+    rng = np.random.default_rng(seed)
+
+    with Path(out_path).open("w") as f:
+        f.write(f"{header}\n")
+        for start in range(0, n_rows, WRITE_CHUNK_ROWS):
+            size = min(WRITE_CHUNK_ROWS, n_rows - start)
+            picks = rng.integers(len(rows), size=size)
+            f.write("\n".join(rows[i] for i in picks))
+            f.write("\n")
+
+
+def write_dataset(
+    out_path: str | Path,
+    n_rows: int,
+    seed: int = SEED,
+    source: str = "synthetic",
+) -> None:
+    """Write a raw dataset of `n_rows` rows for the benchmark.
+
+    The rows are either generated by the synthetic data generator, or drawn
+    from the rows of the raw dataset with `source="resample"`.
+    """
+    if source == "resample":
+        resample_raw(RAW_DATA_PATH, out_path, n_rows, seed)
+    else:
+        write_synthetic(out_path, n_rows, seed=seed)
+
+
+def _chi_square(state: dict) -> None:
+    """Run the chi-square tests of the family history and FAVC."""
+    df = state["df"]
+    contingency_table(df["family_history_with_overweight"], df["Obese_Binary"])
+    chi_square_test(df["family_history_with_overweight"], df["Obese_Binary"])
+    chi_square_test(df["FAVC"], df["Obese_Binary"])
+
+
+def _binary_logit(state: dict) -> None:
+    """Fit the binary logit model."""
+    module = binary_logistic_regression
+    module.run_binary_logistic_regression(
+        *module.prepare_for_binary_regression(state["df"]),
+    )
+
+
+def _ordinal_logit(state: dict) -> None:
+    """Fit the ordinal logit model."""
+    module = ordinal_logistic_regression
+    module.run_ordinal_logistic_regression(
+        *module.prepare_for_ordinal_regression(state["df"]),
+    )
+
+
+def _hereditary_lifestyle(state: dict) -> None:
+    """Compare the hereditary, lifestyle and combined ordinal models."""
+    x, y = compare_hereditary_lifestyle.prepare_for_ordinal_regression(state["df"])
+    hereditary = ["family_history_with_overweight"]
+    compare_hereditary_lifestyle.compare_nested_models(
+        x,
+        y,
+        {
+            "Hereditary": hereditary,
+            "Lifestyle": [c for c in x.columns if c not in hereditary],
+            "Combined": list(x.columns),
+        },
+        max_workers=1,
+    )
+
+
+def _interactions(state: dict) -> None:
+    """Fit the ordinal model with family history interactions."""
+    module = interaction_model
+    module.run_ordinal_logistic_regression(
+        *module.prepare_for_ordinal_regression_with_interactions(state["df"]),
+    )
+
+
+def _cube(state: dict) -> None:
+    """Build the aggregate cube of the exploratory figures."""
+    state["cube"] = build_cube(state["df"])
+
+
+def _stages(workdir: Path) -> dict[str, Callable[[dict], object]]:
+    """Define the benchmarked stages.
+
+    Every stage reads what it needs from a shared state and may add to it, so
+    the stages must run in order.
+
+    Returns:
+        dict[str, Callable[[dict], object]]: the stages by name.
+
+    """
+    raw_path = workdir / "raw.csv"
+    cleaned_path = workdir / "cleaned.csv"
+    cache_dir = workdir / "cache"
+    figure_dir = workdir / "figures"
+
+    def clean(_state: dict) -> None:
+        clean_data_in_chunks(raw_path, cleaned_path, cache_dir=cache_dir)
+
+    def read_csv(_state: dict) -> None:
+        read_cleaned_csv(cleaned_path)
+
+    def load_cache(state: dict) -> None:
+        state["df"] = read_columnar_cache(cache_dir, read_manifest(cache_dir))
+
+    def figures(state: dict) -> None:
+        specs = [
+            dataclasses.replace(spec, path=str(figure_dir / Path(spec.path).name))
+            for module in (family_history, lifestyle, contingency_heatmap)
+            for spec in module.figures(state["cube"])
+        ]
+        render(specs, max_workers=1, force=True)
+
+    return {
+        "clean_data": clean,
+        "read_cleaned_csv": read_csv,
+        "load_columnar_cache": load_cache,
+        "chi_square": _chi_square,
+        "binary_logit": _binary_logit,
+        "ordinal_logit": _ordinal_logit,
+        "compare_hereditary_lifestyle": _hereditary_lifestyle,
+        "interaction_model": _interactions,
+        "eda_cube": _cube,
+        "eda_figures": figures,
+    }
+
+
+def measure(
+    stage: str,
+    run: Callable[[dict], object],
+    state: dict,
+    n_rows: int,
+) -> Measurement:
+    """Time a stage, and then run it again to trace its peak memory.
+
+    Returns:
+        Measurement: the time and peak memory of the stage.
+
+    """
+    start = time.perf_counter()
+    run(state)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Measurement(stage, n_rows, seconds, peak / 2**20)
+
+
+def run_benchmark(
+    sizes: Sequence[int],
+    seed: int = SEED,
+    source: str = "synthetic",
+) -> list[Measurement]:
+    """Run every stage on datasets of every size.
+
+    Returns:
+        list[Measurement]: the measurements of every stage and size.
+
+    """
+    measurements = []
+    for i, n_rows in enumerate([WARM_UP_ROWS, *sizes]):
+        with tempfile.TemporaryDirectory() as tmp, FIT_CACHE.disabled():
+            workdir = Path(tmp)
+            write_dataset(workdir / "raw.csv", n_rows, seed, source)
+            state: dict = {}
+            for stage, run in _stages(workdir).items():
+                if i == 0:
+                    run(state)
+                    continue
+                measurement = measure(stage, run, state, n_rows)
+                measurements.append(measurement)
+                print(  # noqa: T201
+                    f"{n_rows:>10} {stage:<30} {measurement.seconds:9.3f} s "
+                    f"{measurement.peak_mb:9.1f} MB",
+                    flush=True,
+                )
+
+    return measurements
+
+
+def _git_commit() -> str | None:
+    """Get the current commit of the repository, if any.
+
+    Returns:
+        str | None: the commit hash.
+
+    """
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
+
+
+def read_history(path: str | Path) -> list[dict]:
+    """Read all runs of a history file.
+
+    Returns:
+        list[dict]: the runs, oldest first.
+
+    """
+    if not Path(path).exists():
+        return []
+
+    with Path(path).open() as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path: str | Path, measurements: Sequence[Measurement]) -> dict:
+    """Append a run to a history file.
+
+    Returns:
+        dict: the run.
+
+    """
+    run = {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "measurements": [dataclasses.asdict(m) for m in measurements],
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with Path(path).open("a") as f:
+        f.write(json.dumps(run) + "\n")
+
+    return run
+
+
+def compare_runs(current: dict, previous: dict | None) -> pd.DataFrame:
+    """Compare the times of the stages of two runs.
+
+    Returns:
+        pd.DataFrame: the time, previous time and ratio of every stage and
+            size, and whether it regressed.
+
+    """
+    table = pd.DataFrame(current["measurements"]).set_index(["stage", "n_rows"])
+    if previous is None:
+        table["previous_s"] = np.nan
+    else:
+        before = pd.DataFrame(previous["measurements"]).set_index(["stage", "n_rows"])
+        table["previous_s"] = before["seconds"]
+
+    table["ratio"] = table["seconds"] / table["previous_s"]
+    table["regression"] = (table["ratio"] > 1 + TOLERANCE) & (
+        table["seconds"] - table["previous_s"] > MIN_SLOWDOWN_S
+    )
+
+    return table
+
+
+def scaling_exponents(measurements: Sequence[Measurement]) -> pd.Series:
+    """Estimate how the time of every stage grows with the number of rows.
+
+    An exponent of 1 means the time grows linearly with the number of rows.
+
+    Returns:
+        pd.Series: the slope of log time against log rows of every stage.
+
+    """
+    table = pd.DataFrame([dataclasses.asdict(m) for m in measurements])
+    exponents = {}
+    for stage, group in table.groupby("stage", sort=False):
+        n_rows = group["n_rows"]
+        if (n_rows != n_rows.iloc[0]).any():
+            exponents[stage] = np.polyfit(
+                np.log(group["n_rows"]),
+                np.log(group["seconds"].clip(lower=1e-6)),
+                1,
+            )[0]
+
+    return pd.Series(exponents, name="exponent", dtype=np.float64)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the scaling benchmark and compare it with the previous run.
+
+    Raises:
+        SystemExit: if a stage regressed and `--fail-on-regression` is given.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(n) for n in s.split(",")],
+        default=list(DEFAULT_SIZES),
+        help=(
+            "comma-separated numbers of rows (default: "
+            f"{','.join(map(str, DEFAULT_SIZES))}; all sizes: "
+            f"{','.join(map(str, SIZES))})"
+        ),
+    )
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--source",
+        choices=["synthetic", "resample"],
+        default="synthetic",
+        help="generate synthetic rows or resample the raw rows (default: synthetic)",
+    )
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    previous_runs = read_history(args.history)
+    measurements = run_benchmark(args.sizes, args.seed, args.source)
+    run = append_history(args.history, measurements)
+    comparison = compare_runs(run, previous_runs[-1] if previous_runs else None)
+
+    print()  # noqa: T201
+    print(comparison.to_string(float_format="{:.3f}".format))  # noqa: T201
+    print()  # noqa: T201
+    print(scaling_exponents(measurements).to_string(float_format="{:.2f}".format))  # noqa: T201
+
+    regressions = comparison.index[comparison["regression"]].tolist()
+    for stage, n_rows in regressions:
+        print(f"Regression: {stage} on {n_rows} rows")  # noqa: T201
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
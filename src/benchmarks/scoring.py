@@ -0,0 +1,103 @@
+"""Benchmark scoring raw survey rows with exported models.
+
+The binary and ordinal models are exported and used to score a raw file made by
+repeating the rows of the raw dataset. For every model, the time to import and
+load the scorer in a fresh interpreter, the rows scored per second, and the
+largest difference from the probabilities of statsmodels' `predict` on the
+cleaned data are reported.
+
+Copyright (C) 2025.
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+
+from src.data_preparation.prepare_data import RAW_DATA_PATH, load_cleaned_data
+from src.modeling import binary_logistic_regression, ordinal_logistic_regression
+from src.modeling.scoring import Scorer, export_model
+
+N_ROWS = 1_000_000
+CHUNKSIZE = 100_000
+
+
+def repeat_rows(raw_path: str | Path, out_path: str | Path, n_rows: int) -> None:
+    """Write a raw file of `n_rows` rows by repeating the rows of a raw file."""
+    with Path(raw_path).open() as f:
+        header, *rows = f.read().splitlines()
+    repeated = (rows * (n_rows // len(rows) + 1))[:n_rows]
+    with Path(out_path).open("w") as f:
+        f.write("\n".join([header, *repeated, ""]))
+
+
+def cold_start_time(model_path: str | Path) -> float:
+    """Time importing the scorer and loading a model in a new interpreter.
+
+    Returns:
+        float: the time in seconds.
+
+    """
+    code = f"from src.modeling.scoring import Scorer; Scorer.load({str(model_path)!r})"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Export both models and benchmark scoring a large raw file."""
+    df = load_cleaned_data()
+    x_binary, y_binary = binary_logistic_regression.prepare_for_binary_regression(df)
+    x_ordinal, y_ordinal = ordinal_logistic_regression.prepare_for_ordinal_regression(
+        df,
+    )
+    binary = binary_logistic_regression.run_binary_logistic_regression(
+        x_binary,
+        y_binary,
+    )
+    ordinal = ordinal_logistic_regression.run_ordinal_logistic_regression(
+        x_ordinal,
+        y_ordinal,
+    )
+    reference = {
+        "binary": np.asarray(binary.predict(sm.add_constant(x_binary)))[:, None],
+        "ordinal": np.asarray(ordinal.predict(x_ordinal)),
+    }
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = Path(tmp) / "raw.csv"
+        repeat_rows(RAW_DATA_PATH, raw_path, N_ROWS)
+
+        for name, result in [("binary", binary), ("ordinal", ordinal)]:
+            model_path = Path(tmp) / f"{name}_model.json"
+            export_model(result, model_path)
+            scorer = Scorer.load(model_path)
+
+            prob = np.vstack(list(scorer.score_csv(RAW_DATA_PATH)))
+            if name == "binary":
+                prob = prob[:, 1:]
+
+            start = time.perf_counter()
+            n_rows = sum(len(p) for p in scorer.score_csv(raw_path, CHUNKSIZE))
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                "cold_start_s": cold_start_time(model_path),
+                "rows": n_rows,
+                "score_s": elapsed,
+                "rows_per_s": n_rows / elapsed,
+                "max_abs_diff_prob": float(np.max(np.abs(prob - reference[name]))),
+            }
+
+    table = pd.DataFrame.from_dict(results, orient="index")
+    print(table.to_string(float_format="{:.3g}".format))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
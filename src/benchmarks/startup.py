@@ -0,0 +1,130 @@
+"""Benchmark the startup time of the command line interface.
+
+Every measurement runs in a fresh interpreter, so nothing is imported in
+advance. Reported are the time of `sda --help`, the heavy libraries it loads,
+which should be none, and the time to import every analysis module. The
+benchmark exits with status 1 if `sda --help` loads a heavy library or is over
+the budget, or if a figure module imports seaborn before it draws.
+
+Copyright (C) 2025.
+"""
+
+import subprocess
+import sys
+import time
+
+from src.cli import ANALYSES
+
+REPEATS = 5
+HELP_BUDGET_S = 0.3
+HEAVY_MODULES = ("pandas", "scipy", "statsmodels", "matplotlib", "seaborn")
+
+
+def best_time(code: str, repeats: int = REPEATS) -> float:
+    """Time running code in a new interpreter, taking the best of some runs.
+
+    Returns:
+        float: the time in seconds.
+
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(  # noqa: S603
+            [sys.executable, "-c", code],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def loaded_heavy_modules(code: str) -> list[str]:
+    """Find the heavy libraries that are imported by running code.
+
+    Returns:
+        list[str]: the names of the heavy libraries.
+
+    """
+    check = (
+        f"{code}\n"
+        "import sys\n"
+        "loaded = {name.split('.')[0] for name in sys.modules}\n"
+        f"print(*sorted(loaded.intersection({HEAVY_MODULES!r})))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", check],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    return result.stdout.split()
+
+
+HELP_CODE = (
+    "import contextlib, io\n"
+    "from src.cli import main\n"
+    "with contextlib.suppress(SystemExit), "
+    "contextlib.redirect_stdout(io.StringIO()):\n"
+    "    main(['--help'])"
+)
+
+# Modules that draw figures, which import seaborn only when they draw
+FIGURE_MODULES = (
+    "src.exploratory_analysis.lifestyle",
+    "src.exploratory_analysis.contingency_heatmap",
+)
+
+
+def check_startup(help_time: float) -> list[str]:
+    """Check that the CLI starts within its budget and imports lazily.
+
+    Returns:
+        list[str]: the failed checks: `sda --help` over budget or loading a
+            heavy library, or a figure module importing seaborn.
+
+    """
+    failures = []
+    if help_time > HELP_BUDGET_S:
+        failures.append(
+            f"sda --help takes {help_time:.3f} s, more than {HELP_BUDGET_S} s",
+        )
+    heavy = loaded_heavy_modules(HELP_CODE)
+    if heavy:
+        failures.append(f"sda --help imports {', '.join(heavy)}")
+    failures.extend(
+        f"import {module} imports seaborn"
+        for module in FIGURE_MODULES
+        if "seaborn" in loaded_heavy_modules(f"import {module}")
+    )
+
+    return failures
+
+
+def main() -> None:
+    """Time the CLI and the analysis modules, then check the startup budget.
+
+    Raises:
+        SystemExit: if a startup check fails.
+
+    """
+    baseline = best_time("pass")
+    help_time = best_time(HELP_CODE)
+
+    print(f"{'interpreter':<36} {baseline:.3f} s")  # noqa: T201
+    print(f"{'sda --help':<36} {help_time:.3f} s")  # noqa: T201
+    for module, _ in ANALYSES.values():
+        import_time = best_time(f"import {module}", repeats=1)
+        print(f"{'import ' + module.rsplit('.', 1)[1]:<36} {import_time:.3f} s")  # noqa: T201
+
+    failures = check_startup(help_time)
+    for failure in failures:
+        print(failure)  # noqa: T201
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""The `sda` command line interface.
+
+Every analysis is a subcommand. The modules behind the subcommands, and the
+heavy libraries they use, are imported only when their subcommand runs, so
+`sda --help` and argument errors respond without loading pandas, scipy,
+statsmodels or matplotlib.
+
+Copyright (C) 2025.
+"""
+
+import argparse
+import importlib
+import inspect
+import logging
+from collections.abc import Sequence
+
+# Subcommands that run the `main` function of a module, with their help
+ANALYSES = {
+    "prepare-data": (
+        "src.data_preparation.prepare_data",
+        "clean the raw dataset and rebuild the columnar cache",
+    ),
+    "family-history": (
+        "src.exploratory_analysis.family_history",
+        "plot obesity categories by family history",
+    ),
+    "lifestyle": (
+        "src.exploratory_analysis.lifestyle",
+        "plot lifestyle variables by obesity category",
+    ),
+    "contingency-heatmap": (
+        "src.exploratory_analysis.contingency_heatmap",
+        "plot the family history contingency table and heatmap",
+    ),
+    "cube": (
+        "src.exploratory_analysis.cube",
+        "build the aggregate cube of the exploratory figures",
+    ),
+    "figures": (
+        "src.exploratory_analysis.rendering",
+        "render all exploratory figures that are out of date",
+    ),
+    "chi-square": (
+        "src.modeling.chi_square",
+        "test family history and FAVC against obesity",
+    ),
+    "association-matrix": (
+        "src.modeling.association_matrix",
+        "screen all pairs of categorical variables",
+    ),
+    "nonparametric": (
+        "src.modeling.nonparametric",
+        "rank tests of the lifestyle variables",
+    ),
+    "binary-logit": (
+        "src.modeling.binary_logistic_regression",
+        "fit the binary logistic regression",
+    ),
+    "ordinal-logit": (
+        "src.modeling.ordinal_logistic_regression",
+        "fit the ordinal logistic regression",
+    ),
+    "compare-hereditary-lifestyle": (
+        "src.modeling.compare_hereditary_lifestyle",
+        "compare hereditary and lifestyle ordinal models",
+    ),
+    "interaction-model": (
+        "src.modeling.interaction_model",
+        "fit the ordinal model with family history interactions",
+    ),
+    "interaction-screen": (
+        "src.modeling.interaction_screen",
+        "search all pairwise interactions with score tests",
+    ),
+    "cross-validation": (
+        "src.modeling.cross_validation",
+        "cross-validate the binary and ordinal models",
+    ),
+    "bootstrap": (
+        "src.modeling.bootstrap",
+        "bootstrap confidence intervals of the ordinal model",
+    ),
+    "export-models": (
+        "src.modeling.scoring",
+        "fit the binary and ordinal models and export them",
+    ),
+}
+
+BENCHMARKS = {
+    "ordinal-solver": "src.benchmarks.ordinal_solver",
+    "scaling": "src.benchmarks.scaling",
+    "scoring": "src.benchmarks.scoring",
+    "startup": "src.benchmarks.startup",
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the parser of all subcommands.
+
+    Returns:
+        argparse.ArgumentParser: the parser.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="sda",
+        description="Predicting obesity through hereditary and lifestyle behaviors.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the complete analysis pipeline")
+    run.add_argument(
+        "--force",
+        action="store_true",
+        help="run every stage, even if it is up to date",
+    )
+    run.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of stages to run concurrently (default: 4)",
+    )
+    run.add_argument(
+        "--flamegraph",
+        action="store_true",
+        help="also write the trace as folded stacks for flame graph tools",
+    )
+
+    for name, (_, description) in ANALYSES.items():
+        commands.add_parser(name, help=description)
+
+    score = commands.add_parser("score", help="score raw survey rows with a model")
+    score.add_argument("model", help="model exported by export-models")
+    score.add_argument("input", help="raw survey CSV file")
+    score.add_argument("output", help="CSV file to write the probabilities to")
+    score.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="number of rows scored at once (default: 100000)",
+    )
+
+    ingest = commands.add_parser(
+        "ingest",
+        help="clean a raw CSV file, dropping rows seen in it or in earlier ingests",
+    )
+    ingest.add_argument(
+        "options",
+        nargs=argparse.REMAINDER,
+        help="the raw and output files and options, e.g. new.csv out.csv --seen S",
+    )
+
+    synthetic = commands.add_parser(
+        "synthetic",
+        help="write a synthetic raw dataset, e.g. for load testing",
+    )
+    synthetic.add_argument(
+        "options",
+        nargs=argparse.REMAINDER,
+        help="the output file and options, e.g. out.csv --rows 1000000 --shards 4",
+    )
+
+    distributed = commands.add_parser(
+        "distributed",
+        help="fit a model over sharded data, or serve a shard worker",
+    )
+    distributed.add_argument(
+        "options",
+        nargs=argparse.REMAINDER,
+        help="'serve --port 6000' or 'fit SHARD... --model ordinal'",
+    )
+
+    benchmark = commands.add_parser("benchmark", help="run a benchmark")
+    benchmark.add_argument("name", choices=list(BENCHMARKS))
+    benchmark.add_argument(
+        "options",
+        nargs=argparse.REMAINDER,
+        help="options of benchmarks that take them, e.g. scaling --sizes",
+    )
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run a subcommand."""
+    args = build_parser().parse_args(argv)
+
+    if args.command == "run":
+        pipeline = importlib.import_module("src.pipeline")
+        options = ["--workers", str(args.workers)]
+        options += ["--force"] * args.force + ["--flamegraph"] * args.flamegraph
+        pipeline.main(options)
+    elif args.command == "score":
+        scoring = importlib.import_module("src.modeling.scoring")
+        n_rows = scoring.Scorer.load(args.model).score_file(
+            args.input,
+            args.output,
+            args.chunksize,
+        )
+        print(f"Scored {n_rows} rows")  # noqa: T201
+    elif args.command == "ingest":
+        importlib.import_module("src.data_preparation.dedup").main(args.options)
+    elif args.command == "synthetic":
+        importlib.import_module("src.data_preparation.synthetic").main(args.options)
+    elif args.command == "distributed":
+        importlib.import_module("src.modeling.distributed").main(args.options)
+    elif args.command == "benchmark":
+        benchmark = importlib.import_module(BENCHMARKS[args.name]).main
+        if inspect.signature(benchmark).parameters:
+            benchmark(args.options)
+        else:
+            benchmark()
+    else:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        importlib.import_module(ANALYSES[args.command][0]).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Columnar, memory-mapped on-disk cache of the cleaned dataset.
+
+Every column is stored as a flat binary file of fixed-width values, next to a
+JSON manifest with the column dtypes and the fingerprint of the raw CSV the
+cache was built from. String columns are stored as integer codes plus their
+list of categories. Loading maps the column files into memory, so reading the
+cache does not parse or copy any data.
+
+Copyright (C) 2025.
+"""
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+FINGERPRINT_BLOCK_SIZE = 1 << 20
+
+
+def fingerprint_file(path: str | Path) -> str:
+    """Compute the content fingerprint of a file.
+
+    Returns:
+        str: the hex SHA-256 digest of the file contents.
+
+    """
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while block := f.read(FINGERPRINT_BLOCK_SIZE):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """Compute the content fingerprint of a DataFrame.
+
+    The fingerprint covers the column names and values, but not the index.
+
+    Returns:
+        str: the hex SHA-256 digest of the row hashes.
+
+    """
+    digest = hashlib.sha256(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def _file_stat(path: str | Path) -> dict[str, int]:
+    """Get the size and modification time used to skip re-fingerprinting.
+
+    Returns:
+        dict[str, int]: the size and modification time of the file.
+
+    """
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class ColumnarCacheWriter:
+    """Write a DataFrame to the columnar cache one chunk at a time.
+
+    The cache is written to a temporary directory and only moved into place
+    by `close`, so an interrupted write never leaves a half-written cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        categories: dict[str, list[str]] | None = None,
+        decimals: dict[str, int] | None = None,
+    ) -> None:
+        """Start a new cache in the given directory.
+
+        Args:
+            cache_dir (str | Path): the directory to write the cache to.
+            categories (dict[str, list[str]] | None): the known categories of
+                string columns. Columns not listed take the sorted categories
+                of the first chunk.
+            decimals (dict[str, int] | None): the decimals of float columns,
+                used to restore their exact values when a column stored as
+                float32 has to be widened to float64.
+
+        """
+        self.cache_dir = Path(cache_dir)
+        self.categories = categories or {}
+        self.decimals = decimals or {}
+        self._tmp_dir = self.cache_dir.with_name(self.cache_dir.name + ".tmp")
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        self._tmp_dir.mkdir(parents=True)
+        self._columns: list[dict] = []
+        self._n_rows = 0
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Append a chunk of rows to the cache.
+
+        Raises:
+            ValueError: if the chunk's columns differ from the first chunk's.
+
+        """
+        if not self._columns:
+            self._columns = [self._describe(df[name]) for name in df.columns]
+            for column in self._columns:
+                if column["name"] in self.categories:
+                    column["categories"] = list(self.categories[column["name"]])
+        elif [c["name"] for c in self._columns] != list(df.columns):
+            msg = "All chunks must have the same columns"
+            raise ValueError(msg)
+
+        for column in self._columns:
+            values = df[column["name"]]
+            if "categories" in column:
+                values = self._category_codes(values, column)
+            else:
+                self._widen(column, values.dtype)
+                values = self._cast(values.to_numpy(), column["name"], column["dtype"])
+            array = np.ascontiguousarray(values, dtype=column["dtype"])
+            with (self._tmp_dir / column["file"]).open("ab") as f:
+                array.tofile(f)
+        self._n_rows += len(df)
+
+    def _widen(self, column: dict, dtype: np.dtype) -> None:
+        """Widen a numeric column whose later chunks need a wider dtype.
+
+        E.g. a column that was downcast to float32 in the first chunks, but not
+        in a later one, is rewritten as float64 with the values of its decimals.
+        """
+        wider = np.result_type(column["dtype"], dtype)
+        if wider == np.dtype(column["dtype"]):
+            return
+
+        path = self._tmp_dir / column["file"]
+        if path.exists():
+            values = np.fromfile(path, dtype=column["dtype"])
+            self._cast(values, column["name"], wider).tofile(path)
+        column["dtype"] = wider.str
+
+    def _cast(self, values: np.ndarray, name: str, dtype: str | np.dtype) -> np.ndarray:
+        """Cast the values of a column, restoring the decimals of widened floats.
+
+        Returns:
+            np.ndarray: the values with the given dtype.
+
+        """
+        widened = values.astype(dtype, copy=False)
+        if name in self.decimals and widened.dtype != values.dtype:
+            widened = np.round(widened, self.decimals[name])
+
+        return widened
+
+    def close(
+        self,
+        raw_path: str | Path,
+        raw_fingerprint: str,
+        schema: str | None = None,
+    ) -> None:
+        """Write the manifest and move the finished cache into place.
+
+        Args:
+            raw_path (str | Path): the raw CSV the cache was built from.
+            raw_fingerprint (str): the fingerprint of the raw CSV.
+            schema (str | None): the fingerprint of the schema of the columns.
+
+        """
+        manifest = {
+            "n_rows": self._n_rows,
+            "raw_fingerprint": raw_fingerprint,
+            "raw_stat": _file_stat(raw_path),
+            "schema": schema,
+            "columns": self._columns,
+        }
+        with (self._tmp_dir / MANIFEST_NAME).open("w") as f:
+            json.dump(manifest, f, indent=2)
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._tmp_dir.rename(self.cache_dir)
+
+    @staticmethod
+    def _describe(values: pd.Series) -> dict:
+        """Describe how a column is stored in the cache.
+
+        Returns:
+            dict: the column name, file name, dtype and categories (if any).
+
+        """
+        column = {"name": values.name, "file": f"{values.name}.bin"}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            column["categories"] = [str(c) for c in values.cat.categories]
+            column["ordered"] = bool(values.cat.ordered)
+            column["dtype"] = np.dtype(values.cat.codes.dtype).str
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            column["dtype"] = np.dtype(values.dtype).str
+        else:
+            column["categories"] = sorted(str(c) for c in values.unique())
+            column["dtype"] = "int16"
+
+        return column
+
+    @staticmethod
+    def _category_codes(values: pd.Series, column: dict) -> np.ndarray:
+        """Encode a string column with the categories of the first chunk.
+
+        Raises:
+            ValueError: if the chunk contains a category that the first did not.
+
+        Returns:
+            np.ndarray: the category codes.
+
+        """
+        codes = pd.Categorical(values, categories=column["categories"]).codes
+        if (codes < 0).any():
+            msg = f"Column {column['name']!r} has categories not in the first chunk"
+            raise ValueError(msg)
+
+        return codes
+
+
+def read_manifest(cache_dir: str | Path) -> dict | None:
+    """Read the manifest of a cache.
+
+    Returns:
+        dict | None: the manifest, or None if there is no complete cache.
+
+    """
+    manifest_path = Path(cache_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+
+    with manifest_path.open() as f:
+        return json.load(f)
+
+
+def is_fresh(manifest: dict, raw_path: str | Path) -> bool:
+    """Check whether a cache was built from the current raw CSV.
+
+    The raw file is only fingerprinted again when its size or modification time
+    differs from when the cache was written. This keeps the check cheap, but an
+    edit that preserves both, e.g. `touch -r` or a checkout restoring the old
+    modification time, is not detected; run `sda prepare-data` to rebuild the
+    cache after such an edit.
+
+    Returns:
+        bool: True if the raw CSV has the fingerprint recorded in the cache.
+
+    """
+    if manifest["raw_stat"] == _file_stat(raw_path):
+        return True
+
+    return manifest["raw_fingerprint"] == fingerprint_file(raw_path)
+
+
+def read_columnar_cache(cache_dir: str | Path, manifest: dict) -> pd.DataFrame:
+    """Memory-map the cached columns as a DataFrame without copying them.
+
+    Returns:
+        pd.DataFrame: the cached dataset.
+
+    """
+    n_rows = manifest["n_rows"]
+    columns = {}
+    for column in manifest["columns"]:
+        if n_rows:
+            values = np.memmap(
+                Path(cache_dir) / column["file"],
+                dtype=column["dtype"],
+                mode="r",
+                shape=(n_rows,),
+            )
+        else:
+            # Empty files cannot be memory-mapped
+            values = np.empty(0, dtype=column["dtype"])
+        if "categories" in column:
+            values = pd.Categorical.from_codes(
+                values,
+                categories=column["categories"],
+                ordered=column.get("ordered", False),
+                validate=False,
+            )
+        columns[column["name"]] = values
+
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs["fingerprint"] = manifest["raw_fingerprint"]
+
+    return df
@@ -0,0 +1,153 @@
+"""Drop repeated survey rows while streaming the raw CSV.
+
+Rows are compared after the rounding of `tom_ces_ber/clean_dataset.py`: Age
+to whole years, Height to 4 decimals, and Weight, CH2O, FAF and TUE to 3
+decimals, so synthetic rows that only differ in noise below those decimals
+count as repeats. Every normalized row is reduced to a 64-bit hash, and the
+hashes of all rows kept so far are stored as a sorted array in a .npy file.
+The seen-set takes 8 bytes per unique row, so deduplication works across
+chunks and across separate ingests of new responses without holding the rows
+in memory. The first occurrence of a row is kept with its original values.
+
+Copyright (C) 2025.
+"""
+
+import argparse
+import os
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.prepare_data import CHUNKSIZE, clean_data_in_chunks
+
+SEEN_PATH = "data/cache/seen_rows.npy"
+
+# Decimals the raw columns are rounded to before rows are compared
+ROUNDING = {"Age": 0, "Height": 4, "Weight": 3, "CH2O": 3, "FAF": 3, "TUE": 3}
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash the normalized raw rows.
+
+    Returns:
+        np.ndarray: the uint64 hash of every row.
+
+    """
+    normalized = df.round({c: d for c, d in ROUNDING.items() if c in df.columns})
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+class Deduplicator:
+    """Drop raw rows whose normalized values were seen before.
+
+    The hashes seen before are memory-mapped from the seen-set file. Hashes
+    added since are kept in sorted runs that are merged when a run is at least
+    as long as the one before it, so adding n hashes takes O(n log n) time.
+    """
+
+    def __init__(self, path: str | Path | None = SEEN_PATH) -> None:
+        """Open the seen-set, if it exists.
+
+        Args:
+            path (str | Path | None): the seen-set file; None keeps the
+                seen-set in memory only.
+
+        """
+        self.path = None if path is None else Path(path)
+        self._runs: list[np.ndarray] = []
+        if self.path is not None and self.path.exists():
+            self._runs.append(np.load(self.path, mmap_mode="r"))
+        self.n_rows = 0
+        self.n_dropped = 0
+
+    def __len__(self) -> int:
+        """Count the hashes in the seen-set.
+
+        Returns:
+            int: the number of unique rows seen.
+
+        """
+        return sum(len(run) for run in self._runs)
+
+    def _seen(self, hashes: np.ndarray) -> np.ndarray:
+        """Look up hashes in the seen-set.
+
+        Returns:
+            np.ndarray: whether every hash was seen before.
+
+        """
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in filter(len, self._runs):
+            positions = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+            seen |= run[positions] == hashes
+
+        return seen
+
+    def _add(self, hashes: np.ndarray) -> None:
+        """Add new, unique hashes to the seen-set."""
+        self._runs.append(np.sort(hashes))
+        while len(self._runs) > 1 and len(self._runs[-1]) >= len(self._runs[-2]):
+            last = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate((self._runs[-1], last)))
+
+    def filter(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Drop the rows of a chunk that were seen before, also in the chunk.
+
+        Returns:
+            pd.DataFrame: the rows seen for the first time.
+
+        """
+        hashes = row_hashes(chunk)
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first] = True
+        if self._runs:
+            keep &= ~self._seen(hashes)
+
+        self._add(hashes[keep])
+        self.n_rows += len(chunk)
+        self.n_dropped += len(chunk) - int(keep.sum())
+
+        return chunk[keep]
+
+    def save(self) -> None:
+        """Write the seen-set, replacing the file atomically."""
+        if self.path is None:
+            return
+
+        merged = np.sort(np.concatenate(self._runs)) if self._runs else np.empty(0)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            np.save(f, merged.astype(np.uint64))
+        tmp_path.replace(self.path)
+        self._runs = [np.load(self.path, mmap_mode="r")]
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Clean a raw CSV file, dropping rows seen in it or in earlier ingests."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("raw", help="raw CSV file, e.g. with new responses")
+    parser.add_argument("output", help="cleaned CSV file to write")
+    parser.add_argument("--seen", default=SEEN_PATH, help="seen-set file")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    deduplicator = Deduplicator(args.seen)
+    n_kept = clean_data_in_chunks(
+        args.raw,
+        args.output,
+        args.chunksize,
+        deduplicator=deduplicator,
+    )
+    print(  # noqa: T201
+        f"Kept {n_kept} of {deduplicator.n_rows} rows, dropped "
+        f"{deduplicator.n_dropped} repeated rows; {len(deduplicator)} unique "
+        f"rows seen in total",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,110 @@
 """Functions for cleaning and preparing the obesity dataset."""
 
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
 
+from src.data_preparation.columnar_cache import (
+    ColumnarCacheWriter,
+    fingerprint_file,
+    is_fresh,
+    read_columnar_cache,
+    read_manifest,
+)
+from src.data_preparation.schema import (
+    OBESITY_CATEGORIES,
+    SCHEMA_FINGERPRINT,
+    apply_schema,
+    csv_dtypes,
+    measure_decimals,
+    memory_report,
+    widen_measures,
+)
+from src.instrumentation import instrument
+
+if TYPE_CHECKING:
+    from src.data_preparation.dedup import Deduplicator
+
 RAW_DATA_PATH = "data/ObesityDataSet_raw_and_data_sinthetic.csv"
 CLEANED_DATA_PATH = "data/obesity_cleaned_final.csv"
+CACHE_DIR = "data/cache/obesity_cleaned"
+
+# Number of raw rows cleaned at a time when streaming the raw CSV
+CHUNKSIZE = 100_000
+
+# Numeric raw columns; read as float64 so every chunk gets the same dtype
+RAW_NUMERIC_COLUMNS = [
+    "Age",
+    "Height",
+    "Weight",
+    "FCVC",
+    "NCP",
+    "CH2O",
+    "FAF",
+    "TUE",
+]
+
+GENDER_ENCODING = {"Female": 0, "Male": 1}
+BINARY_ENCODING = {"no": 0, "yes": 1}
+FREQUENCY_ENCODING = {"no": 0, "Sometimes": 1, "Frequently": 2, "Always": 3}
+CATEGORICAL_ENCODINGS = {
+    "Gender": GENDER_ENCODING,
+    "family_history_with_overweight": BINARY_ENCODING,
+    "FAVC": BINARY_ENCODING,
+    "SMOKE": BINARY_ENCODING,
+    "SCC": BINARY_ENCODING,
+    "CALC": FREQUENCY_ENCODING,
+    "CAEC": FREQUENCY_ENCODING,
+}
+
+# Levels of 'MTRANS', in the (sorted) order of the one-hot encoded columns
+MTRANS_CATEGORIES = [
+    "Automobile",
+    "Bike",
+    "Motorbike",
+    "Public_Transportation",
+    "Walking",
+]
+
+OBESITY_LEVEL_ENCODING = {
+    category: level for level, category in enumerate(OBESITY_CATEGORIES)
+}
+NOT_OBESE_CATEGORIES = ["Normal_Weight", "Insufficient_Weight"]
+
+
+def _category_codes(values: pd.Series, categories: list[str]) -> np.ndarray:
+    """Look up the position of every value in the list of known categories.
+
+    Returns:
+        np.ndarray: the category codes, -1 for values that are not known.
+
+    """
+    return pd.Categorical(values, categories=categories).codes
+
+
+def encode_column(values: pd.Series, encoding: dict[str, int]) -> np.ndarray:
+    """Encode a categorical column with a lookup table.
 
+    Raises:
+        ValueError: if the column contains a value that has no encoding.
 
+    Returns:
+        np.ndarray: the encoded column.
+
+    """
+    codes = _category_codes(values, list(encoding))
+    if (codes < 0).any():
+        msg = f"Column {values.name!r} contains values without an encoding"
+        raise ValueError(msg)
+
+    lookup = np.fromiter(encoding.values(), dtype=np.int64, count=len(encoding))
+    return lookup[codes]
+
+
+@instrument
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """Clean and preprocess the raw obesity dataset.
 
@@ -13,66 +112,182 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
         df (pd.DataFrame): The raw DataFrame loaded from the CSV.
 
     Returns:
-        pd.DataFrame: The cleaned and preprocessed DataFrame.
+        pd.DataFrame: The cleaned and preprocessed DataFrame, with the compact
+            dtypes of the cleaned dataset schema.
 
     """
     # Rename 'NObeyesdad' for clarity and consistency
     df = df.rename(columns={"NObeyesdad": "Obesity_Category"})
 
     # Map categorical features to numerical
-    df["Gender"] = df["Gender"].map({"Male": 1, "Female": 0}).astype(int)
-    df["family_history_with_overweight"] = (
-        df["family_history_with_overweight"].map({"yes": 1, "no": 0}).astype(int)
-    )
-    df["FAVC"] = df["FAVC"].map({"yes": 1, "no": 0}).astype(int)
-    df["SMOKE"] = df["SMOKE"].map({"yes": 1, "no": 0}).astype(int)
-    df["SCC"] = df["SCC"].map({"yes": 1, "no": 0}).astype(int)
-    df["CALC"] = (
-        df["CALC"]
-        .map(
-            {"no": 0, "Sometimes": 1, "Frequently": 2, "Always": 3},
-        )
-        .astype(int)
-    )
-    df["CAEC"] = (
-        df["CAEC"]
-        .map(
-            {"no": 0, "Sometimes": 1, "Frequently": 2, "Always": 3},
-        )
-        .astype(int)
-    )
+    for column, encoding in CATEGORICAL_ENCODINGS.items():
+        df[column] = encode_column(df[column], encoding)
 
     # One-hot encode 'MTRANS' and convert to int
-    df = pd.get_dummies(df, columns=["MTRANS"], prefix="MTRANS", dtype=int)
-
-    # Map ordinal 'Obesity_Category' to numerical 'Obesity_Level'
-    obesity_level_mapping = {
-        "Insufficient_Weight": 0,
-        "Normal_Weight": 1,
-        "Overweight_Level_I": 2,
-        "Overweight_Level_II": 3,
-        "Obesity_Type_I": 4,
-        "Obesity_Type_II": 5,
-        "Obesity_Type_III": 6,
-    }
-    df["Obesity_Level"] = df["Obesity_Category"].map(obesity_level_mapping)
+    mtrans_codes = _category_codes(df["MTRANS"], MTRANS_CATEGORIES)
+    if (mtrans_codes < 0).any():
+        msg = "Column 'MTRANS' contains unknown transportation modes"
+        raise ValueError(msg)
+    mtrans_dummies = mtrans_codes[:, np.newaxis] == np.arange(
+        len(MTRANS_CATEGORIES),
+    )
+    df = df.drop(columns=["MTRANS"])
+    for i, category in enumerate(MTRANS_CATEGORIES):
+        df[f"MTRANS_{category}"] = mtrans_dummies[:, i].astype(np.int64)
+
+    # Map ordinal 'Obesity_Category' to numerical 'Obesity_Level'; rows with an
+    # unknown category have no level and are dropped
+    obesity_codes = _category_codes(
+        df["Obesity_Category"],
+        list(OBESITY_LEVEL_ENCODING),
+    )
+    known = obesity_codes >= 0
+    if not known.all():
+        df = df[known].copy()
+        obesity_codes = obesity_codes[known]
+    level_lookup = np.fromiter(OBESITY_LEVEL_ENCODING.values(), dtype=np.int64)
+    df["Obesity_Level"] = level_lookup[obesity_codes]
 
     # Create 'Obese_Binary' column (1 if obese/overweight, 0 otherwise)
     # Fix: Only classify 'Normal_Weight' and 'Insufficient_Weight' as 0
-    df["Obese_Binary"] = df["Obesity_Category"].apply(
-        lambda x: 0 if x in ["Normal_Weight", "Insufficient_Weight"] else 1,
+    binary_lookup = np.array(
+        [int(c not in NOT_OBESE_CATEGORIES) for c in OBESITY_LEVEL_ENCODING],
+        dtype=np.int64,
     )
+    df["Obese_Binary"] = binary_lookup[obesity_codes]
 
     # Handle missing values (if any) - drop rows with any NaN values
-    return df.dropna()
+    return apply_schema(df.dropna())
+
+
+@instrument
+def clean_data_in_chunks(
+    raw_path: str | Path,
+    cleaned_path: str | Path,
+    chunksize: int = CHUNKSIZE,
+    cache_dir: str | Path | None = None,
+    deduplicator: "Deduplicator | None" = None,
+) -> int:
+    """Clean the raw CSV chunk by chunk and append each chunk to the output.
+
+    Only one chunk is held in memory at a time, so memory use does not grow with
+    the size of the raw file. The output is identical to cleaning the whole file
+    at once with `clean_data`. If a cache directory is given, the cleaned chunks
+    are also written to the columnar cache read by `load_cleaned_data`. If a
+    deduplicator is given, raw rows it has seen before are dropped, and its
+    seen-set is saved once all chunks are written.
+
+    Returns:
+        int: the number of cleaned rows written.
+
+    """
+    dtypes = dict.fromkeys(RAW_NUMERIC_COLUMNS, np.float64)
+    cache = None
+    if cache_dir is not None:
+        cache = ColumnarCacheWriter(cache_dir, decimals=measure_decimals())
+
+    n_rows = 0
+    with (
+        pd.read_csv(raw_path, dtype=dtypes, chunksize=chunksize) as reader,
+        Path(cleaned_path).open("w", newline="") as f,
+    ):
+        for i, chunk in enumerate(reader):
+            if deduplicator is not None:
+                chunk = deduplicator.filter(chunk)  # noqa: PLW2901
+            cleaned = clean_data(chunk)
+            # Measures stored as float32 are written with their recorded decimals
+            widen_measures(cleaned).to_csv(f, sep=";", index=False, header=i == 0)
+            if cache is not None:
+                cache.append(cleaned)
+            n_rows += len(cleaned)
+
+    if cache is not None:
+        cache.close(raw_path, fingerprint_file(raw_path), schema=SCHEMA_FINGERPRINT)
+    if deduplicator is not None:
+        deduplicator.save()
+
+    return n_rows
+
+
+def read_cleaned_csv(path: str | Path) -> pd.DataFrame:
+    """Read a cleaned CSV file with the compact dtypes of the schema.
+
+    Codes and categories are parsed into their compact dtypes directly, and
+    measures are downcast to float32 where that keeps their decimals.
+
+    Returns:
+        pd.DataFrame: the cleaned rows.
+
+    """
+    return apply_schema(pd.read_csv(path, sep=";", dtype=csv_dtypes()))
+
+
+def iter_cleaned_data(
+    path: str | Path = CLEANED_DATA_PATH,
+    chunksize: int = CHUNKSIZE,
+) -> Iterator[pd.DataFrame]:
+    """Stream the cleaned dataset in chunks of rows.
+
+    The default dataset is sliced from the memory-mapped columnar cache, so
+    only the pages of the current chunk are read. Other cleaned CSV files are
+    parsed one chunk at a time.
+
+    Yields:
+        pd.DataFrame: the next chunk of rows, with the compact dtypes of the
+            schema.
+
+    """
+    if Path(path) == Path(CLEANED_DATA_PATH):
+        df = load_cleaned_data()
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start : start + chunksize]
+        return
+
+    with pd.read_csv(path, sep=";", dtype=csv_dtypes(), chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk)
+
+
+@instrument
+def load_cleaned_data(
+    path: str | Path = CLEANED_DATA_PATH,
+    raw_path: str | Path = RAW_DATA_PATH,
+    cache_dir: str | Path = CACHE_DIR,
+) -> pd.DataFrame:
+    """Load the cleaned dataset from the columnar cache.
+
+    The cache is rebuilt from the raw CSV when it is missing, or when the raw
+    CSV or the schema has changed since the cache was written. Other cleaned
+    CSV files than the default one are read directly.
+
+    Returns:
+        pd.DataFrame: the cleaned dataset, with the compact dtypes of the schema.
+
+    """
+    if Path(path) != Path(CLEANED_DATA_PATH):
+        return read_cleaned_csv(path)
+
+    manifest = read_manifest(cache_dir)
+    if (
+        manifest is None
+        or manifest.get("schema") != SCHEMA_FINGERPRINT
+        or not is_fresh(manifest, raw_path)
+    ):
+        clean_data_in_chunks(raw_path, path, cache_dir=cache_dir)
+        manifest = read_manifest(cache_dir)
+        if manifest is None:
+            msg = f"Failed to build the dataset cache in {cache_dir}"
+            raise RuntimeError(msg)
+
+    return read_columnar_cache(cache_dir, manifest)
 
 
 def main() -> None:
     """Load raw data, clean it, and save the cleaned data."""
-    raw_df = pd.read_csv(RAW_DATA_PATH)
-    cleaned_df = clean_data(raw_df)
-    cleaned_df.to_csv(CLEANED_DATA_PATH, sep=";", index=False)
+    clean_data_in_chunks(RAW_DATA_PATH, CLEANED_DATA_PATH, cache_dir=CACHE_DIR)
     print(f"Cleaned data saved to {CLEANED_DATA_PATH}")  # noqa: T201
+    report = memory_report(load_cleaned_data())
+    print(report.to_string(float_format="{:.2f}".format))  # noqa: T201
 
 
 if __name__ == "__main__":
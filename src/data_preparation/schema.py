@@ -0,0 +1,223 @@
+"""Declared schema of the cleaned dataset, with compact column dtypes.
+
+Every column of the cleaned dataset is declared with the dtype it is stored
+in. Encoded categorical variables, flags and levels are stored as int8, the
+obesity category as a categorical of its levels in order, and the continuous
+measures as float32 when that keeps all of their recorded decimals and as
+float64 otherwise. A measure is only downcast after checking that rounding the
+float32 values to the decimals of the raw CSV gives back the original values,
+so no precision is lost and the values are written to CSV unchanged.
+
+Copyright (C) 2025.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Decimals of the continuous columns of the raw CSV
+RAW_DECIMALS = 6
+
+OBESITY_CATEGORIES = [
+    "Insufficient_Weight",
+    "Normal_Weight",
+    "Overweight_Level_I",
+    "Overweight_Level_II",
+    "Obesity_Type_I",
+    "Obesity_Type_II",
+    "Obesity_Type_III",
+]
+
+
+@dataclass(frozen=True)
+class Column:
+    """How a column of the cleaned dataset is stored.
+
+    `kind` is "code" for small integers stored as int8, "category" for strings
+    stored as a categorical of `categories`, and "measure" for continuous
+    values with `decimals` decimals, stored as float32 when validated.
+    """
+
+    name: str
+    kind: str
+    categories: tuple[str, ...] = ()
+    decimals: int = RAW_DECIMALS
+
+    def dtype(self) -> np.dtype | pd.CategoricalDtype:
+        """Get the dtype the column is read from CSV with.
+
+        Returns:
+            np.dtype | pd.CategoricalDtype: int8 for codes, the categorical
+                dtype for categories and float64 for measures.
+
+        """
+        if self.kind == "category":
+            return pd.CategoricalDtype(list(self.categories), ordered=True)
+
+        return np.dtype(np.int8 if self.kind == "code" else np.float64)
+
+
+# The columns of the cleaned dataset, in the order of the cleaned CSV
+CLEANED_SCHEMA = (
+    Column("Age", "measure"),
+    Column("Gender", "code"),
+    Column("Height", "measure"),
+    Column("Weight", "measure"),
+    Column("CALC", "code"),
+    Column("FAVC", "code"),
+    Column("FCVC", "measure"),
+    Column("NCP", "measure"),
+    Column("SCC", "code"),
+    Column("SMOKE", "code"),
+    Column("CH2O", "measure"),
+    Column("family_history_with_overweight", "code"),
+    Column("FAF", "measure"),
+    Column("TUE", "measure"),
+    Column("CAEC", "code"),
+    Column("Obesity_Category", "category", tuple(OBESITY_CATEGORIES)),
+    Column("MTRANS_Automobile", "code"),
+    Column("MTRANS_Bike", "code"),
+    Column("MTRANS_Motorbike", "code"),
+    Column("MTRANS_Public_Transportation", "code"),
+    Column("MTRANS_Walking", "code"),
+    Column("Obesity_Level", "code"),
+    Column("Obese_Binary", "code"),
+)
+COLUMNS = {column.name: column for column in CLEANED_SCHEMA}
+
+SCHEMA_FINGERPRINT = hashlib.sha256(
+    json.dumps([list(vars(c).values()) for c in CLEANED_SCHEMA]).encode(),
+).hexdigest()
+
+
+def csv_dtypes(columns: list[str] | None = None) -> dict:
+    """Get the dtypes to read columns of the cleaned CSV with.
+
+    Columns that are not declared are left out.
+
+    Returns:
+        dict: the dtype of every declared column.
+
+    """
+    names = COLUMNS if columns is None else columns
+    return {name: COLUMNS[name].dtype() for name in names if name in COLUMNS}
+
+
+def measure_decimals() -> dict[str, int]:
+    """Get the recorded decimals of every measure.
+
+    Returns:
+        dict[str, int]: the decimals of every measure column.
+
+    """
+    return {c.name: c.decimals for c in CLEANED_SCHEMA if c.kind == "measure"}
+
+
+def fits_float32(values: np.ndarray, decimals: int = RAW_DECIMALS) -> bool:
+    """Check whether float32 keeps every recorded decimal of the values.
+
+    Returns:
+        bool: True if rounding the float32 values to `decimals` decimals gives
+            back the values exactly.
+
+    """
+    widened = np.asarray(values, dtype=np.float32).astype(np.float64)
+    return np.array_equal(np.round(widened, decimals), values, equal_nan=True)
+
+
+def compact_codes(values: np.ndarray, name: str) -> np.ndarray:
+    """Downcast integer codes to int8.
+
+    Raises:
+        ValueError: if a code does not fit in int8.
+
+    Returns:
+        np.ndarray: the codes as int8.
+
+    """
+    info = np.iinfo(np.int8)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        msg = f"Column {name!r} has codes that do not fit in int8"
+        raise ValueError(msg)
+
+    return values.astype(np.int8)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Store the declared columns of a cleaned frame in their compact dtypes.
+
+    Columns that are not declared are kept as they are.
+
+    Raises:
+        ValueError: if a code does not fit in int8, or a category is unknown.
+
+    Returns:
+        pd.DataFrame: the frame with compact dtypes.
+
+    """
+    columns = {}
+    for name in df.columns:
+        values, column = df[name], COLUMNS.get(name)
+        if column is None:
+            columns[name] = values
+        elif column.kind == "code":
+            columns[name] = compact_codes(values.to_numpy(), name)
+        elif column.kind == "category":
+            categorical = values.astype(column.dtype())
+            if categorical.isna().sum() > values.isna().sum():
+                msg = f"Column {name!r} has categories that are not declared"
+                raise ValueError(msg)
+            columns[name] = categorical
+        else:
+            measure = values.to_numpy(dtype=np.float64)
+            if fits_float32(measure, column.decimals):
+                measure = measure.astype(np.float32)
+            columns[name] = measure
+
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def widen_measures(df: pd.DataFrame) -> pd.DataFrame:
+    """Restore the exact float64 values of measures stored as float32.
+
+    Model fits compute in float64, and widening alone would give e.g.
+    1.6200000047683716 for 1.62. Rounding the widened values to their decimals
+    gives back the values of the raw CSV.
+
+    Returns:
+        pd.DataFrame: the frame with float64 measures.
+
+    """
+    widened = {
+        name: np.round(df[name].to_numpy(dtype=np.float64), COLUMNS[name].decimals)
+        for name in df.columns
+        if name in COLUMNS and df[name].dtype == np.float32
+    }
+    if not widened:
+        return df
+
+    return df.assign(**widened)
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Report the memory used by every column of a frame.
+
+    Returns:
+        pd.DataFrame: the dtype and bytes of every column, and the bytes per
+            row, with a total row.
+
+    """
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame(
+        {
+            "dtype": df.dtypes.astype(str),
+            "bytes": usage,
+            "bytes_per_row": usage / max(len(df), 1),
+        },
+    )
+    report.loc["total"] = ["", usage.sum(), usage.sum() / max(len(df), 1)]
+
+    return report
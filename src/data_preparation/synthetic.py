@@ -0,0 +1,374 @@
+"""Generate synthetic raw survey rows with the structure of the raw dataset.
+
+A `SyntheticModel` is fitted to the raw CSV. It keeps the share of every
+obesity category, the frequencies of the levels of every categorical column
+within every category, and the mean and covariance of the numeric columns
+within every category. Rows are generated by drawing a category, then the
+categorical columns from their frequencies within the category and the numeric
+columns from a multivariate normal distribution, clipped to the range of the
+category. This keeps, e.g., the association of family history and the obesity
+category, and the correlation of height and weight within every category.
+
+Rows are generated in chunks with a random generator seeded by the seed and
+the position of the chunk, so the output only depends on the seed and the
+number of rows, also when the chunks are generated by several processes or
+written to several shards.
+
+Copyright (C) 2025.
+"""
+
+import argparse
+import json
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.prepare_data import (
+    CATEGORICAL_ENCODINGS,
+    RAW_DATA_PATH,
+    RAW_NUMERIC_COLUMNS,
+)
+from src.modeling.parallel import make_executor
+
+CLASS_COLUMN = "NObeyesdad"
+CATEGORICAL_COLUMNS = [*CATEGORICAL_ENCODINGS, "MTRANS"]
+CHUNKSIZE = 100_000
+SEED = 0
+# Digits of the numeric columns, as in the raw CSV
+DECIMALS = 6
+
+
+@dataclass
+class SyntheticModel:
+    """Per-category frequencies and normal distributions of the raw columns."""
+
+    columns: list[str]
+    classes: list[str]
+    priors: np.ndarray
+    levels: dict[str, list[str]]
+    frequencies: dict[str, np.ndarray]
+    numeric: list[str]
+    means: np.ndarray
+    transforms: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame) -> Self:
+        """Fit the model to raw survey rows.
+
+        Returns:
+            SyntheticModel: the fitted model.
+
+        """
+        class_codes, classes = pd.factorize(df[CLASS_COLUMN], sort=True)
+        n_classes = len(classes)
+        priors = np.bincount(class_codes, minlength=n_classes) / len(df)
+
+        levels, frequencies = {}, {}
+        for column in CATEGORICAL_COLUMNS:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            counts = np.bincount(
+                class_codes * len(uniques) + codes,
+                minlength=n_classes * len(uniques),
+            ).reshape(n_classes, len(uniques))
+            levels[column] = [str(u) for u in uniques]
+            frequencies[column] = counts / counts.sum(axis=1, keepdims=True)
+
+        values = df[RAW_NUMERIC_COLUMNS].to_numpy(dtype=np.float64)
+        n_numeric = len(RAW_NUMERIC_COLUMNS)
+        means = np.empty((n_classes, n_numeric))
+        transforms = np.empty((n_classes, n_numeric, n_numeric))
+        lower = np.empty((n_classes, n_numeric))
+        upper = np.empty((n_classes, n_numeric))
+        for k in range(n_classes):
+            group = values[class_codes == k]
+            means[k] = group.mean(axis=0)
+            # Covariances of constant columns are singular, so draw with the
+            # eigendecomposition instead of a Cholesky factor
+            eigenvalues, eigenvectors = np.linalg.eigh(np.cov(group, rowvar=False))
+            transforms[k] = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+            lower[k], upper[k] = group.min(axis=0), group.max(axis=0)
+
+        return cls(
+            columns=list(df.columns),
+            classes=[str(c) for c in classes],
+            priors=priors,
+            levels=levels,
+            frequencies=frequencies,
+            numeric=list(RAW_NUMERIC_COLUMNS),
+            means=means,
+            transforms=transforms,
+            lower=lower,
+            upper=upper,
+        )
+
+    def sample(self, n_rows: int, rng: np.random.Generator) -> pd.DataFrame:
+        """Draw raw survey rows.
+
+        Returns:
+            pd.DataFrame: the rows, with the columns of the raw CSV.
+
+        """
+        class_codes = rng.choice(len(self.classes), size=n_rows, p=self.priors)
+        data: dict[str, object] = {}
+
+        for column in CATEGORICAL_COLUMNS:
+            cumulative = np.cumsum(self.frequencies[column], axis=1)[class_codes]
+            u = rng.random(n_rows)[:, np.newaxis]
+            codes = np.minimum((u >= cumulative).sum(axis=1), cumulative.shape[1] - 1)
+            data[column] = np.asarray(self.levels[column], dtype=object)[codes]
+
+        z = rng.standard_normal((n_rows, len(self.numeric)))
+        numeric = np.empty_like(z)
+        for k in range(len(self.classes)):
+            rows = class_codes == k
+            numeric[rows] = np.clip(
+                z[rows] @ self.transforms[k].T + self.means[k],
+                self.lower[k],
+                self.upper[k],
+            )
+        numeric = numeric.round(DECIMALS)
+        for i, column in enumerate(self.numeric):
+            data[column] = numeric[:, i]
+
+        data[CLASS_COLUMN] = np.asarray(self.classes, dtype=object)[class_codes]
+
+        return pd.DataFrame(data)[self.columns]
+
+    def save(self, path: str | Path) -> None:
+        """Write the model to a JSON file."""
+        spec = {
+            "columns": self.columns,
+            "classes": self.classes,
+            "priors": self.priors.tolist(),
+            "levels": self.levels,
+            "frequencies": {c: f.tolist() for c, f in self.frequencies.items()},
+            "numeric": self.numeric,
+            "means": self.means.tolist(),
+            "transforms": self.transforms.tolist(),
+            "lower": self.lower.tolist(),
+            "upper": self.upper.tolist(),
+        }
+        with Path(path).open("w") as f:
+            json.dump(spec, f)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Read a model written by `save`.
+
+        Returns:
+            SyntheticModel: the model.
+
+        """
+        with Path(path).open() as f:
+            spec = json.load(f)
+
+        return cls(
+            columns=spec["columns"],
+            classes=spec["classes"],
+            priors=np.array(spec["priors"]),
+            levels=spec["levels"],
+            frequencies={c: np.array(f) for c, f in spec["frequencies"].items()},
+            numeric=spec["numeric"],
+            means=np.array(spec["means"]),
+            transforms=np.array(spec["transforms"]),
+            lower=np.array(spec["lower"]),
+            upper=np.array(spec["upper"]),
+        )
+
+
+def fit_model(raw_path: str | Path = RAW_DATA_PATH) -> SyntheticModel:
+    """Fit a synthetic model to a raw CSV file.
+
+    Returns:
+        SyntheticModel: the fitted model.
+
+    """
+    return SyntheticModel.fit(pd.read_csv(raw_path))
+
+
+def _chunk_sizes(n_rows: int, chunksize: int) -> list[int]:
+    """Split a number of rows into chunks.
+
+    Returns:
+        list[int]: the number of rows of every chunk.
+
+    """
+    return [min(chunksize, n_rows - start) for start in range(0, n_rows, chunksize)]
+
+
+def generate_chunk(
+    model: SyntheticModel,
+    seed: int,
+    index: int,
+    n_rows: int,
+) -> pd.DataFrame:
+    """Generate a chunk of rows with a generator seeded by its position.
+
+    Returns:
+        pd.DataFrame: the rows of the chunk.
+
+    """
+    return model.sample(n_rows, np.random.default_rng([seed, index]))
+
+
+_worker_data: dict = {}
+
+
+def _init_worker(model: SyntheticModel, seed: int) -> None:
+    """Store the model and seed shared by all tasks of a worker."""
+    _worker_data.update(model=model, seed=seed)
+
+
+def _chunk_csv(index: int, n_rows: int) -> str:
+    """Generate a chunk of rows as CSV text without a header.
+
+    Returns:
+        str: the CSV text.
+
+    """
+    chunk = generate_chunk(_worker_data["model"], _worker_data["seed"], index, n_rows)
+    return chunk.to_csv(index=False, header=False)
+
+
+def _write_shard(path: str, first_index: int, sizes: Sequence[int]) -> int:
+    """Write consecutive chunks of rows to a raw CSV file.
+
+    Returns:
+        int: the number of rows written.
+
+    """
+    with Path(path).open("w", newline="") as f:
+        f.write(",".join(_worker_data["model"].columns) + "\n")
+        f.writelines(
+            _chunk_csv(first_index + i, n_rows) for i, n_rows in enumerate(sizes)
+        )
+
+    return sum(sizes)
+
+
+def write_synthetic(  # noqa: PLR0913
+    path: str | Path,
+    n_rows: int,
+    *,
+    seed: int = SEED,
+    chunksize: int = CHUNKSIZE,
+    max_workers: int | None = 1,
+    model: SyntheticModel | None = None,
+) -> int:
+    """Stream synthetic raw rows to a CSV file.
+
+    Chunks are generated by worker processes and written in order, so the
+    file does not depend on the number of workers. At most two chunks per
+    worker are held in memory.
+
+    Args:
+        path (str | Path): the raw CSV file to write.
+        n_rows (int): the number of rows.
+        seed (int): the seed of the random generators.
+        chunksize (int): the number of rows generated at once.
+        max_workers (int | None): the number of worker processes; 1 generates
+            all chunks in the calling process.
+        model (SyntheticModel | None): the model, by default fitted to the
+            raw dataset.
+
+    Returns:
+        int: the number of rows written.
+
+    """
+    model = model or fit_model()
+    sizes = _chunk_sizes(n_rows, chunksize)
+    window = 2 * (max_workers or 1)
+
+    with (
+        make_executor(max_workers, _init_worker, (model, seed), __name__) as pool,
+        Path(path).open("w", newline="") as f,
+    ):
+        f.write(",".join(model.columns) + "\n")
+        pending: deque = deque()
+        for index, size in enumerate(sizes):
+            pending.append(pool.submit(_chunk_csv, index, size))
+            if len(pending) >= window:
+                f.write(pending.popleft().result())
+        while pending:
+            f.write(pending.popleft().result())
+
+    return n_rows
+
+
+def write_shards(  # noqa: PLR0913
+    directory: str | Path,
+    n_rows: int,
+    n_shards: int,
+    *,
+    seed: int = SEED,
+    chunksize: int = CHUNKSIZE,
+    max_workers: int | None = None,
+    model: SyntheticModel | None = None,
+) -> list[Path]:
+    """Write synthetic raw rows to several CSV files, one per worker task.
+
+    Every shard is a raw CSV file with a header. Concatenating the rows of the
+    shards in order gives the rows of `write_synthetic` with the same seed and
+    chunk size.
+
+    Returns:
+        list[Path]: the paths of the shards.
+
+    """
+    model = model or fit_model()
+    sizes = _chunk_sizes(n_rows, chunksize)
+    bounds = np.linspace(0, len(sizes), n_shards + 1).round().astype(int)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [directory / f"shard_{i:04d}.csv" for i in range(n_shards)]
+
+    with make_executor(max_workers, _init_worker, (model, seed), __name__) as pool:
+        futures = [
+            pool.submit(_write_shard, str(path), int(start), sizes[start:end])
+            for path, start, end in zip(paths, bounds[:-1], bounds[1:], strict=True)
+        ]
+        for future in futures:
+            future.result()
+
+    return paths
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Write a synthetic raw dataset."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="CSV file, or directory of the shards")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--shards", type=int, help="write this many files")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.shards:
+        write_shards(
+            args.output,
+            args.rows,
+            args.shards,
+            seed=args.seed,
+            chunksize=args.chunksize,
+            max_workers=args.workers,
+        )
+    else:
+        write_synthetic(
+            args.output,
+            args.rows,
+            seed=args.seed,
+            chunksize=args.chunksize,
+            max_workers=args.workers,
+        )
+
+
+if __name__ == "__main__":
+    main()
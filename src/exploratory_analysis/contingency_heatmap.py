@@ -3,61 +3,77 @@
 Copyright (C) 2025.
 """
 
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
+from matplotlib.axes import Axes
+
+from src.exploratory_analysis.cube import AggregateCube, load_cube
+from src.exploratory_analysis.rendering import FigureSpec, render
+from src.instrumentation import instrument
 
 CONTINGENCY_PLOT_PATH = "results/contingency.png"
 HEATMAP_PLOT_PATH = "results/heatmap.png"
 
 
-def plot_contingency(df: pd.DataFrame) -> None:
-    """Create a contingency table and plot different visualizations."""
-    # Create a temporary column for display of family history as 'Yes'/'No'
-    df["family_history_display"] = df["family_history_with_overweight"].map(
-        {0: "No", 1: "Yes"},
-    )
-    contingency_table: pd.DataFrame = pd.crosstab(
-        df.family_history_display,
-        df.Obesity_Category,
+def display_family_history(counts: pd.DataFrame) -> pd.DataFrame:
+    """Display family history as 'Yes'/'No' in a contingency table.
+
+    Returns:
+        pd.DataFrame: the contingency table.
+
+    """
+    return counts.rename(index={0: "No", 1: "Yes"}).rename_axis(
+        "family_history_display",
     )
 
-    contingency_table.plot(kind="bar", figsize=(10, 6))
 
-    plt.xlabel("Family History of Overweight")
-    plt.ylabel("Count")
-    plt.legend(
+@instrument
+def plot_contingency(ax: Axes, counts: pd.DataFrame) -> None:
+    """Create a contingency table and plot different visualizations."""
+    contingency_table = display_family_history(counts)
+
+    contingency_table.plot(kind="bar", ax=ax)
+
+    ax.set_xlabel("Family History of Overweight")
+    ax.set_ylabel("Count")
+    ax.legend(
         title="Obesity Category",
     )
-    plt.plot()
-
-    plt.savefig(CONTINGENCY_PLOT_PATH)
 
 
-def plot_heatmap(df: pd.DataFrame) -> None:
+@instrument
+def plot_heatmap(ax: Axes, counts: pd.DataFrame) -> None:
     """Plot a heatmap."""
-    # Create a temporary column for display of family history as 'Yes'/'No'
-    df["family_history_display"] = df["family_history_with_overweight"].map(
-        {0: "No", 1: "Yes"},
-    )
-    # Heatmap
-    df = pd.crosstab(
-        df.family_history_display,
-        df.Obesity_Category,
+    import seaborn as sns  # noqa: PLC0415
+
+    sns.heatmap(
+        display_family_history(counts),
+        annot=True,
+        fmt="d",
+        cmap="Blues",
+        ax=ax,
     )
+    ax.set_xlabel("Obesity Category")
+    ax.set_ylabel("Family history")
+    ax.figure.tight_layout()
+
+
+def figures(cube: AggregateCube) -> list[FigureSpec]:
+    """Describe the contingency bar plot and heatmap.
+
+    Returns:
+        list[FigureSpec]: the figures.
 
-    sns.heatmap(df, annot=True, fmt="d", cmap="Blues")
-    plt.xlabel("Obesity Category")
-    plt.ylabel("Family history")
-    plt.tight_layout()
-    plt.savefig(HEATMAP_PLOT_PATH)
+    """
+    counts = cube.crosstab("family_history_with_overweight", "Obesity_Category")
+    return [
+        FigureSpec(HEATMAP_PLOT_PATH, plot_heatmap, counts),
+        FigureSpec(CONTINGENCY_PLOT_PATH, plot_contingency, counts, figsize=(10, 6)),
+    ]
 
 
 def main() -> None:
     """Load dataset and perform experiments."""
-    df = pd.read_csv("data/obesity_cleaned_final.csv", sep=";")
-    plot_heatmap(df.copy())
-    plot_contingency(df.copy())
+    render(figures(load_cube()))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,498 @@
+"""Aggregate cube of the cleaned dataset that the exploratory figures draw from.
+
+The cube is built in a single pass over the rows. It holds the number of rows,
+the sums of the numeric measures and a histogram sketch of every measure in
+every cell of a grid of categorical dimensions: the obesity category, family
+history and a few other categorical variables. Every histogram bin also keeps
+the sum of its values, so values that share a bin, such as the levels of an
+ordinal variable, are represented exactly.
+
+Contingency tables, means, quantiles and box plot statistics of any subset of
+the dimensions are computed from the cube alone, so their cost does not depend
+on the number of rows. The cube is saved next to the columnar cache and keyed
+on the fingerprint of the raw data it was built from.
+
+Copyright (C) 2025.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation import prepare_data
+from src.data_preparation.columnar_cache import is_fresh, read_manifest
+from src.data_preparation.schema import COLUMNS, SCHEMA_FINGERPRINT
+from src.instrumentation import instrument
+from src.reporting import log_to_file
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "data/cache/cube"
+CHUNK_ROWS = 1_000_000
+N_BINS = 512
+WHISKER = 1.5
+DIMENSIONS = (
+    "Obesity_Category",
+    "family_history_with_overweight",
+    "Gender",
+    "FAVC",
+)
+MEASURES = (
+    "Age",
+    "Height",
+    "Weight",
+    "FCVC",
+    "NCP",
+    "CH2O",
+    "FAF",
+    "TUE",
+    "CALC",
+    "CAEC",
+)
+
+# Stages of the pipeline load the cube from threads of one process
+_build_lock = threading.Lock()
+
+
+@dataclass
+class AggregateCube:
+    """Counts, sums and histograms of measures per cell of categorical levels.
+
+    The arrays are indexed by the levels of the dimensions, in the order of
+    `dimensions`, followed by the measure and the histogram bin.
+    """
+
+    dimensions: tuple[str, ...]
+    levels: tuple[list, ...]
+    measures: tuple[str, ...]
+    edges: np.ndarray
+    counts: np.ndarray
+    sums: np.ndarray
+    histograms: np.ndarray
+    bin_sums: np.ndarray
+
+    def marginal(self, dimensions: Sequence[str]) -> Self:
+        """Sum the cube over all dimensions but the given ones.
+
+        Returns:
+            AggregateCube: the cube of the given dimensions, in the given order.
+
+        """
+        axes = [self.dimensions.index(d) for d in dimensions]
+        dropped = tuple(
+            axis for axis in range(len(self.dimensions)) if axis not in axes
+        )
+
+        # Summing keeps the remaining axes in their original order
+        order = [sorted(axes).index(axis) for axis in axes]
+
+        def reduce(array: np.ndarray) -> np.ndarray:
+            return np.moveaxis(array.sum(axis=dropped), order, range(len(order)))
+
+        return type(self)(
+            tuple(dimensions),
+            tuple(self.levels[axis] for axis in axes),
+            self.measures,
+            self.edges,
+            reduce(self.counts),
+            reduce(self.sums),
+            reduce(self.histograms),
+            reduce(self.bin_sums),
+        )
+
+    def index(self, axis: int) -> pd.Index:
+        """Create the index of the levels of a dimension.
+
+        Returns:
+            pd.Index: the levels, named after the dimension.
+
+        """
+        return pd.Index(self.levels[axis], name=self.dimensions[axis])
+
+    def crosstab(self, row: str, column: str) -> pd.DataFrame:
+        """Count the rows per level of two dimensions, as `pd.crosstab`.
+
+        Returns:
+            pd.DataFrame: the contingency table.
+
+        """
+        cube = self.marginal([row, column])
+        return pd.DataFrame(cube.counts, index=cube.index(0), columns=cube.index(1))
+
+    def means(self, by: str) -> pd.DataFrame:
+        """Compute the mean of every measure per level of a dimension.
+
+        Returns:
+            pd.DataFrame: the means, with a row per level.
+
+        """
+        cube = self.marginal([by])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = cube.sums / cube.counts[:, np.newaxis]
+
+        return pd.DataFrame(means, index=cube.index(0), columns=list(self.measures))
+
+    def distribution(self, measure: str, by: str) -> pd.DataFrame:
+        """Get the histogram sketch of a measure per level of a dimension.
+
+        Every non-empty bin is represented by the mean of its values.
+
+        Returns:
+            pd.DataFrame: the level, value and count of every non-empty bin.
+
+        """
+        cube = self.marginal([by])
+        m = self.measures.index(measure)
+        counts = cube.histograms[:, m]
+        level, bin_ = np.nonzero(counts)
+
+        return pd.DataFrame(
+            {
+                by: pd.Categorical.from_codes(level, categories=self.levels_of(by)),
+                "value": cube.bin_sums[level, m, bin_] / counts[level, bin_],
+                "count": counts[level, bin_],
+            },
+        )
+
+    def levels_of(self, dimension: str) -> list:
+        """Get the levels of a dimension.
+
+        Returns:
+            list: the levels.
+
+        """
+        return self.levels[self.dimensions.index(dimension)]
+
+    def save(self, path: str | Path) -> None:
+        """Write the cube to an npz file, replacing it atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(
+                json.dumps(
+                    {
+                        "dimensions": self.dimensions,
+                        "levels": [list(map(_to_json, lv)) for lv in self.levels],
+                        "measures": self.measures,
+                    },
+                ),
+            ),
+            edges=self.edges,
+            counts=self.counts,
+            sums=self.sums,
+            histograms=self.histograms,
+            bin_sums=self.bin_sums,
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Read a cube written by `save`.
+
+        Returns:
+            AggregateCube: the cube.
+
+        """
+        with np.load(path, allow_pickle=False) as saved:
+            meta = json.loads(str(saved["meta"]))
+            return cls(
+                tuple(meta["dimensions"]),
+                tuple(meta["levels"]),
+                tuple(meta["measures"]),
+                saved["edges"],
+                saved["counts"],
+                saved["sums"],
+                saved["histograms"],
+                saved["bin_sums"],
+            )
+
+
+def _to_json(value: object) -> object:
+    """Convert a numpy scalar level to a plain Python value.
+
+    Returns:
+        object: the value.
+
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _dimension_codes(values: pd.Series) -> tuple[np.ndarray, list]:
+    """Encode a dimension as integer codes of its sorted levels.
+
+    Categorical columns keep the order of their categories.
+
+    Returns:
+        tuple[np.ndarray, list]: the codes, -1 where missing, and the levels.
+
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories.tolist()
+
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes, [_to_json(u) for u in uniques]
+
+
+def _measure_values(column: pd.Series, rows: slice, valid: np.ndarray) -> np.ndarray:
+    """Get the float64 values of a measure in a chunk of rows.
+
+    Only the chunk is converted, and measures stored as float32 are rounded
+    back to their recorded decimals, as in `widen_measures`.
+
+    Returns:
+        np.ndarray: the values of the valid rows of the chunk.
+
+    """
+    values = column.to_numpy()[rows][valid].astype(np.float64)
+    if column.dtype == np.float32 and column.name in COLUMNS:
+        np.round(values, COLUMNS[column.name].decimals, out=values)
+
+    return values
+
+
+def _bin_edges(values: pd.Series, n_bins: int) -> np.ndarray:
+    """Create equal-width histogram bins spanning the values of a measure.
+
+    Returns:
+        np.ndarray: the `n_bins + 1` bin edges.
+
+    """
+    low, high = float(values.min()), float(values.max())
+    if values.dtype == np.float32 and values.name in COLUMNS:
+        decimals = COLUMNS[values.name].decimals
+        low, high = round(low, decimals), round(high, decimals)
+    if not low < high:
+        low, high = low - 0.5, high + 0.5
+
+    return np.linspace(low, high, n_bins + 1)
+
+
+@instrument
+def build_cube(
+    df: pd.DataFrame,
+    dimensions: Sequence[str] = DIMENSIONS,
+    measures: Sequence[str] = MEASURES,
+    n_bins: int = N_BINS,
+) -> AggregateCube:
+    """Aggregate a dataset into a cube in one pass over its rows.
+
+    Rows with a missing dimension are not counted, and missing measures are
+    left out of the sums and histograms of their measure only.
+
+    Args:
+        df (pd.DataFrame): the dataset.
+        dimensions (Sequence[str]): the categorical columns to group by.
+        measures (Sequence[str]): the numeric columns to aggregate.
+        n_bins (int): the number of histogram bins of every measure.
+
+    Returns:
+        AggregateCube: the cube.
+
+    """
+    encoded = [_dimension_codes(df[d]) for d in dimensions]
+    shape = tuple(len(levels) for _, levels in encoded)
+    n_cells = int(np.prod(shape))
+    edges = np.stack([_bin_edges(df[m], n_bins) for m in measures])
+
+    counts = np.zeros(n_cells, dtype=np.int64)
+    sums = np.zeros((n_cells, len(measures)))
+    histograms = np.zeros((n_cells, len(measures), n_bins), dtype=np.int64)
+    bin_sums = np.zeros((n_cells, len(measures), n_bins))
+
+    for start in range(0, len(df), CHUNK_ROWS):
+        rows = slice(start, start + CHUNK_ROWS)
+        codes = np.stack([c[rows] for c, _ in encoded])
+        valid = (codes >= 0).all(axis=0)
+        cells = np.ravel_multi_index(codes[:, valid], shape)
+        counts += np.bincount(cells, minlength=n_cells)
+
+        for m, measure in enumerate(measures):
+            values = _measure_values(df[measure], rows, valid)
+            present = ~np.isnan(values)
+            values, cell = values[present], cells[present]
+            low, high = edges[m, 0], edges[m, -1]
+            bins = ((values - low) / (high - low) * n_bins).astype(np.intp)
+            bins = np.clip(bins, 0, n_bins - 1)
+
+            sums[:, m] += np.bincount(cell, weights=values, minlength=n_cells)
+            flat = cell * n_bins + bins
+            histograms[:, m] += np.bincount(
+                flat,
+                minlength=n_cells * n_bins,
+            ).reshape(n_cells, n_bins)
+            bin_sums[:, m] += np.bincount(
+                flat,
+                weights=values,
+                minlength=n_cells * n_bins,
+            ).reshape(n_cells, n_bins)
+
+    return AggregateCube(
+        tuple(dimensions),
+        tuple(levels for _, levels in encoded),
+        tuple(measures),
+        edges,
+        counts.reshape(shape),
+        sums.reshape(*shape, len(measures)),
+        histograms.reshape(*shape, len(measures), n_bins),
+        bin_sums.reshape(*shape, len(measures), n_bins),
+    )
+
+
+def _cache_path(
+    raw_fingerprint: str,
+    dimensions: Sequence[str],
+    measures: Sequence[str],
+    n_bins: int,
+) -> Path:
+    """Find the cache file of the cube of a dataset.
+
+    Returns:
+        Path: the cache file.
+
+    """
+    settings = json.dumps(
+        [SCHEMA_FINGERPRINT, list(dimensions), list(measures), n_bins],
+    )
+    key = hashlib.sha256(f"{raw_fingerprint}{settings}".encode()).hexdigest()
+
+    return Path(CACHE_DIR) / f"{key[:32]}.npz"
+
+
+@instrument
+def load_cube(
+    dimensions: Sequence[str] = DIMENSIONS,
+    measures: Sequence[str] = MEASURES,
+    n_bins: int = N_BINS,
+) -> AggregateCube:
+    """Load the cube of the cleaned dataset, building it if it is missing.
+
+    A saved cube is used without reading the dataset as long as the raw CSV
+    still has the fingerprint recorded in the columnar cache, and the cache has
+    the current schema.
+
+    Returns:
+        AggregateCube: the cube.
+
+    """
+    settings = (dimensions, measures, n_bins)
+    with _build_lock:
+        manifest = read_manifest(prepare_data.CACHE_DIR)
+        if (
+            manifest is not None
+            and manifest.get("schema") == SCHEMA_FINGERPRINT
+            and is_fresh(manifest, prepare_data.RAW_DATA_PATH)
+        ):
+            path = _cache_path(manifest["raw_fingerprint"], *settings)
+            if path.exists():
+                return AggregateCube.load(path)
+
+        df = prepare_data.load_cleaned_data()
+        manifest = read_manifest(prepare_data.CACHE_DIR)
+        cube = build_cube(df, *settings)
+        if manifest is not None:
+            cube.save(_cache_path(manifest["raw_fingerprint"], *settings))
+
+        return cube
+
+
+def weighted_quantiles(
+    values: np.ndarray,
+    counts: np.ndarray,
+    probs: Sequence[float],
+) -> np.ndarray:
+    """Compute quantiles of sorted values that occur a number of times.
+
+    The quantiles are interpolated linearly between order statistics, as the
+    default method of `np.quantile` on the repeated values.
+
+    Returns:
+        np.ndarray: the quantiles.
+
+    """
+    cumulative = np.cumsum(counts)
+    positions = (cumulative[-1] - 1) * np.asarray(probs, dtype=np.float64)
+    lower = np.floor(positions)
+    below = values[np.searchsorted(cumulative, lower, side="right")]
+    above = values[
+        np.searchsorted(
+            cumulative,
+            np.minimum(lower + 1, cumulative[-1] - 1),
+            side="right",
+        )
+    ]
+
+    return below + (above - below) * (positions - lower)
+
+
+def box_stats(distribution: pd.DataFrame, by: str) -> list[dict]:
+    """Compute box plot statistics from a distribution of `cube.distribution`.
+
+    The statistics are those of `matplotlib.cbook.boxplot_stats`, with
+    whiskers at 1.5 times the interquartile range. Outlying values that share
+    a bin are drawn once.
+
+    Returns:
+        list[dict]: the statistics of every level, to draw with `Axes.bxp`.
+
+    """
+    stats = []
+    for level, group in distribution.groupby(by, observed=False, sort=True):
+        values = group["value"].to_numpy()
+        counts = group["count"].to_numpy()
+        if not counts.sum():
+            continue
+
+        q1, med, q3 = weighted_quantiles(values, counts, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - WHISKER * iqr) & (values <= q3 + WHISKER * iqr)]
+        whislo = min(inside.min(initial=q1), q1)
+        whishi = max(inside.max(initial=q3), q3)
+        stats.append(
+            {
+                "label": level,
+                "mean": float(np.average(values, weights=counts)),
+                "med": med,
+                "q1": q1,
+                "q3": q3,
+                "iqr": iqr,
+                "whislo": whislo,
+                "whishi": whishi,
+                "fliers": values[(values < whislo) | (values > whishi)],
+            },
+        )
+
+    return stats
+
+
+def main() -> None:
+    """Build the cube of the cleaned dataset and summarize it."""
+    log_to_file(logger, "results/cube_summary.log")
+    cube = load_cube()
+
+    logger.info("--- Aggregate cube ---")
+    logger.info("Dimensions: %s", ", ".join(cube.dimensions))
+    logger.info("Rows: %d, cells: %d", cube.counts.sum(), cube.counts.size)
+    logger.info("\nParticipants per family history and obesity category:")
+    logger.info(
+        cube.crosstab(
+            "family_history_with_overweight",
+            "Obesity_Category",
+        ).T.to_string(),
+    )
+    logger.info("\nMean per obesity category:")
+    logger.info(cube.means("Obesity_Category").round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,53 @@
 """Generate a plot of obesity vs. family history of overweight."""
 
-import matplotlib.pyplot as plt
 import pandas as pd
+from matplotlib.axes import Axes
 
-df = pd.read_csv("data/obesity_cleaned_final.csv", sep=";")
-crosstab_table = pd.crosstab(
-    df["family_history_with_overweight"],
-    df["Obesity_Category"],
-)
-crosstab_table.index = ["No family history", "Has family history"]
-crosstab_table.columns = [
-    "Insufficient Weight",
-    "Normal Weight",
-    "Overweight I",
-    "Overweight II",
-    "Obesity I",
-    "Obesity II",
-    "Obesity III",
-]
-
-ax = crosstab_table.T.plot(kind="bar")
-ax.set_xlabel("Obesity Level")
-ax.set_ylabel("Number of participants")
-ax.set_title("Obesity vs. family history of overweight")
-plt.xticks(rotation=20)
-plt.tight_layout()
-plt.savefig("results/family_history_vs_obesity.png")
+from src.exploratory_analysis.cube import AggregateCube, load_cube
+from src.exploratory_analysis.rendering import FigureSpec, render
+from src.instrumentation import instrument
+
+FAMILY_HISTORY_PLOT_PATH = "results/family_history_vs_obesity.png"
+
+
+@instrument
+def plot_family_history(ax: Axes, counts: pd.DataFrame) -> None:
+    """Plot the number of participants per obesity level and family history."""
+    crosstab_table = counts.copy()
+    crosstab_table.index = ["No family history", "Has family history"]
+    crosstab_table.columns = [
+        "Insufficient Weight",
+        "Normal Weight",
+        "Overweight I",
+        "Overweight II",
+        "Obesity I",
+        "Obesity II",
+        "Obesity III",
+    ]
+
+    crosstab_table.T.plot(kind="bar", ax=ax)
+    ax.set_xlabel("Obesity Level")
+    ax.set_ylabel("Number of participants")
+    ax.set_title("Obesity vs. family history of overweight")
+    ax.tick_params(axis="x", labelrotation=20)
+    ax.figure.tight_layout()
+
+
+def figures(cube: AggregateCube) -> list[FigureSpec]:
+    """Describe the figures of this analysis.
+
+    Returns:
+        list[FigureSpec]: the figures.
+
+    """
+    counts = cube.crosstab("family_history_with_overweight", "Obesity_Category")
+    return [FigureSpec(FAMILY_HISTORY_PLOT_PATH, plot_family_history, counts)]
+
+
+def main() -> None:
+    """Plot the number of participants per obesity level and family history."""
+    render(figures(load_cube()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 """Generate boxplots of lifestyle variables vs. obesity category."""
 
-import matplotlib.pyplot as plt
+import colorsys
+
 import pandas as pd
-import seaborn as sns
+from matplotlib.axes import Axes
+from matplotlib.colors import to_rgb
 
-plt.ion()
-df = pd.read_csv("data/obesity_cleaned_final.csv", sep=";")
+from src.exploratory_analysis.cube import AggregateCube, box_stats, load_cube
+from src.exploratory_analysis.rendering import FigureSpec, render
+from src.instrumentation import instrument
 
 lifestyle_vars = ["FAF", "FCVC", "TUE", "CALC", "CH2O"]
 titles = {
@@ -16,12 +19,66 @@ titles = {
     "CH2O": "Water intake",
 }
 
-for var in lifestyle_vars:
-    plt.figure(figsize=(10, 6))
-    sns.boxplot(x="Obesity_Category", y=var, data=df)
-    plt.title(f"{titles[var]} vs Obesity Category")
-    plt.xlabel("Obesity Category")
-    plt.ylabel(titles[var])
-    plt.xticks(rotation=20)
-    plt.tight_layout()
-    plt.savefig(f"results/lifestyle_{var}.png")
+
+@instrument
+def plot_lifestyle(
+    ax: Axes,
+    distribution: pd.DataFrame,
+    title: str,
+) -> None:
+    """Plot a boxplot of a lifestyle variable per obesity category.
+
+    The boxes are drawn from the histogram sketch of the aggregate cube, in
+    the style of `sns.boxplot`.
+    """
+    import seaborn as sns  # noqa: PLC0415
+
+    stats = box_stats(distribution, "Obesity_Category")
+    color = sns.desaturate("C0", 0.75)
+    line_color = (colorsys.rgb_to_hls(*to_rgb(color))[1] * 0.6,) * 3
+    ax.bxp(
+        stats,
+        positions=range(len(stats)),
+        widths=0.8,
+        capwidths=0.4,
+        patch_artist=True,
+        boxprops={"facecolor": color, "edgecolor": line_color},
+        medianprops={"color": line_color},
+        whiskerprops={"color": line_color},
+        capprops={"color": line_color},
+        flierprops={"markeredgecolor": line_color},
+    )
+    ax.set_xticks(range(len(stats)), [s["label"] for s in stats])
+    ax.set_title(f"{title} vs Obesity Category")
+    ax.set_xlabel("Obesity Category")
+    ax.set_ylabel(title)
+    ax.tick_params(axis="x", labelrotation=20)
+    ax.figure.tight_layout()
+
+
+def figures(cube: AggregateCube) -> list[FigureSpec]:
+    """Describe a boxplot of every lifestyle variable per obesity category.
+
+    Returns:
+        list[FigureSpec]: the figures.
+
+    """
+    return [
+        FigureSpec(
+            f"results/lifestyle_{var}.png",
+            plot_lifestyle,
+            cube.distribution(var, "Obesity_Category"),
+            {"title": titles[var]},
+            figsize=(10, 6),
+        )
+        for var in lifestyle_vars
+    ]
+
+
+def main() -> None:
+    """Plot a boxplot of every lifestyle variable per obesity category."""
+    render(figures(load_cube()))
+
+
+if __name__ == "__main__":
+    main()
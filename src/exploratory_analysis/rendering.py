@@ -0,0 +1,224 @@
+"""Render figures in worker processes, skipping figures that are up to date.
+
+A figure is described by a `FigureSpec`: a module-level drawing function, the
+slice of the data it draws and its parameters. The figure is drawn on a
+`matplotlib.figure.Figure` of its own with the non-interactive Agg canvas, so
+it does not use the global state of pyplot and figures can be drawn
+concurrently.
+
+Every figure is keyed on a hash of its data, parameters and the source of its
+drawing function. The keys of the figures written are kept in a manifest in
+the output directory, and a figure whose key is unchanged and whose file still
+exists is not drawn again.
+
+Copyright (C) 2025.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import matplotlib as mpl
+from matplotlib.figure import Figure
+
+from src.data_preparation.columnar_cache import fingerprint_frame
+from src.exploratory_analysis.cube import AggregateCube, load_cube
+from src.instrumentation import instrument
+from src.modeling.parallel import make_executor
+from src.reporting import log_to_file
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    import pandas as pd
+    from matplotlib.axes import Axes
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".figure_manifest.json"
+FIGURE_MODULES = (
+    "src.exploratory_analysis.family_history",
+    "src.exploratory_analysis.lifestyle",
+    "src.exploratory_analysis.contingency_heatmap",
+)
+
+# Stages of the pipeline render from threads of one process
+_manifest_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    """A figure to render.
+
+    `draw(ax, data, **params)` draws the figure on `ax`. It must be defined at
+    the top level of a module, so that worker processes can import it. The
+    data is usually a small aggregate of the `AggregateCube`.
+    """
+
+    path: str
+    draw: Callable[..., None]
+    data: pd.DataFrame
+    params: dict = field(default_factory=dict)
+    figsize: tuple[float, float] | None = None
+
+    def key(self) -> str:
+        """Hash everything that determines the figure.
+
+        Returns:
+            str: the hex SHA-256 digest of the figure.
+
+        """
+        digest = hashlib.sha256()
+        for part in (
+            f"{self.draw.__module__}.{self.draw.__qualname__}",
+            inspect.getsource(self.draw),
+            fingerprint_frame(self.data.reset_index()),
+            json.dumps(self.params, sort_keys=True, default=str),
+            json.dumps(self.figsize),
+            mpl.__version__,
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+
+        return digest.hexdigest()
+
+
+def _manifest_path(path: str | Path) -> Path:
+    """Find the manifest of the directory of a figure.
+
+    Returns:
+        Path: the path of the manifest.
+
+    """
+    return Path(path).parent / MANIFEST_NAME
+
+
+def _read_manifest(path: Path) -> dict[str, str]:
+    """Read the keys of the figures written to a directory.
+
+    Returns:
+        dict[str, str]: the key of every figure path.
+
+    """
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _record(rendered: dict[str, str]) -> None:
+    """Add the keys of newly rendered figures to their manifests."""
+    by_manifest: dict[Path, dict[str, str]] = {}
+    for path, key in rendered.items():
+        by_manifest.setdefault(_manifest_path(path), {})[path] = key
+
+    with _manifest_lock:
+        for manifest_path, keys in by_manifest.items():
+            manifest = _read_manifest(manifest_path) | keys
+            manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def _init_worker() -> None:
+    """Select the non-interactive backend in a worker."""
+    mpl.use("Agg")
+
+
+def _render(spec: FigureSpec) -> str:
+    """Draw a figure and write it to its file.
+
+    Returns:
+        str: the path of the figure.
+
+    """
+    figure = Figure(figsize=spec.figsize)
+    ax: Axes = figure.subplots()
+    spec.draw(ax, spec.data, **spec.params)
+    Path(spec.path).parent.mkdir(parents=True, exist_ok=True)
+    figure.savefig(spec.path)
+
+    return spec.path
+
+
+@instrument
+def render(
+    specs: Sequence[FigureSpec],
+    max_workers: int | None = None,
+    *,
+    force: bool = False,
+) -> dict[str, str]:
+    """Render the figures that are not up to date.
+
+    Args:
+        specs (Sequence[FigureSpec]): the figures.
+        max_workers (int | None): the number of worker processes; by default
+            one per CPU, but never more than the number of figures to render.
+        force (bool): whether to render figures that are up to date.
+
+    Returns:
+        dict[str, str]: "rendered" or "cached" for every figure path.
+
+    """
+    keys = {spec.path: spec.key() for spec in specs}
+    with _manifest_lock:
+        manifests = {
+            manifest_path: _read_manifest(manifest_path)
+            for manifest_path in {_manifest_path(spec.path) for spec in specs}
+        }
+    stale = [
+        spec
+        for spec in specs
+        if force
+        or not Path(spec.path).exists()
+        or manifests[_manifest_path(spec.path)].get(spec.path) != keys[spec.path]
+    ]
+
+    status = dict.fromkeys(keys, "cached")
+    if stale:
+        n_workers = min(max_workers or os.cpu_count() or 1, len(stale))
+        with make_executor(n_workers, _init_worker, (), preload=__name__) as pool:
+            for path in pool.map(_render, stale):
+                status[path] = "rendered"
+                logger.info("Rendered %s", path)
+        _record({spec.path: keys[spec.path] for spec in stale})
+
+    return status
+
+
+def render_all(
+    cube: AggregateCube,
+    max_workers: int | None = None,
+) -> dict[str, str]:
+    """Render the figures of all exploratory analysis modules at once.
+
+    Returns:
+        dict[str, str]: "rendered" or "cached" for every figure path.
+
+    """
+    specs = [
+        spec
+        for module in FIGURE_MODULES
+        for spec in importlib.import_module(module).figures(cube)
+    ]
+    return render(specs, max_workers)
+
+
+def main() -> None:
+    """Render all exploratory figures of the cleaned dataset."""
+    log_to_file(logger, "results/figures_summary.log")
+    status = render_all(load_cube())
+    n_rendered = sum(s == "rendered" for s in status.values())
+    n_cached = len(status) - n_rendered
+    logger.info("%d figures rendered, %d up to date", n_rendered, n_cached)
+
+
+if __name__ == "__main__":
+    main()
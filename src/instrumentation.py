@@ -0,0 +1,271 @@
+"""Record where the analysis spends its time and memory.
+
+Functions decorated with `instrument`, and blocks wrapped in `span`, are
+recorded as spans of the global `TRACER`: their wall time, CPU time of the
+calling thread, the peak resident memory of the process, the number of rows
+they processed, and the iterations and function evaluations of optimizers.
+Spans nest, so every span knows the stack of spans it was called from.
+
+The trace is written as JSON with `Tracer.write_trace`, and as a profile of
+folded stacks with `Tracer.write_folded`, which `flamegraph.pl`, speedscope
+and similar tools draw as a flame graph.
+
+Recording a span takes a few microseconds, so the instrumentation is meant to
+stay enabled. Spans of worker processes are not recorded.
+
+Copyright (C) 2025.
+"""
+
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+
+TRACE_DIR = "results/traces"
+
+# ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_mb() -> float:
+    """Get the peak resident memory of the process so far.
+
+    Returns:
+        float: the peak resident set size in MB.
+
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT / 2**20
+
+
+@dataclass
+class Span:
+    """A recorded call of an instrumented function or block."""
+
+    name: str
+    stack: tuple[str, ...]
+    thread: str
+    start_s: float
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    children_wall_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    rss_growth_mb: float = 0.0
+    rows: int | None = None
+    iterations: int | None = None
+    evaluations: int | None = None
+    error: str | None = None
+
+    @property
+    def self_s(self) -> float:
+        """Return the wall time spent outside of nested spans."""
+        return max(self.wall_s - self.children_wall_s, 0.0)
+
+
+@dataclass
+class Tracer:
+    """Collect the spans of a run."""
+
+    enabled: bool = True
+    spans: list[Span] = field(default_factory=list)
+    started: datetime = field(default_factory=lambda: datetime.now(UTC))
+    _origin: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def clear(self) -> None:
+        """Forget all spans and restart the clock."""
+        with self._lock:
+            self.spans = []
+            self.started = datetime.now(UTC)
+            self._origin = time.perf_counter()
+
+    def elapsed(self) -> float:
+        """Return the seconds since the run started."""
+        return time.perf_counter() - self._origin
+
+    def record(self, span: Span) -> None:
+        """Add a finished span."""
+        with self._lock:
+            self.spans.append(span)
+
+    def trace(self) -> dict:
+        """Describe the run and all of its spans.
+
+        Returns:
+            dict: the trace, ready to be written as JSON.
+
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "argv": sys.argv,
+            "peak_rss_mb": peak_rss_mb(),
+            "spans": [{**asdict(s), "self_s": s.self_s} for s in spans],
+        }
+
+    def folded(self) -> list[str]:
+        """Sum the time spent in every stack of spans.
+
+        Returns:
+            list[str]: lines of `name;name;name microseconds`, the folded stack
+                format of flame graph tools.
+
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        totals: dict[str, int] = {}
+        for span in spans:
+            stack = ";".join(span.stack)
+            totals[stack] = totals.get(stack, 0) + round(span.self_s * 1e6)
+
+        return [f"{stack} {micros}" for stack, micros in sorted(totals.items())]
+
+    def write_trace(self, path: str | Path) -> None:
+        """Write the trace as JSON."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with Path(path).open("w") as f:
+            json.dump(self.trace(), f, indent=1)
+
+    def write_folded(self, path: str | Path) -> None:
+        """Write the folded stacks of a flame graph."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text("".join(f"{line}\n" for line in self.folded()))
+
+    def default_path(self, suffix: str) -> Path:
+        """Name a file of this run in the trace directory.
+
+        Returns:
+            Path: the path of the file.
+
+        """
+        name = f"{self.started:%Y%m%dT%H%M%S}_{os.getpid()}{suffix}"
+        return Path(TRACE_DIR) / name
+
+
+TRACER = Tracer()
+
+# The spans that are running in the current thread or task, innermost last
+_active: ContextVar[tuple[Span, ...]] = ContextVar("active_spans", default=())
+
+
+@contextmanager
+def span(name: str, rows: int | None = None) -> Iterator[Span | None]:
+    """Record a block of code as a span.
+
+    The span is yielded, so the block can set e.g. its number of rows.
+
+    Yields:
+        Span | None: the running span, or None if the tracer is disabled.
+
+    """
+    if not TRACER.enabled:
+        yield None
+        return
+
+    parents = _active.get()
+    current = Span(
+        name=name,
+        stack=(*(p.name for p in parents), name),
+        thread=threading.current_thread().name,
+        start_s=TRACER.elapsed(),
+        rows=rows,
+    )
+    token = _active.set((*parents, current))
+    rss_before = peak_rss_mb()
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.wall_s = time.perf_counter() - wall
+        current.cpu_s = time.thread_time() - cpu
+        current.peak_rss_mb = peak_rss_mb()
+        current.rss_growth_mb = current.peak_rss_mb - rss_before
+        _active.reset(token)
+        if parents:
+            parents[-1].children_wall_s += current.wall_s
+        TRACER.record(current)
+
+
+def _rows(value: object) -> int | None:
+    """Count the rows of a table or array.
+
+    Returns:
+        int | None: the length of the first axis, or None for other values.
+
+    """
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple) and shape:
+        return int(shape[0])
+
+    return None
+
+
+def _optimizer_counts(result: object) -> tuple[int | None, int | None]:
+    """Find the iterations and function evaluations of a fitted model.
+
+    Both statsmodels results, which report them in `mle_retvals`, and results
+    with `iterations` and `evaluations` attributes are understood.
+
+    Returns:
+        tuple[int | None, int | None]: the iterations and evaluations.
+
+    """
+    retvals = getattr(result, "mle_retvals", None)
+    if isinstance(retvals, dict):
+        counts = retvals.get("iterations"), retvals.get("fcalls")
+    else:
+        counts = (
+            getattr(result, "iterations", None),
+            getattr(result, "evaluations", None),
+        )
+
+    return tuple(None if c is None else int(c) for c in counts)
+
+
+def instrument(func: Callable | None = None, *, name: str | None = None) -> Callable:
+    """Record every call of a function as a span.
+
+    The rows of a call are those of its first table or array argument, or of
+    its result. Can be used as `@instrument` or `@instrument(name=...)`.
+
+    Returns:
+        Callable: the instrumented function, or a decorator.
+
+    """
+
+    def decorate(func: Callable) -> Callable:
+        module = func.__module__.rsplit(".", 1)[-1]
+        span_name = name or f"{module}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: object, **kwargs: object) -> object:
+            with span(span_name) as current:
+                result = func(*args, **kwargs)
+                if current is not None:
+                    arguments = (*args, *kwargs.values())
+                    rows = [r for r in map(_rows, arguments) if r is not None]
+                    current.rows = rows[0] if rows else _rows(result)
+                    current.iterations, current.evaluations = _optimizer_counts(
+                        result,
+                    )
+
+            return result
+
+        return wrapper
+
+    return decorate if func is None else decorate(func)
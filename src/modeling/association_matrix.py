@@ -0,0 +1,285 @@
+"""Screen every pair of categorical variables for association.
+
+All variables are encoded once as small integer codes. The contingency tables
+of all pairs are then counted together: every pair gets its own block of
+cells, and one `bincount` over the joint codes of all pairs fills every table
+at once. Rows are processed in chunks, so memory does not grow with the size
+of the dataset.
+
+Results are cached on disk, keyed on the fingerprint of the screened data and
+the screening settings.
+
+Copyright (C) 2025.
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+from src.data_preparation.columnar_cache import fingerprint_frame
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.reporting import log_to_file
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "data/cache/associations"
+CHUNK_ROWS = 100_000
+
+CATEGORICAL_COLUMNS = [
+    "Gender",
+    "family_history_with_overweight",
+    "FAVC",
+    "SMOKE",
+    "SCC",
+    "CAEC",
+    "CALC",
+    "MTRANS_Automobile",
+    "MTRANS_Bike",
+    "MTRANS_Motorbike",
+    "MTRANS_Public_Transportation",
+    "MTRANS_Walking",
+    "Obesity_Level",
+    "Obese_Binary",
+]
+
+# Continuous columns screened after binning into (at most) this many quantiles
+BINNED_COLUMNS = {
+    "Age": 4,
+    "FCVC": 3,
+    "NCP": 3,
+    "CH2O": 3,
+    "FAF": 4,
+    "TUE": 3,
+}
+
+
+@dataclass
+class AssociationMatrix:
+    """Pairwise chi-square tests of independence between variables."""
+
+    chi2: pd.DataFrame
+    p_value: pd.DataFrame
+    dof: pd.DataFrame
+    cramers_v: pd.DataFrame
+    p_adjusted: pd.DataFrame | None = None
+
+    def pairs(self) -> pd.DataFrame:
+        """List every pair of variables once, strongest association first.
+
+        Returns:
+            pd.DataFrame: the statistics of every pair.
+
+        """
+        first, second = np.triu_indices(len(self.chi2), k=1)
+        stats = {
+            "chi2": self.chi2,
+            "dof": self.dof,
+            "p_value": self.p_value,
+            "p_adjusted": self.p_adjusted,
+            "cramers_v": self.cramers_v,
+        }
+        table = pd.DataFrame(
+            {
+                name: matrix.to_numpy()[first, second]
+                for name, matrix in stats.items()
+                if matrix is not None
+            },
+            index=pd.MultiIndex.from_arrays(
+                [self.chi2.index[first], self.chi2.columns[second]],
+            ),
+        )
+        table["dof"] = table["dof"].astype(int)
+
+        return table.sort_values("cramers_v", ascending=False)
+
+
+def encode_columns(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    bins: Mapping[str, int] | None = None,
+) -> tuple[np.ndarray, list[str]]:
+    """Encode columns as integer codes, binning continuous columns by quantile.
+
+    Returns:
+        tuple[np.ndarray, list[str]]: the (rows x columns) codes and the names
+            of the encoded columns.
+
+    Raises:
+        ValueError: if a column has missing values, whose -1 code would be
+            counted in another cell of the contingency tables.
+
+    """
+    bins = bins or {}
+    missing = [column for column in [*columns, *bins] if df[column].isna().any()]
+    if missing:
+        msg = f"Columns {missing} have missing values"
+        raise ValueError(msg)
+
+    names = [*columns, *(f"{column}_binned" for column in bins)]
+    codes = np.empty((len(df), len(names)), dtype=np.int16)
+    for i, column in enumerate(columns):
+        codes[:, i] = pd.factorize(df[column], sort=True)[0]
+    for i, (column, n_bins) in enumerate(bins.items(), start=len(columns)):
+        codes[:, i] = pd.qcut(df[column], n_bins, labels=False, duplicates="drop")
+
+    return codes, names
+
+
+def pair_tables(codes: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> list[np.ndarray]:
+    """Count the contingency table of every pair of encoded columns.
+
+    Returns:
+        list[np.ndarray]: the tables of all pairs (i, j) with i < j, in the
+            order of `np.triu_indices`.
+
+    """
+    n_levels = codes.max(axis=0).astype(np.intp) + 1
+    first, second = np.triu_indices(codes.shape[1], k=1)
+    sizes = n_levels[first] * n_levels[second]
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    counts = np.zeros(sizes.sum(), dtype=np.int64)
+    for start in range(0, len(codes), chunk_rows):
+        chunk = codes[start : start + chunk_rows].astype(np.intp)
+        joint = chunk[:, first] * n_levels[second] + chunk[:, second] + offsets
+        counts += np.bincount(joint.ravel(), minlength=len(counts))
+
+    return [
+        counts[offset : offset + size].reshape(n_levels[i], n_levels[j])
+        for offset, size, i, j in zip(offsets, sizes, first, second, strict=True)
+    ]
+
+
+def _cache_path(
+    df: pd.DataFrame,
+    columns: Sequence[str],
+    bins: Mapping[str, int],
+    correction: str | None,
+) -> Path:
+    """Find the cache file of a screening of a dataset.
+
+    Returns:
+        Path: the cache file.
+
+    """
+    settings = json.dumps([list(columns), dict(bins), correction])
+    fingerprint = fingerprint_frame(df[[*columns, *bins]])
+    key = hashlib.sha256(f"{fingerprint}{settings}".encode()).hexdigest()
+
+    return Path(CACHE_DIR) / f"{key[:32]}.npz"
+
+
+def association_matrix(
+    df: pd.DataFrame,
+    columns: Sequence[str] = CATEGORICAL_COLUMNS,
+    bins: Mapping[str, int] | None = None,
+    correction: str | None = None,
+    *,
+    use_cache: bool = True,
+) -> AssociationMatrix:
+    """Test every pair of variables for independence.
+
+    Args:
+        df (pd.DataFrame): the dataset.
+        columns (Sequence[str]): the categorical columns to screen.
+        bins (Mapping[str, int] | None): continuous columns to screen after
+            binning, with their number of quantile bins.
+        correction (str | None): a multiple-testing correction method of
+            `statsmodels.stats.multitest.multipletests`, e.g. "holm" or
+            "fdr_bh", applied to the p-values of all pairs.
+        use_cache (bool): whether to read and write the on-disk cache.
+
+    Returns:
+        AssociationMatrix: the statistics of every pair.
+
+    """
+    bins = dict(bins or {})
+    cache_path = _cache_path(df, columns, bins, correction)
+    if use_cache and cache_path.exists():
+        with np.load(cache_path, allow_pickle=False) as cached:
+            names = list(cached["names"])
+            matrices = {key: cached[key] for key in cached.files if key != "names"}
+    else:
+        codes, names = encode_columns(df, columns, bins)
+        matrices = _association_statistics(codes, correction)
+        if use_cache:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_path, names=np.array(names), **matrices)
+
+    frames = {
+        key: pd.DataFrame(matrix, index=names, columns=names)
+        for key, matrix in matrices.items()
+    }
+    return AssociationMatrix(**frames)
+
+
+def _association_statistics(
+    codes: np.ndarray,
+    correction: str | None,
+) -> dict[str, np.ndarray]:
+    """Compute the test statistics of every pair of encoded columns.
+
+    Returns:
+        dict[str, np.ndarray]: the symmetric matrices of every statistic.
+
+    """
+    n_rows, n_columns = codes.shape
+    first, second = np.triu_indices(n_columns, k=1)
+
+    stats = np.full((4, len(first)), np.nan)
+    for k, table in enumerate(pair_tables(codes)):
+        # Levels that do not occur (e.g. empty quantile bins) are dropped
+        table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]  # noqa: PLW2901
+        expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n_rows
+        stat = np.sum((table - expected) ** 2 / expected)
+        dof = (table.shape[0] - 1) * (table.shape[1] - 1)
+        min_dim = min(table.shape) - 1
+        stats[:, k] = [
+            stat,
+            dof,
+            chi2.sf(stat, dof) if dof > 0 else np.nan,
+            np.sqrt(stat / (n_rows * min_dim)) if min_dim > 0 else np.nan,
+        ]
+
+    names = ["chi2", "dof", "p_value", "cramers_v"]
+    if correction is not None:
+        from statsmodels.stats.multitest import multipletests  # noqa: PLC0415
+
+        valid = ~np.isnan(stats[2])
+        adjusted = np.full(len(first), np.nan)
+        adjusted[valid] = multipletests(stats[2][valid], method=correction)[1]
+        stats = np.vstack((stats, adjusted))
+        names.append("p_adjusted")
+
+    matrices = {}
+    for name, values in zip(names, stats, strict=True):
+        matrix = np.full((n_columns, n_columns), np.nan)
+        matrix[first, second] = values
+        matrix[second, first] = values
+        matrices[name] = matrix
+
+    return matrices
+
+
+def main() -> None:
+    """Screen all categorical and binned variables and log the associations."""
+    log_to_file(logger, "results/association_matrix_summary.log")
+    df = load_cleaned_data()
+
+    result = association_matrix(df, bins=BINNED_COLUMNS, correction="holm")
+
+    logger.info("--- Cramer's V ---")
+    logger.info(result.cramers_v.round(2).to_string())
+    logger.info("\n--- Pairs by Strength of Association (Holm-adjusted p) ---")
+    logger.info(result.pairs().to_string(float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,45 @@
 Copyright (C) 2025.
 """
 
+from __future__ import annotations
+
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.data_preparation.prepare_data import (
+    CHUNKSIZE,
+    iter_cleaned_data,
+    load_cleaned_data,
+)
+from src.instrumentation import instrument
+from src.modeling.design_matrix import (
+    PREDICTORS,
+    DesignSpec,
+    build_design,
+    design_matrix,
+)
+from src.modeling.fit_cache import FIT_CACHE, fit_key
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
-import pandas as pd
-import statsmodels.api as sm
-from statsmodels.discrete.discrete_model import LogitResults
+    import pandas as pd
+    from statsmodels.discrete.discrete_model import LogitResults
+
+    from src.modeling.logit_newton import LogitFit
 
 DATASET_PATH = "data/obesity_cleaned_final.csv"
 
+# Options of the statsmodels solver
+LOGIT_OPTIONS = {"method": "newton", "maxiter": 35}
+
+# The constant and predictors, for fits that take them as one array
+DESIGN = DesignSpec(tuple(PREDICTORS), intercept=True)
 
+
+@instrument
 def read_data(filename: str) -> pd.DataFrame:
     """Read the dataset.
 
@@ -19,9 +49,10 @@ def read_data(filename: str) -> pd.DataFrame:
         pd.DataFrame: the dataset as a pandas dataframe.
 
     """
-    return pd.read_csv(filename, sep=";")
+    return load_cleaned_data(filename)
 
 
+@instrument
 def prepare_for_binary_regression(
     df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -34,48 +65,81 @@ def prepare_for_binary_regression(
     # Binary target
     y: pd.DataFrame = df["Obese_Binary"]
 
-    # Predictors
-    x: pd.DataFrame = df[
-        [
-            "Gender",
-            "Age",
-            "Height",
-            "Weight",
-            "family_history_with_overweight",
-            "FAVC",
-            "FCVC",
-            "NCP",
-            "CAEC",
-            "SMOKE",
-            "CH2O",
-            "SCC",
-            "FAF",
-            "TUE",
-            "CALC",
-            "MTRANS_Automobile",
-            "MTRANS_Bike",
-            "MTRANS_Motorbike",
-            "MTRANS_Public_Transportation",
-        ]
-    ]
+    # Predictors, a view of the shared design matrix
+    x: pd.DataFrame = design_matrix(df).frame(PREDICTORS)
 
     return x, y
 
 
+@instrument
 def run_binary_logistic_regression(
     x: pd.DataFrame,
     y: pd.DataFrame,
 ) -> LogitResults:
     """Run binary logistic regression on the given target and predictors.
 
+    A fit of the same data and predictors is read from the fit cache instead
+    of being fitted again.
+
     Returns:
         sm.Logit: the results of the binary logistic regression
 
     """
+    import statsmodels  # noqa: PLC0415
+    import statsmodels.api as sm  # noqa: PLC0415
+
+    from src.modeling.logit_newton import LogitFit, logit_results  # noqa: PLC0415
+
     x = sm.add_constant(x)
     model = sm.Logit(y, x)
 
-    return model.fit()
+    options = LOGIT_OPTIONS | {"statsmodels": statsmodels.__version__}
+    key = fit_key("logit", model.exog, model.endog, model.exog_names, options)
+    if (fit := FIT_CACHE.get(key, LogitFit)) is not None:
+        return logit_results(model, fit)
+
+    result = model.fit(**LOGIT_OPTIONS)
+    FIT_CACHE.put(
+        key,
+        LogitFit(
+            params=np.asarray(result.params),
+            cov_params=np.asarray(result.normalized_cov_params),
+            llf=result.llf,
+            iterations=result.mle_retvals["iterations"],
+            converged=result.mle_retvals["converged"],
+        ),
+    )
+
+    return result
+
+
+@instrument
+def run_binary_logistic_regression_out_of_core(
+    path: str | Path = DATASET_PATH,
+    chunksize: int = CHUNKSIZE,
+) -> LogitFit:
+    """Run binary logistic regression without holding the dataset in memory.
+
+    Every Newton iteration streams the cleaned dataset in chunks and sums the
+    gradient and Hessian of every chunk, so memory use does not grow with the
+    number of rows. The estimates match `run_binary_logistic_regression`.
+
+    Args:
+        path (str | Path): the cleaned dataset.
+        chunksize (int): the number of rows read at once.
+
+    Returns:
+        LogitFit: the estimates of the constant and the `PREDICTORS`.
+
+    """
+    from src.modeling.logit_newton import fit_logit_chunked  # noqa: PLC0415
+
+    def chunks() -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        for df in iter_cleaned_data(path, chunksize):
+            x_values = build_design(df, DESIGN).array()
+            yield x_values, df["Obese_Binary"].to_numpy(np.float64)
+
+    return fit_logit_chunked(chunks, len(PREDICTORS) + 1)
 
 
 def main() -> None:
@@ -0,0 +1,397 @@
+"""Bootstrap confidence intervals for the binary and ordinal logit models.
+
+Resamples are drawn as matrices of resample counts, one row per replicate, and
+used as observation weights, so the data itself is never copied. Replicates
+are drawn in batches and fitted starting from the estimates on the full data.
+Only binary models are fitted a batch at a time, with the batched Newton
+solver; the replicates of an ordinal model are fitted one weighted Newton fit
+at a time within their batch. Batches are spread over a process pool.
+
+Every batch has its own random stream spawned from the seed, so results do not
+depend on the number of workers or the order in which batches finish. Finished
+batches can be written to a checkpoint directory, and a bootstrap that is
+started again with the same settings and data only fits the missing batches.
+
+Copyright (C) 2025.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from src.data_preparation.columnar_cache import fingerprint_frame
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.modeling.logit_newton import fit_logit, fit_logit_batch
+from src.modeling.ordinal_logistic_regression import prepare_for_ordinal_regression
+from src.modeling.ordinal_newton import (
+    fit_ordinal_logit,
+    link_derivatives,
+    loglike_derivatives,
+    threshold_jacobian,
+    thresholds_from_params,
+)
+from src.modeling.parallel import make_executor
+
+logger = logging.getLogger(__name__)
+
+N_RESAMPLES = 2000
+BATCH_SIZE = 100
+CHECKPOINT_DIR = "results/bootstrap_checkpoint"
+INTERVALS_PATH = "results/ordinal_bootstrap_intervals.csv"
+
+
+@dataclass
+class BootstrapResult:
+    """The bootstrap replicates of the estimates of a model."""
+
+    estimates: pd.Series
+    replicates: pd.DataFrame
+    converged: np.ndarray
+    acceleration: pd.Series
+
+    def percentile_interval(self, alpha: float = 0.05) -> pd.DataFrame:
+        """Compute percentile confidence intervals.
+
+        Returns:
+            pd.DataFrame: the lower and upper bounds of every parameter.
+
+        """
+        replicates = self.replicates[self.converged]
+        return pd.DataFrame(
+            {
+                "lower": replicates.quantile(alpha / 2),
+                "upper": replicates.quantile(1 - alpha / 2),
+            },
+        )
+
+    def bca_interval(self, alpha: float = 0.05) -> pd.DataFrame:
+        """Compute bias-corrected and accelerated (BCa) confidence intervals.
+
+        Returns:
+            pd.DataFrame: the lower and upper bounds of every parameter.
+
+        """
+        from scipy.stats import norm  # noqa: PLC0415
+
+        replicates = self.replicates[self.converged].to_numpy()
+        estimates = self.estimates.to_numpy()
+        accel = self.acceleration.to_numpy()
+
+        # Keep the share strictly inside (0, 1), so that the bias stays finite
+        # when every replicate falls on one side of the estimate
+        n = len(replicates)
+        below = np.mean(replicates < estimates, axis=0)
+        bias = norm.ppf(np.clip(below, 1 / (n + 1), n / (n + 1)))
+
+        bounds = {}
+        for name, quantile in [("lower", alpha / 2), ("upper", 1 - alpha / 2)]:
+            z = bias + norm.ppf(quantile)
+            adjusted = norm.cdf(bias + z / (1 - accel * z))
+            bounds[name] = [
+                np.quantile(replicates[:, i], q) for i, q in enumerate(adjusted)
+            ]
+
+        return pd.DataFrame(bounds, index=self.estimates.index)
+
+
+# Data shared by all batches in a worker process
+_worker_data: dict = {}
+
+
+def _init_worker(
+    kind: str,
+    x: np.ndarray,
+    y: np.ndarray,
+    estimates: np.ndarray,
+    n_levels: int,
+) -> None:
+    """Store the data of the fits in a worker process."""
+    _worker_data.update(kind=kind, x=x, y=y, estimates=estimates, n_levels=n_levels)
+
+
+def resample_counts(
+    rng: np.random.Generator,
+    n_resamples: int,
+    n_rows: int,
+) -> np.ndarray:
+    """Draw resamples with replacement as counts of every row.
+
+    Returns:
+        np.ndarray: the (resamples x rows) resample counts.
+
+    """
+    draws = rng.integers(0, n_rows, size=(n_resamples, n_rows))
+    draws += np.arange(n_resamples)[:, None] * n_rows
+    counts = np.bincount(draws.ravel(), minlength=n_resamples * n_rows)
+
+    return counts.reshape(n_resamples, n_rows).astype(np.float64)
+
+
+def _fit_batch(
+    seed: np.random.SeedSequence,
+    n_resamples: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw and fit one batch of bootstrap replicates.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the estimates of the replicates and
+            whether every fit converged.
+
+    """
+    x, y, estimates = _worker_data["x"], _worker_data["y"], _worker_data["estimates"]
+    weights = resample_counts(np.random.default_rng(seed), n_resamples, len(y))
+
+    if _worker_data["kind"] == "binary":
+        return fit_logit_batch(x, y, weights, start_params=estimates)
+
+    fits = [
+        fit_ordinal_logit(
+            x,
+            y,
+            n_levels=_worker_data["n_levels"],
+            start_params=estimates,
+            weights=w,
+        )
+        for w in weights
+    ]
+    return (
+        np.array([fit.params for fit in fits]),
+        np.array([fit.converged for fit in fits]),
+    )
+
+
+def _acceleration(influence: np.ndarray) -> np.ndarray:
+    """Compute the BCa acceleration from the empirical influence of every row.
+
+    Returns:
+        np.ndarray: the acceleration of every parameter.
+
+    """
+    centered = influence - influence.mean(axis=0)
+    return np.sum(centered**3, axis=0) / (6 * np.sum(centered**2, axis=0) ** 1.5)
+
+
+def _run_bootstrap(  # noqa: PLR0913
+    kind: str,
+    x: np.ndarray,
+    y: np.ndarray,
+    estimates: np.ndarray,
+    *,
+    n_levels: int,
+    n_resamples: int,
+    batch_size: int,
+    seed: int,
+    max_workers: int | None,
+    checkpoint_dir: str | Path | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit all batches of replicates, reusing checkpointed batches.
+
+    Raises:
+        ValueError: if the checkpoint was written with different settings.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the estimates of all replicates and
+            whether every fit converged.
+
+    """
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    batches: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = Path(checkpoint_dir)
+        checkpoint.mkdir(parents=True, exist_ok=True)
+        settings = {
+            "kind": kind,
+            "n_params": len(estimates),
+            "n_rows": len(y),
+            "n_resamples": n_resamples,
+            "batch_size": batch_size,
+            "seed": seed,
+            "x": fingerprint_frame(pd.DataFrame(x, copy=False)),
+            "y": fingerprint_frame(pd.DataFrame({"y": y}, copy=False)),
+        }
+        settings_path = checkpoint / "settings.json"
+        if settings_path.exists():
+            with settings_path.open() as f:
+                if json.load(f) != settings:
+                    msg = f"{checkpoint} holds a bootstrap with other settings"
+                    raise ValueError(msg)
+        else:
+            with settings_path.open("w") as f:
+                json.dump(settings, f)
+
+        for path in checkpoint.glob("batch_*.npz"):
+            with np.load(path) as saved:
+                batches[int(path.stem.removeprefix("batch_"))] = (
+                    saved["params"],
+                    saved["converged"],
+                )
+        if batches:
+            logger.info("Resuming bootstrap from %d saved batches", len(batches))
+
+    executor = make_executor(
+        max_workers,
+        _init_worker,
+        (kind, x, y, estimates, n_levels),
+        preload=__name__,
+    )
+    with executor:
+        futures = {
+            executor.submit(_fit_batch, seeds[i], size): i
+            for i, size in enumerate(sizes)
+            if i not in batches
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            batches[i] = future.result()
+            if checkpoint is not None:
+                # Written to a temporary file first, so that a crash never
+                # leaves a truncated batch behind
+                tmp_path = checkpoint / f"tmp_{i:05d}.{os.getpid()}.npz"
+                np.savez(tmp_path, params=batches[i][0], converged=batches[i][1])
+                tmp_path.replace(checkpoint / f"batch_{i:05d}.npz")
+
+    params = np.concatenate([batches[i][0] for i in range(len(sizes))])
+    converged = np.concatenate([batches[i][1] for i in range(len(sizes))])
+    if not converged.all():
+        logger.warning(
+            "%d of %d bootstrap fits did not converge and are left out",
+            np.sum(~converged),
+            len(converged),
+        )
+
+    return params, converged
+
+
+def bootstrap_binary_logit(  # noqa: PLR0913
+    x: pd.DataFrame,
+    y: pd.Series,
+    *,
+    n_resamples: int = N_RESAMPLES,
+    batch_size: int = BATCH_SIZE,
+    seed: int = 0,
+    max_workers: int | None = None,
+    checkpoint_dir: str | Path | None = None,
+) -> BootstrapResult:
+    """Bootstrap the estimates of the binary logit model.
+
+    A constant is added to the predictors, as in `run_binary_logistic_regression`.
+
+    Returns:
+        BootstrapResult: the estimates, replicates and BCa acceleration.
+
+    """
+    names = ["const", *x.columns]
+    x_values = np.column_stack((np.ones(len(x)), x.to_numpy(dtype=np.float64)))
+    y_values = y.to_numpy(dtype=np.float64)
+
+    fit = fit_logit(x_values, y_values)
+    prob = expit(x_values @ fit.params)
+    scores = x_values * (y_values - prob)[:, None]
+    influence = scores @ fit.cov_params
+
+    params, converged = _run_bootstrap(
+        "binary",
+        x_values,
+        y_values,
+        fit.params,
+        n_levels=2,
+        n_resamples=n_resamples,
+        batch_size=batch_size,
+        seed=seed,
+        max_workers=max_workers,
+        checkpoint_dir=checkpoint_dir,
+    )
+
+    return BootstrapResult(
+        estimates=pd.Series(fit.params, index=names),
+        replicates=pd.DataFrame(params, columns=names),
+        converged=converged,
+        acceleration=pd.Series(_acceleration(influence), index=names),
+    )
+
+
+def bootstrap_ordinal_logit(  # noqa: PLR0913
+    x: pd.DataFrame,
+    y: pd.Series,
+    *,
+    n_resamples: int = N_RESAMPLES,
+    batch_size: int = BATCH_SIZE,
+    seed: int = 0,
+    max_workers: int | None = None,
+    checkpoint_dir: str | Path | None = None,
+) -> BootstrapResult:
+    """Bootstrap the estimates of the ordinal logit model.
+
+    The parameters are those of `OrderedModel`: the coefficients, the first
+    threshold and the logs of the threshold increments.
+
+    Returns:
+        BootstrapResult: the estimates, replicates and BCa acceleration.
+
+    """
+    levels, codes = np.unique(y, return_inverse=True)
+    names = [*x.columns, *(f"{lo}/{hi}" for lo, hi in pairwise(levels))]
+    x_values = x.to_numpy(dtype=np.float64)
+    n_beta = x_values.shape[1]
+
+    fit = fit_ordinal_logit(x_values, codes, n_levels=len(levels))
+    beta = fit.params[:n_beta]
+    thresholds = thresholds_from_params(fit.params[n_beta:])
+    _, _, hess = loglike_derivatives(beta, thresholds, x_values, codes)
+    scores = link_derivatives(beta, thresholds, x_values, codes).score_obs()
+    jac = threshold_jacobian(thresholds, len(fit.params))
+    influence = scores @ np.linalg.inv(-hess) @ jac.T
+
+    params, converged = _run_bootstrap(
+        "ordinal",
+        x_values,
+        codes,
+        fit.params,
+        n_levels=len(levels),
+        n_resamples=n_resamples,
+        batch_size=batch_size,
+        seed=seed,
+        max_workers=max_workers,
+        checkpoint_dir=checkpoint_dir,
+    )
+
+    return BootstrapResult(
+        estimates=pd.Series(fit.params, index=names),
+        replicates=pd.DataFrame(params, columns=names),
+        converged=converged,
+        acceleration=pd.Series(_acceleration(influence), index=names),
+    )
+
+
+def main() -> None:
+    """Bootstrap the ordinal model and save percentile and BCa intervals."""
+    df = load_cleaned_data()
+    x, y = prepare_for_ordinal_regression(df)
+
+    result = bootstrap_ordinal_logit(x, y, checkpoint_dir=CHECKPOINT_DIR)
+    intervals = pd.concat(
+        [
+            result.estimates.rename("estimate"),
+            result.percentile_interval().add_prefix("percentile_"),
+            result.bca_interval().add_prefix("bca_"),
+        ],
+        axis=1,
+    )
+    intervals.to_csv(INTERVALS_PATH)
+
+
+if __name__ == "__main__":
+    main()
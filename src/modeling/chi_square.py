@@ -4,14 +4,24 @@ Copyright (C) 2025.
 """
 
 import logging
+from concurrent.futures import as_completed
 
 import numpy as np
 import pandas as pd
-from scipy.stats import chi2_contingency
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.instrumentation import instrument
+from src.modeling.parallel import make_executor
+from src.reporting import log_to_file
 
 logger = logging.getLogger(__name__)
 
+N_PERMUTATIONS = 10_000
+# Largest number of permuted values held in memory at once by a worker
+PERMUTATION_BATCH_VALUES = 10_000_000
+
 
+@instrument
 def contingency_table(
     var1: pd.Series,
     var2: pd.Series,
@@ -28,6 +38,7 @@ def contingency_table(
     return ct, ct_percent
 
 
+@instrument
 def chi_square_test(
     var1: pd.Series,
     var2: pd.Series,
@@ -38,21 +49,131 @@ def chi_square_test(
         tuple[float, float, int, np.ndarray]: the chi square test results.
 
     """
+    from scipy.stats import chi2_contingency  # noqa: PLC0415
+
     ct = pd.crosstab(var1, var2)
     chi2, p, dof, ex = chi2_contingency(ct, correction=False)
 
     return chi2, p, dof, ex
 
 
+def _chi_square_statistics(counts: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    """Compute the chi-square statistic of a stack of contingency tables.
+
+    Returns:
+        np.ndarray: the statistic of every table.
+
+    """
+    nonzero = expected > 0
+    deviations = (counts[..., nonzero] - expected[nonzero]) ** 2
+    return np.sum(deviations / expected[nonzero], axis=-1)
+
+
+# Integer-coded variables and expected counts shared by all permutation batches
+_worker_data: dict[str, np.ndarray] = {}
+
+
+def _init_worker(codes1: np.ndarray, codes2: np.ndarray, expected: np.ndarray) -> None:
+    """Store the data of the permutation batches in a worker process."""
+    _worker_data.update(codes1=codes1, codes2=codes2, expected=expected)
+
+
+def _permuted_statistics(
+    seed: np.random.SeedSequence,
+    n_permutations: int,
+) -> np.ndarray:
+    """Compute the chi-square statistic for a batch of permutations.
+
+    The second variable is shuffled once per permutation, and the contingency
+    tables of all permutations are counted with a single `bincount` over the
+    joint codes, offset by the permutation number.
+
+    Returns:
+        np.ndarray: the statistic of every permutation.
+
+    """
+    codes1, codes2 = _worker_data["codes1"], _worker_data["codes2"]
+    expected = _worker_data["expected"]
+    n_cells = expected.size
+
+    rng = np.random.default_rng(seed)
+    permuted = rng.permuted(
+        np.broadcast_to(codes2, (n_permutations, len(codes2))),
+        axis=1,
+    )
+    joint = codes1 * expected.shape[1] + permuted
+    joint += np.arange(n_permutations)[:, None] * n_cells
+    counts = np.bincount(joint.ravel(), minlength=n_permutations * n_cells)
+
+    return _chi_square_statistics(
+        counts.reshape(n_permutations, *expected.shape),
+        expected,
+    )
+
+
+@instrument
+def permutation_chi_square_test(
+    var1: pd.Series,
+    var2: pd.Series,
+    n_permutations: int = N_PERMUTATIONS,
+    seed: int = 0,
+    max_workers: int | None = 1,
+) -> tuple[float, float, int, np.ndarray]:
+    """Perform a chi-square test with a Monte-Carlo permutation p-value.
+
+    The p-value is the fraction of random permutations of `var2` whose
+    statistic is at least the observed one, so it stays valid when expected
+    counts are small. Permutations are computed in batches, optionally spread
+    over worker processes; each batch has its own random stream spawned from
+    the seed, so the p-value does not depend on the number of workers.
+
+    Returns:
+        tuple[float, float, int, np.ndarray]: the chi square test results.
+
+    """
+    codes1, _ = pd.factorize(var1, sort=True)
+    codes2, _ = pd.factorize(var2, sort=True)
+    codes1 = codes1.astype(np.intp)
+    codes2 = codes2.astype(np.intp)
+    shape = (codes1.max() + 1, codes2.max() + 1)
+
+    observed = np.bincount(codes1 * shape[1] + codes2, minlength=shape[0] * shape[1])
+    observed = observed.reshape(shape)
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / len(codes1)
+    chi2 = float(_chi_square_statistics(observed, expected))
+    dof = (shape[0] - 1) * (shape[1] - 1)
+
+    batch_size = max(1, min(n_permutations, PERMUTATION_BATCH_VALUES // len(codes1)))
+    sizes = [batch_size] * (n_permutations // batch_size)
+    if n_permutations % batch_size:
+        sizes.append(n_permutations % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    n_extreme = 0
+    executor = make_executor(
+        max_workers,
+        _init_worker,
+        (codes1, codes2, expected),
+        preload=__name__,
+    )
+    with executor:
+        futures = [
+            executor.submit(_permuted_statistics, s, size)
+            for s, size in zip(seeds, sizes, strict=True)
+        ]
+        for future in as_completed(futures):
+            # Tolerance for rounding differences between equal statistics
+            n_extreme += int(np.sum(future.result() >= chi2 * (1 - 1e-12)))
+
+    p = (n_extreme + 1) / (n_permutations + 1)
+
+    return chi2, p, dof, expected
+
+
 def main() -> None:
     """Perform chi-square tests."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        filename="results/chi_square_summary.log",
-        filemode="w",
-    )
-    df = pd.read_csv("data/obesity_cleaned_final.csv", sep=";")
+    log_to_file(logger, "results/chi_square_summary.log")
+    df = load_cleaned_data()
 
     # --- Family History vs. Obese Binary ---
     ct_fh, _ = contingency_table(
@@ -75,6 +196,11 @@ def main() -> None:
         p,
         dof,
     )
+    _, p_perm, _, _ = permutation_chi_square_test(
+        df["family_history_with_overweight"],
+        df["Obese_Binary"],
+    )
+    logger.info("Permutation p-value (%d permutations): %.4f", N_PERMUTATIONS, p_perm)
 
     # --- FAVC vs. Obese Binary ---
     ct_favc, _ = contingency_table(df["FAVC"], df["Obese_Binary"])
@@ -89,6 +215,8 @@ def main() -> None:
         p,
         dof,
     )
+    _, p_perm, _, _ = permutation_chi_square_test(df["FAVC"], df["Obese_Binary"])
+    logger.info("Permutation p-value (%d permutations): %.4f", N_PERMUTATIONS, p_perm)
 
 
 if __name__ == "__main__":
@@ -3,19 +3,42 @@
 Copyright (C) 2025.
 """
 
+from __future__ import annotations
+
 import logging
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
-from statsmodels.miscmodels.ordinal_model import (
-    OrderedModel,
-    OrderedResults,
+from scipy.stats import chi2
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.instrumentation import instrument
+from src.modeling.design_matrix import LIFESTYLE_PREDICTORS, design_matrix
+from src.modeling.fit_cache import FIT_CACHE
+from src.modeling.ordinal_newton import (
+    OrdinalLogitFit,
+    fit_ordered_model,
+    fit_ordinal_logit,
+    ordinal_fit_key,
+    ordinal_logit_results,
 )
+from src.modeling.parallel import make_executor
+from src.reporting import log_to_file
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping, Sequence
+
+    from statsmodels.miscmodels.ordinal_model import OrderedResults
 
 logger = logging.getLogger(__name__)
 
 DATASET_PATH = "data/obesity_cleaned_final.csv"
 
 
+@instrument
 def read_data(filename: str) -> pd.DataFrame:
     """Read the dataset.
 
@@ -23,9 +46,10 @@ def read_data(filename: str) -> pd.DataFrame:
         pd.DataFrame: the dataset as a pandas dataframe.
 
     """
-    return pd.read_csv(filename, sep=";")
+    return load_cleaned_data(filename)
 
 
+@instrument
 def prepare_for_ordinal_regression(
     df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -38,30 +62,13 @@ def prepare_for_ordinal_regression(
     # Ordinal target
     y: pd.DataFrame = df["Obesity_Level"]
 
-    # Predictors
-    x: pd.DataFrame = df[
-        [
-            "family_history_with_overweight",
-            "FAVC",
-            "FCVC",
-            "NCP",
-            "CAEC",
-            "SMOKE",
-            "CH2O",
-            "SCC",
-            "FAF",
-            "TUE",
-            "CALC",
-            "MTRANS_Automobile",
-            "MTRANS_Bike",
-            "MTRANS_Motorbike",
-            "MTRANS_Public_Transportation",
-        ]
-    ]
+    # Predictors, a view of the shared design matrix
+    x: pd.DataFrame = design_matrix(df).frame(LIFESTYLE_PREDICTORS)
 
     return x, y
 
 
+@instrument
 def run_ordinal_logistic_regression(
     x: pd.DataFrame,
     y: pd.DataFrame,
@@ -72,34 +79,261 @@ def run_ordinal_logistic_regression(
         OrderedResultsWrapper: the results of the ordinary logistic regression
 
     """
-    model = OrderedModel(y, x, distr="logit")
+    return fit_ordered_model(x, y)
+
+
+@dataclass
+class NestedModelComparison:
+    """The fits of a set of nested models and a table comparing them."""
+
+    table: pd.DataFrame
+    results: dict[str, OrderedResults]
+
+
+# Design matrix and target shared by all fits in a worker process
+_worker_data: dict[str, np.ndarray | int] = {}
+
+
+def _init_worker(x: np.ndarray, y: np.ndarray, n_levels: int) -> None:
+    """Store the data of the fits in a worker process."""
+    _worker_data.update(x=x, y=y, n_levels=n_levels)
+
+
+def _fit_subset(
+    columns: list[int],
+    start_params: np.ndarray | None,
+) -> OrdinalLogitFit:
+    """Fit the ordinal model on a subset of the columns of the shared data.
+
+    Returns:
+        OrdinalLogitFit: the estimates.
+
+    """
+    x = _worker_data["x"]
+    return fit_ordinal_logit(
+        x[:, columns],  # pyright: ignore[reportIndexIssue]
+        _worker_data["y"],  # pyright: ignore[reportArgumentType]
+        n_levels=_worker_data["n_levels"],  # pyright: ignore[reportArgumentType]
+        start_params=start_params,
+    )
+
+
+def nested_parents(subsets: Mapping[str, Sequence[str]]) -> dict[str, str | None]:
+    """Find the smallest model that contains each model.
+
+    Returns:
+        dict[str, str | None]: the name of the smallest model whose predictors
+            are a strict superset of each model's predictors, or None.
+
+    """
+    parents: dict[str, str | None] = {}
+    for name, columns in subsets.items():
+        supersets = [
+            other
+            for other, other_columns in subsets.items()
+            if set(columns) < set(other_columns)
+        ]
+        parents[name] = min(supersets, key=lambda o: len(subsets[o]), default=None)
+
+    return parents
+
+
+def _warm_start(
+    parent: OrdinalLogitFit,
+    parent_columns: Sequence[str],
+    columns: Sequence[str],
+) -> np.ndarray:
+    """Take the starting values of a nested model from the model containing it.
+
+    Returns:
+        np.ndarray: the parent's coefficients of the nested model's predictors,
+            followed by the parent's thresholds.
+
+    """
+    position = {column: i for i, column in enumerate(parent_columns)}
+    beta = parent.params[[position[column] for column in columns]]
+
+    return np.concatenate((beta, parent.params[len(parent_columns) :]))
+
+
+def _fit_nested(
+    x: pd.DataFrame,
+    y: pd.Series,
+    subsets: Mapping[str, Sequence[str]],
+    parents: Mapping[str, str | None],
+    *,
+    max_workers: int | None,
+) -> dict[str, OrdinalLogitFit]:
+    """Fit the models of every subset, each after the model containing it.
+
+    A model starts from the estimates of its parent in `parents`. Models found
+    in the fit cache are not fitted again.
+
+    Returns:
+        dict[str, OrdinalLogitFit]: the estimates of every model.
+
+    """
+    levels, codes = np.unique(y, return_inverse=True)
+    column_index = {column: i for i, column in enumerate(x.columns)}
+
+    fits: dict[str, OrdinalLogitFit] = {}
+    x_values = x.to_numpy(dtype=np.float64)
+    executor = make_executor(
+        max_workers,
+        _init_worker,
+        (x_values, codes, len(levels)),
+        preload=__name__,
+    )
+    with executor:
+        running: dict[Future, tuple[str, str]] = {}
+
+        def finish(name: str, fit: OrdinalLogitFit) -> None:
+            fits[name] = fit
+            for child, parent in parents.items():
+                if parent == name:
+                    submit(child, _warm_start(fit, subsets[name], subsets[child]))
+
+        def submit(name: str, start_params: np.ndarray | None) -> None:
+            columns = [column_index[column] for column in subsets[name]]
+            key = ordinal_fit_key(
+                x_values[:, columns],
+                codes,
+                len(levels),
+                subsets[name],
+                start_params=start_params,
+            )
+            if (fit := FIT_CACHE.get(key, OrdinalLogitFit)) is not None:
+                finish(name, fit)
+            else:
+                future = executor.submit(_fit_subset, columns, start_params)
+                running[future] = (name, key)
+
+        for name, parent in parents.items():
+            if parent is None:
+                submit(name, None)
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                fit = future.result()
+                FIT_CACHE.put(key, fit)
+                finish(name, fit)
+
+    return fits
+
+
+def _comparison_table(
+    results: Mapping[str, OrderedResults],
+    subsets: Mapping[str, Sequence[str]],
+    parents: Mapping[str, str | None],
+) -> pd.DataFrame:
+    """Tabulate the fit of every model and its test against its parent.
+
+    Returns:
+        pd.DataFrame: the AIC, BIC and likelihood-ratio test of every model.
+
+    """
+    rows = []
+    for name, result in results.items():
+        parent = parents[name]
+        row = {
+            "model": name,
+            "predictors": len(subsets[name]),
+            "llf": result.llf,
+            "aic": result.aic,
+            "bic": result.bic,
+            "parent": parent,
+            "lr_stat": np.nan,
+            "lr_df": np.nan,
+            "lr_pvalue": np.nan,
+        }
+        if parent is not None:
+            row["lr_stat"] = 2 * (results[parent].llf - result.llf)
+            row["lr_df"] = len(subsets[parent]) - len(subsets[name])
+            row["lr_pvalue"] = chi2.sf(row["lr_stat"], row["lr_df"])
+        rows.append(row)
+
+    table = pd.DataFrame(rows).set_index("model")
+    table["lr_df"] = table["lr_df"].astype("Int64")
 
-    return model.fit(method="bfgs")
+    return table
+
+
+@instrument
+def compare_nested_models(
+    x: pd.DataFrame,
+    y: pd.Series,
+    subsets: Mapping[str, Sequence[str]],
+    max_workers: int | None = None,
+) -> NestedModelComparison:
+    """Fit ordinal models on subsets of the predictors and compare them.
+
+    The models are fitted concurrently on a process pool. A model nested in
+    another model is fitted after it and starts from its estimates. Models
+    found in the fit cache are not fitted again. Every model is compared with
+    the smallest model containing it in a likelihood-ratio test.
+
+    Args:
+        x (pd.DataFrame): all predictors.
+        y (pd.Series): the ordinal target.
+        subsets (Mapping[str, Sequence[str]]): the predictors of every model.
+        max_workers (int | None): the number of worker processes; 1 fits all
+            models in the calling process.
+
+    Returns:
+        NestedModelComparison: the results of every model and a table with
+            their AIC, BIC and likelihood-ratio tests.
+
+    """
+    from statsmodels.miscmodels.ordinal_model import OrderedModel  # noqa: PLC0415
+
+    parents = nested_parents(subsets)
+    fits = _fit_nested(x, y, subsets, parents, max_workers=max_workers)
+    results = {
+        name: ordinal_logit_results(
+            OrderedModel(y, x[list(subsets[name])], distr="logit"),
+            fits[name],
+        )
+        for name in subsets
+    }
+
+    return NestedModelComparison(
+        table=_comparison_table(results, subsets, parents),
+        results=results,
+    )
 
 
 def main() -> None:
     """Read and prepare the dataset and perform ordinal logistic regression."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        filename="results/hereditary_vs_lifestyle_summary.log",
-        filemode="w",
-    )
+    log_to_file(logger, "results/hereditary_vs_lifestyle_summary.log")
     df = read_data(DATASET_PATH)
 
     x, y = prepare_for_ordinal_regression(df)
 
-    hereditary_predictors = x[["family_history_with_overweight"]]
-    hereditary_result = run_ordinal_logistic_regression(hereditary_predictors, y)
+    hereditary_predictors = ["family_history_with_overweight"]
+    lifestyle_predictors = [c for c in x.columns if c not in hereditary_predictors]
+    # Three small fits: starting worker processes would cost more than it saves
+    comparison = compare_nested_models(
+        x,
+        y,
+        {
+            "Hereditary": hereditary_predictors,
+            "Lifestyle": lifestyle_predictors,
+            "Combined": list(x.columns),
+        },
+        max_workers=1,
+    )
+
+    hereditary_result = comparison.results["Hereditary"]
     logger.info("--- Hereditary Model Summary ---")
     logger.info(hereditary_result.summary().as_text())
 
-    lifestyle_predictors = x.drop(columns=["family_history_with_overweight"])
-    lifestyle_result = run_ordinal_logistic_regression(lifestyle_predictors, y)
+    lifestyle_result = comparison.results["Lifestyle"]
     logger.info("\n--- Lifestyle Model Summary ---")
     logger.info(lifestyle_result.summary().as_text())
 
-    combined_result = run_ordinal_logistic_regression(x, y)
+    combined_result = comparison.results["Combined"]
     logger.info("\n--- Combined Model Summary ---")
     logger.info(combined_result.summary().as_text())
 
@@ -121,6 +355,14 @@ def main() -> None:
     )
     logger.info("\nLower AIC/BIC values indicate a better model fit.")
 
+    logger.info("\n--- Likelihood-Ratio Tests Against the Combined Model ---")
+    logger.info(
+        comparison.table.to_string(
+            float_format="{:.2f}".format,
+            formatters={"lr_pvalue": "{:.3g}".format},
+        ),
+    )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,240 @@
+"""Incremental contingency tables for streaming survey responses.
+
+A `ContingencyAccumulator` keeps the counts of one pair of variables. New rows
+are added in batches at a cost that depends only on the size of the batch, and
+accumulators of separate shards of the data can be merged. The table, row
+percentages and chi-square test are computed from the counts alone, so they
+match `contingency_table` and `chi_square_test` on all rows seen so far
+without going over those rows again.
+
+Copyright (C) 2025.
+"""
+
+from collections.abc import Hashable, Iterable, Sequence
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.schema import csv_dtypes
+
+CHUNKSIZE = 100_000
+
+
+class ContingencyAccumulator:
+    """Counts of the combinations of two categorical variables."""
+
+    def __init__(self, name1: Hashable = None, name2: Hashable = None) -> None:
+        """Start an empty table of two variables."""
+        self.names = (name1, name2)
+        self.levels: tuple[list, list] = ([], [])
+        # Category order of categorical variables, which `pd.crosstab` keeps
+        self.categories: list[list | None] = [None, None]
+        self._positions: tuple[dict, dict] = ({}, {})
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    @property
+    def n_rows(self) -> int:
+        """Return the number of rows counted so far."""
+        return int(self.counts.sum())
+
+    def _level_positions(self, axis: int, values: Iterable) -> np.ndarray:
+        """Find the positions of levels in the table, adding new levels.
+
+        Returns:
+            np.ndarray: the row or column of every level.
+
+        """
+        levels, positions = self.levels[axis], self._positions[axis]
+        for value in values:
+            if value not in positions:
+                positions[value] = len(levels)
+                levels.append(value)
+
+        return np.array([positions[value] for value in values], dtype=np.intp)
+
+    def _add_categories(self, axis: int, categories: Iterable | None) -> None:
+        """Record the category order of a variable, adding new categories."""
+        if categories is None:
+            return
+
+        known = self.categories[axis] or []
+        self.categories[axis] = known + [c for c in categories if c not in known]
+
+    def update(self, var1: pd.Series, var2: pd.Series) -> Self:
+        """Count a batch of rows.
+
+        Rows with a missing value are ignored, as in `pd.crosstab`.
+
+        Returns:
+            ContingencyAccumulator: the updated accumulator.
+
+        """
+        codes1, uniques1 = pd.factorize(var1)
+        codes2, uniques2 = pd.factorize(var2)
+        valid = (codes1 >= 0) & (codes2 >= 0)
+        batch = np.bincount(
+            codes1[valid] * len(uniques2) + codes2[valid],
+            minlength=len(uniques1) * len(uniques2),
+        ).reshape(len(uniques1), len(uniques2))
+
+        for axis, var in enumerate((var1, var2)):
+            if isinstance(var.dtype, pd.CategoricalDtype):
+                self._add_categories(axis, var.cat.categories.tolist())
+
+        rows = self._level_positions(0, np.asarray(uniques1).tolist())
+        cols = self._level_positions(1, np.asarray(uniques2).tolist())
+        self._grow()
+        self.counts[np.ix_(rows, cols)] += batch
+
+        return self
+
+    def merge(self, other: "ContingencyAccumulator") -> Self:
+        """Add the counts of another accumulator, e.g. of another shard.
+
+        Returns:
+            ContingencyAccumulator: the merged accumulator.
+
+        """
+        for axis in (0, 1):
+            self._add_categories(axis, other.categories[axis])
+
+        rows = self._level_positions(0, other.levels[0])
+        cols = self._level_positions(1, other.levels[1])
+        self._grow()
+        self.counts[np.ix_(rows, cols)] += other.counts
+
+        return self
+
+    def _grow(self) -> None:
+        """Add empty rows and columns to the counts for new levels."""
+        missing = (
+            len(self.levels[0]) - self.counts.shape[0],
+            len(self.levels[1]) - self.counts.shape[1],
+        )
+        if any(missing):
+            self.counts = np.pad(self.counts, ((0, missing[0]), (0, missing[1])))
+
+    def _order(self, axis: int) -> np.ndarray:
+        """Order the levels of a variable as `pd.crosstab` does.
+
+        Returns:
+            np.ndarray: the positions of the levels in category order for a
+                categorical variable, and in sorted order otherwise.
+
+        """
+        levels, categories = self.levels[axis], self.categories[axis]
+        if categories is None:
+            return np.argsort(levels, kind="stable")
+
+        rank = {category: i for i, category in enumerate(categories)}
+        return np.argsort(
+            [rank.get(level, len(rank)) for level in levels],
+            kind="stable",
+        )
+
+    def table(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """Create the contingency table, as `contingency_table`.
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: the contingency table.
+
+        """
+        rows = self._order(0)
+        cols = self._order(1)
+        ct = pd.DataFrame(
+            self.counts[np.ix_(rows, cols)],
+            index=pd.Index(np.asarray(self.levels[0])[rows], name=self.names[0]),
+            columns=pd.Index(np.asarray(self.levels[1])[cols], name=self.names[1]),
+        )
+        ct_percent = pd.DataFrame.round(ct.div(ct.sum(axis=1), axis=0) * 100, 2)
+
+        return ct, ct_percent
+
+    def chi_square(self) -> tuple[float, float, int, np.ndarray]:
+        """Perform a chi-square test, as `chi_square_test`.
+
+        Returns:
+            tuple[float, float, int, np.ndarray]: the chi square test results.
+
+        """
+        from scipy.stats import chi2_contingency  # noqa: PLC0415
+
+        ct, _ = self.table()
+        chi2, p, dof, ex = chi2_contingency(ct, correction=False)
+
+        return chi2, p, dof, ex
+
+    def save(self, path: str | Path) -> None:
+        """Write the counts and levels to an npz file."""
+        categories = {
+            f"categories{axis + 1}": np.asarray(self.categories[axis])
+            for axis in (0, 1)
+            if self.categories[axis] is not None
+        }
+        np.savez(
+            path,
+            counts=self.counts,
+            levels1=np.asarray(self.levels[0]),
+            levels2=np.asarray(self.levels[1]),
+            names=np.array([str(name) for name in self.names]),
+            **categories,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Read an accumulator written by `save`.
+
+        Returns:
+            ContingencyAccumulator: the accumulator.
+
+        """
+        with np.load(path, allow_pickle=False) as saved:
+            accumulator = cls(*saved["names"].tolist())
+            accumulator._level_positions(0, saved["levels1"].tolist())
+            accumulator._level_positions(1, saved["levels2"].tolist())
+            for axis in (0, 1):
+                if f"categories{axis + 1}" in saved.files:
+                    categories = saved[f"categories{axis + 1}"].tolist()
+                    accumulator.categories[axis] = categories
+            accumulator.counts = saved["counts"].astype(np.int64)
+
+        return accumulator
+
+
+def accumulate_csv(
+    path: str | Path,
+    pairs: Sequence[tuple[str, str]],
+    accumulators: dict[tuple[str, str], ContingencyAccumulator] | None = None,
+    chunksize: int = CHUNKSIZE,
+) -> dict[tuple[str, str], ContingencyAccumulator]:
+    """Count pairs of columns of a cleaned data file in chunks.
+
+    Args:
+        path (str | Path): a cleaned data file, e.g. with new responses only.
+        pairs (Sequence[tuple[str, str]]): the pairs of columns to count.
+        accumulators (dict | None): existing counts to add the rows to.
+        chunksize (int): the number of rows read at once.
+
+    Returns:
+        dict[tuple[str, str], ContingencyAccumulator]: the counts of every pair.
+
+    """
+    accumulators = dict(accumulators or {})
+    for pair in pairs:
+        accumulators.setdefault(pair, ContingencyAccumulator(*pair))
+
+    columns = sorted({column for pair in pairs for column in pair})
+    dtypes = csv_dtypes(columns)
+    for chunk in pd.read_csv(
+        path,
+        sep=";",
+        usecols=columns,
+        dtype=dtypes,
+        chunksize=chunksize,
+    ):
+        for var1, var2 in pairs:
+            accumulators[var1, var2].update(chunk[var1], chunk[var2])
+
+    return accumulators
@@ -0,0 +1,350 @@
+"""Cross-validate the binary and ordinal logit models.
+
+Rows are split into stratified folds, so every fold keeps the class balance of
+the target, and the splits can be repeated with new shuffles. The folds are
+fitted on a process pool with the Newton solvers of the models, each fit
+starting from the estimates on the full data where those exist. The design
+matrix, target and fold assignments are placed in shared memory once; workers
+map them instead of receiving copies.
+
+Every fold is scored on its held-out rows: log-loss, accuracy and AUC for the
+binary model; log-loss, accuracy and the mean absolute error in levels for the
+ordinal model.
+
+Copyright (C) 2025.
+"""
+
+import logging
+from concurrent.futures import as_completed
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.modeling.binary_logistic_regression import prepare_for_binary_regression
+from src.modeling.logit_newton import fit_logit
+from src.modeling.nonparametric import rank_columns
+from src.modeling.ordinal_logistic_regression import prepare_for_ordinal_regression
+from src.modeling.ordinal_newton import fit_ordinal_logit, thresholds_from_params
+from src.modeling.parallel import SharedArray, make_executor
+from src.reporting import log_to_file
+
+logger = logging.getLogger(__name__)
+
+N_SPLITS = 5
+N_REPEATS = 3
+# Smallest predicted probability, to keep the log-loss finite
+MIN_PROB = 1e-15
+# Linear predictors beyond this size mean the binary target is separated
+MAX_LINEAR_PREDICTOR = 30
+# Probability from which a binary prediction counts as the positive class
+DECISION_THRESHOLD = 0.5
+
+
+@dataclass
+class CrossValidationResult:
+    """The scores of a model on the held-out rows of every fold."""
+
+    folds: pd.DataFrame
+
+    def summary(self) -> pd.DataFrame:
+        """Summarize the scores over all folds.
+
+        Returns:
+            pd.DataFrame: the mean and standard deviation of every score.
+
+        """
+        scores = self.folds.drop(columns=["repeat", "fold", "converged"])
+        return scores.agg(["mean", "std"]).T
+
+
+def stratified_folds(
+    y: np.ndarray,
+    n_splits: int = N_SPLITS,
+    n_repeats: int = 1,
+    seed: int = 0,
+) -> np.ndarray:
+    """Assign rows to stratified folds, once for every repeat.
+
+    Within every class the rows are shuffled and dealt over the folds in turn,
+    continuing from the fold where the previous class ended, so fold sizes
+    differ by at most one row.
+
+    Returns:
+        np.ndarray: the (repeats x rows) fold of every row.
+
+    """
+    rng = np.random.default_rng(seed)
+    folds = np.empty((n_repeats, len(y)), dtype=np.int16)
+    for repeat in range(n_repeats):
+        order = np.lexsort((rng.random(len(y)), y))
+        folds[repeat, order] = np.arange(len(y)) % n_splits
+
+    return folds
+
+
+def auc(y: np.ndarray, prob: np.ndarray) -> float:
+    """Compute the area under the ROC curve from the ranks of the predictions.
+
+    Returns:
+        float: the probability that a random positive row is ranked above a
+            random negative row, counting ties as one half.
+
+    """
+    ranks, _ = rank_columns(prob[:, None])
+    positive = y == 1
+    n_pos, n_neg = positive.sum(), (~positive).sum()
+
+    return float((ranks[positive, 0].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def binary_scores(y: np.ndarray, prob: np.ndarray) -> dict[str, float]:
+    """Score predicted probabilities of a binary target.
+
+    Returns:
+        dict[str, float]: the log-loss, accuracy and AUC.
+
+    """
+    prob = np.clip(prob, MIN_PROB, 1 - MIN_PROB)
+    return {
+        "log_loss": float(-np.mean(y * np.log(prob) + (1 - y) * np.log(1 - prob))),
+        "accuracy": float(np.mean((prob >= DECISION_THRESHOLD) == y)),
+        "auc": auc(y, prob),
+    }
+
+
+def ordinal_probabilities(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+    """Predict the probability of every level with an ordinal logit model.
+
+    Returns:
+        np.ndarray: the (rows x levels) predicted probabilities.
+
+    """
+    n_beta = x.shape[1]
+    thresholds = thresholds_from_params(params[n_beta:])
+    cdf = expit(thresholds[None, :] - (x @ params[:n_beta])[:, None])
+    ones = np.ones((len(x), 1))
+
+    return np.diff(np.hstack((0 * ones, cdf, ones)), axis=1)
+
+
+def ordinal_scores(y: np.ndarray, prob: np.ndarray) -> dict[str, float]:
+    """Score predicted level probabilities of an ordinal target coded 0..J-1.
+
+    Returns:
+        dict[str, float]: the log-loss, accuracy and mean absolute error of the
+            most likely level.
+
+    """
+    predicted = np.argmax(prob, axis=1)
+    observed = np.maximum(prob[np.arange(len(y)), y], MIN_PROB)
+    return {
+        "log_loss": float(-np.mean(np.log(observed))),
+        "accuracy": float(np.mean(predicted == y)),
+        "mae": float(np.mean(np.abs(predicted - y))),
+    }
+
+
+# Shared memory and settings of the folds in a worker process
+_worker_data: dict = {}
+
+
+def _init_worker(
+    kind: str,
+    specs: dict[str, tuple],
+    start_params: np.ndarray | None,
+    n_levels: int,
+) -> None:
+    """Map the shared design matrix, target and folds in a worker process."""
+    _worker_data.update(kind=kind, start_params=start_params, n_levels=n_levels)
+    for name, spec in specs.items():
+        memory, array = SharedArray.attach(spec)
+        _worker_data[f"{name}_memory"] = memory
+        _worker_data[name] = array
+
+
+def _release_worker() -> None:
+    """Unmap the shared memory of the calling process, if it mapped any."""
+    memories = [v for k, v in _worker_data.items() if k.endswith("_memory")]
+    _worker_data.clear()
+    for memory in memories:
+        memory.close()
+
+
+def _fit_fold(repeat: int, fold: int) -> dict[str, float | int | bool]:
+    """Fit a model without the rows of a fold and score it on them.
+
+    Returns:
+        dict[str, float | int | bool]: the scores on the held-out rows.
+
+    """
+    x, y = _worker_data["x"], _worker_data["y"]
+    test = _worker_data["folds"][repeat] == fold
+    train = ~test
+
+    if _worker_data["kind"] == "binary":
+        fit = fit_logit(x[train], y[train], start_params=_worker_data["start_params"])
+        scores = binary_scores(y[test], expit(x[test] @ fit.params))
+    else:
+        fit = fit_ordinal_logit(
+            x[train],
+            y[train],
+            n_levels=_worker_data["n_levels"],
+            start_params=_worker_data["start_params"],
+        )
+        scores = ordinal_scores(y[test], ordinal_probabilities(x[test], fit.params))
+
+    return {"repeat": repeat, "fold": fold, **scores, "converged": fit.converged}
+
+
+def _cross_validate(  # noqa: PLR0913
+    kind: str,
+    x: np.ndarray,
+    y: np.ndarray,
+    start_params: np.ndarray | None,
+    *,
+    n_levels: int,
+    n_splits: int,
+    n_repeats: int,
+    seed: int,
+    max_workers: int | None,
+) -> CrossValidationResult:
+    """Fit and score all folds on a process pool.
+
+    Returns:
+        CrossValidationResult: the scores of every fold.
+
+    """
+    folds = stratified_folds(y, n_splits, n_repeats, seed)
+    with (
+        SharedArray(x) as x_shared,
+        SharedArray(y) as y_shared,
+        SharedArray(folds) as folds_shared,
+    ):
+        specs = {"x": x_shared.spec, "y": y_shared.spec, "folds": folds_shared.spec}
+        executor = make_executor(
+            max_workers,
+            _init_worker,
+            (kind, specs, start_params, n_levels),
+            preload=__name__,
+        )
+        with executor:
+            futures = [
+                executor.submit(_fit_fold, repeat, fold)
+                for repeat in range(n_repeats)
+                for fold in range(n_splits)
+            ]
+            rows = [future.result() for future in as_completed(futures)]
+        _release_worker()
+
+    table = pd.DataFrame(rows).sort_values(["repeat", "fold"], ignore_index=True)
+    if not table["converged"].all():
+        logger.warning(
+            "%d of %d fold fits did not converge",
+            np.sum(~table["converged"]),
+            len(table),
+        )
+
+    return CrossValidationResult(folds=table)
+
+
+def cross_validate_binary(  # noqa: PLR0913
+    x: pd.DataFrame,
+    y: pd.Series,
+    *,
+    n_splits: int = N_SPLITS,
+    n_repeats: int = N_REPEATS,
+    seed: int = 0,
+    max_workers: int | None = None,
+) -> CrossValidationResult:
+    """Cross-validate the binary logit model.
+
+    A constant is added to the predictors, as in `run_binary_logistic_regression`.
+    If the target is (quasi-)separated on the full data, its estimates diverge
+    and fits started from them stall where the predictions saturate, so the
+    folds are then fitted from zero instead.
+
+    Returns:
+        CrossValidationResult: the log-loss, accuracy and AUC of every fold.
+
+    """
+    x_values = np.column_stack((np.ones(len(x)), x.to_numpy(dtype=np.float64)))
+    y_values = y.to_numpy(dtype=np.float64)
+    full = fit_logit(x_values, y_values)
+
+    start_params = full.params
+    if np.max(np.abs(x_values @ full.params)) > MAX_LINEAR_PREDICTOR:
+        logger.warning("The target is separated; folds are fitted without warm start")
+        start_params = None
+
+    return _cross_validate(
+        "binary",
+        x_values,
+        y_values,
+        start_params,
+        n_levels=2,
+        n_splits=n_splits,
+        n_repeats=n_repeats,
+        seed=seed,
+        max_workers=max_workers,
+    )
+
+
+def cross_validate_ordinal(  # noqa: PLR0913
+    x: pd.DataFrame,
+    y: pd.Series,
+    *,
+    n_splits: int = N_SPLITS,
+    n_repeats: int = N_REPEATS,
+    seed: int = 0,
+    max_workers: int | None = None,
+) -> CrossValidationResult:
+    """Cross-validate the ordinal logit model.
+
+    Returns:
+        CrossValidationResult: the log-loss, accuracy and mean absolute error
+            of every fold.
+
+    """
+    levels, codes = np.unique(y, return_inverse=True)
+    x_values = x.to_numpy(dtype=np.float64)
+    full = fit_ordinal_logit(x_values, codes, n_levels=len(levels))
+
+    return _cross_validate(
+        "ordinal",
+        x_values,
+        codes,
+        full.params,
+        n_levels=len(levels),
+        n_splits=n_splits,
+        n_repeats=n_repeats,
+        seed=seed,
+        max_workers=max_workers,
+    )
+
+
+def main() -> None:
+    """Cross-validate the binary and ordinal models and log their scores."""
+    log_to_file(logger, "results/cross_validation_summary.log")
+    df = load_cleaned_data()
+
+    binary = cross_validate_binary(*prepare_for_binary_regression(df))
+    ordinal = cross_validate_ordinal(*prepare_for_ordinal_regression(df))
+
+    for title, result in [("Binary", binary), ("Ordinal", ordinal)]:
+        logger.info(
+            "--- %s Logit: %d-Fold Cross-Validation, %d Repeats ---",
+            title,
+            N_SPLITS,
+            N_REPEATS,
+        )
+        logger.info(result.summary().to_string(float_format="{:.4f}".format))
+        logger.info("")
+        logger.info(result.folds.to_string(float_format="{:.4f}".format))
+        logger.info("")
+
+
+if __name__ == "__main__":
+    main()
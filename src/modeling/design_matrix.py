@@ -0,0 +1,294 @@
+"""Build the design matrices of the models once and share views of them.
+
+A design is declared by a `DesignSpec`: the base columns, their interaction
+products, whether to add a constant and whether to standardize the columns.
+It is materialized as a single column-major block of floats, so every run of
+adjacent columns is a view of the block without a copy. The models of this
+package use one shared design, laid out as
+
+    const | PREDICTORS | family_history_x_* interactions
+
+so the predictors of the binary, ordinal, hereditary/lifestyle and
+interaction models are all views of the same block.
+
+Blocks are cached per fingerprint of the data they are built from and their
+spec, so preparing many models of the same data builds the block only once.
+The block is made read-only once it is built, so arrays handed out are
+read-only views and writes to frames never reach it: pandas 3 copies the
+values on write, and pandas 2 raises.
+
+Copyright (C) 2025.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.columnar_cache import fingerprint_frame
+from src.data_preparation.schema import COLUMNS
+
+# Size of the design blocks kept in the cache
+MAX_CACHED_BYTES = 256 << 20
+
+PREDICTORS = [
+    "Gender",
+    "Age",
+    "Height",
+    "Weight",
+    "family_history_with_overweight",
+    "FAVC",
+    "FCVC",
+    "NCP",
+    "CAEC",
+    "SMOKE",
+    "CH2O",
+    "SCC",
+    "FAF",
+    "TUE",
+    "CALC",
+    "MTRANS_Automobile",
+    "MTRANS_Bike",
+    "MTRANS_Motorbike",
+    "MTRANS_Public_Transportation",
+]
+
+# Predictors of the hereditary/lifestyle comparison: the family history and
+# every lifestyle factor
+LIFESTYLE_PREDICTORS = PREDICTORS[PREDICTORS.index("family_history_with_overweight") :]
+
+# Key lifestyle factors for interaction with the family history
+# These were chosen based on their significance in the previous lifestyle model
+INTERACTION_FACTORS = ["FCVC", "NCP", "CAEC", "SMOKE", "CH2O", "FAF"]
+
+
+@dataclass(frozen=True)
+class Interaction:
+    """The product of two base columns of a design."""
+
+    name: str
+    left: str
+    right: str
+
+
+@dataclass(frozen=True)
+class DesignSpec:
+    """A declarative description of a design matrix.
+
+    The columns of the design are the constant "const" if `intercept` is set,
+    followed by the base `columns` and the `interactions`, in order.
+    Interactions are the products of the unstandardized base columns. With
+    `standardize`, every column but the constant is centered and scaled to
+    unit variance, as `StandardScaler` does.
+    """
+
+    columns: tuple[str, ...]
+    interactions: tuple[Interaction, ...] = ()
+    intercept: bool = False
+    standardize: bool = False
+    dtype: str = "float64"
+
+    def names(self) -> list[str]:
+        """List the columns of the design in order.
+
+        Returns:
+            list[str]: the column names.
+
+        """
+        constant = ["const"] if self.intercept else []
+        return [*constant, *self.columns, *(i.name for i in self.interactions)]
+
+
+MODEL_DESIGN = DesignSpec(
+    columns=tuple(PREDICTORS),
+    interactions=tuple(
+        Interaction(f"family_history_x_{col}", "family_history_with_overweight", col)
+        for col in INTERACTION_FACTORS
+    ),
+    intercept=True,
+)
+
+
+class DesignMatrix:
+    """A materialized design, handing out views of runs of its columns."""
+
+    def __init__(
+        self,
+        spec: DesignSpec,
+        values: np.ndarray,
+        index: pd.Index,
+        center: np.ndarray,
+        scale: np.ndarray,
+    ) -> None:
+        """Wrap a design block.
+
+        Args:
+            spec (DesignSpec): the spec the block was built from.
+            values (np.ndarray): the (rows x columns) column-major block, made
+                read-only.
+            index (pd.Index): the index of the rows.
+            center (np.ndarray): the mean subtracted from every column.
+            scale (np.ndarray): the standard deviation every column was
+                divided by.
+
+        """
+        self.spec = spec
+        self.index = index
+        self.center = center
+        self.scale = scale
+        self.names = spec.names()
+        self.nbytes = values.nbytes
+        # Without copy-on-write (pandas 2), writes to the frames would change
+        # the shared block, so they must fail instead
+        values.flags.writeable = False
+        self._values = values
+        self._position = {name: i for i, name in enumerate(self.names)}
+        # Frames are slices of this frame, so copy-on-write tracks them
+        self._frame = pd.DataFrame(values, index=index, columns=self.names, copy=False)
+
+    def columns(self, names: Sequence[str]) -> slice | list[int]:
+        """Find columns in the block.
+
+        Raises:
+            KeyError: if a column is not in the design.
+
+        Returns:
+            slice | list[int]: a slice if the columns are adjacent and in the
+                order of the design, and their positions otherwise.
+
+        """
+        missing = [name for name in names if name not in self._position]
+        if missing:
+            msg = f"Columns {missing} are not in the design"
+            raise KeyError(msg)
+
+        positions = [self._position[name] for name in names]
+        start = positions[0] if positions else 0
+        if positions == list(range(start, start + len(positions))):
+            return slice(start, start + len(positions))
+
+        return positions
+
+    def array(self, names: Sequence[str] | None = None) -> np.ndarray:
+        """Get columns of the design as an array.
+
+        Adjacent columns in the order of the design are a read-only view of
+        the block; other selections are copied.
+
+        Returns:
+            np.ndarray: the (rows x columns) values.
+
+        """
+        values = self._values[:, slice(None) if names is None else self.columns(names)]
+        values.flags.writeable = False
+
+        return values
+
+    def frame(self, names: Sequence[str] | None = None) -> pd.DataFrame:
+        """Get columns of the design as a DataFrame on the index of the data.
+
+        Returns:
+            pd.DataFrame: the columns, without copying them where `array` does
+                not.
+
+        """
+        if names is None:
+            return self._frame.iloc[:, :]
+
+        return self._frame.iloc[:, self.columns(names)]
+
+
+def build_design(df: pd.DataFrame, spec: DesignSpec) -> DesignMatrix:
+    """Materialize a design as a single block.
+
+    Measures stored as float32 are rounded back to their recorded decimals, as
+    in `widen_measures`.
+
+    Raises:
+        KeyError: if an interaction is not of two base columns.
+
+    Returns:
+        DesignMatrix: the design.
+
+    """
+    offset = int(spec.intercept)
+    position = {name: offset + j for j, name in enumerate(spec.columns)}
+    for interaction in spec.interactions:
+        for name in (interaction.left, interaction.right):
+            if name not in position:
+                msg = f"Interaction {interaction.name!r} uses {name!r}, not a column"
+                raise KeyError(msg)
+
+    n_columns = offset + len(spec.columns) + len(spec.interactions)
+    values = np.empty((len(df), n_columns), dtype=spec.dtype, order="F")
+    if spec.intercept:
+        values[:, 0] = 1
+
+    for name, j in position.items():
+        column = df[name]
+        values[:, j] = column.to_numpy(dtype=np.float64)
+        if column.dtype == np.float32 and name in COLUMNS:
+            np.round(values[:, j], COLUMNS[name].decimals, out=values[:, j])
+
+    for k, interaction in enumerate(spec.interactions, start=offset + len(position)):
+        left, right = position[interaction.left], position[interaction.right]
+        np.multiply(values[:, left], values[:, right], out=values[:, k])
+
+    center = np.zeros(n_columns)
+    scale = np.ones(n_columns)
+    if spec.standardize:
+        data = values[:, offset:]
+        center[offset:] = data.mean(axis=0)
+        spread = data.std(axis=0)
+        scale[offset:] = np.where(spread > 0, spread, 1)
+        data -= center[offset:].astype(spec.dtype)
+        data /= scale[offset:].astype(spec.dtype)
+
+    return DesignMatrix(spec, values, df.index, center, scale)
+
+
+_cache: OrderedDict[tuple[str, DesignSpec], DesignMatrix] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _data_key(df: pd.DataFrame, spec: DesignSpec) -> str:
+    """Fingerprint the data a design is built from.
+
+    Returns:
+        str: the hex SHA-256 digest of the base columns and the index.
+
+    """
+    digest = hashlib.sha256(fingerprint_frame(df[list(spec.columns)]).encode())
+    digest.update(pd.util.hash_pandas_object(df.index).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def design_matrix(df: pd.DataFrame, spec: DesignSpec = MODEL_DESIGN) -> DesignMatrix:
+    """Get the design of a dataset, building it if it is not cached.
+
+    The most recently used designs are kept while their blocks take at most
+    `MAX_CACHED_BYTES`.
+
+    Returns:
+        DesignMatrix: the design.
+
+    """
+    key = (_data_key(df, spec), spec)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+        design = build_design(df, spec)
+        _cache[key] = design
+        total = sum(cached.nbytes for cached in _cache.values())
+        while total > MAX_CACHED_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            total -= evicted.nbytes
+
+        return design
@@ -0,0 +1,446 @@
+"""Fit the logit models over data sharded across worker processes or nodes.
+
+Every shard worker reads its own shard of raw survey rows, e.g. written by
+`synthetic.write_shards`, and cleans and prepares it locally. To fit a model,
+a coordinator sends the current parameters to all workers, every worker
+computes the log-likelihood, gradient and Hessian of its rows, and the
+coordinator sums these partial statistics and takes the Newton step. Only
+parameters and (parameters x parameters) statistics are sent, so the rows
+never leave their worker.
+
+Workers are reached through a transport: `LocalProcessTransport` starts them
+as processes of this machine, and `SocketTransport` connects to workers
+started on other machines with
+
+    python -m src.modeling.distributed serve --port 6000 --authkey KEY
+
+Copyright (C) 2025.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+from itertools import pairwise
+from multiprocessing.connection import Client, Connection, Listener
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+import pandas as pd
+
+from src.data_preparation.prepare_data import OBESITY_LEVEL_ENCODING, clean_data
+from src.instrumentation import instrument
+from src.modeling import binary_logistic_regression, ordinal_logistic_regression
+from src.modeling.design_matrix import build_design
+from src.modeling.logit_newton import LogitFit, logit_derivatives, newton_logit
+from src.modeling.ordinal_newton import (
+    OrdinalLogitFit,
+    loglike_derivatives,
+    newton_ordinal_logit,
+    thresholds_from_counts,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("binary", "ordinal")
+N_LEVELS = len(OBESITY_LEVEL_ENCODING)
+
+
+class ShardWorker:
+    """The rows of one shard, prepared for the model being fitted."""
+
+    def __init__(self) -> None:
+        """Start without a shard."""
+        self.x: np.ndarray | None = None
+        self.y: np.ndarray | None = None
+
+    def load(self, path: str, model: str) -> int:
+        """Read, clean and prepare a shard of raw survey rows.
+
+        Raises:
+            ValueError: if the model is unknown.
+
+        Returns:
+            int: the number of rows of the shard.
+
+        """
+        df: pd.DataFrame = clean_data(pd.read_csv(path))
+        if model == "binary":
+            self.x = build_design(df, binary_logistic_regression.DESIGN).array()
+            self.y = df["Obese_Binary"].to_numpy(np.float64)
+        elif model == "ordinal":
+            x, y = ordinal_logistic_regression.prepare_for_ordinal_regression(df)
+            self.x = x.to_numpy(np.float64)
+            self.y = y.to_numpy(np.intp)
+        else:
+            msg = f"Unknown model {model!r}, expected one of {MODELS}"
+            raise ValueError(msg)
+
+        return len(self.y)
+
+    def counts(self) -> np.ndarray:
+        """Count the rows of every response category.
+
+        Returns:
+            np.ndarray: the number of rows of every obesity level.
+
+        """
+        return np.bincount(self.y, minlength=N_LEVELS)
+
+    def logit_derivatives(
+        self,
+        params: np.ndarray,
+    ) -> tuple[float, np.ndarray, np.ndarray]:
+        """Compute the binary logit statistics of the shard.
+
+        Returns:
+            tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient
+                and Hessian.
+
+        """
+        return logit_derivatives(params, self.x, self.y)
+
+    def ordinal_derivatives(
+        self,
+        beta: np.ndarray,
+        thresholds: np.ndarray,
+    ) -> tuple[float, np.ndarray, np.ndarray]:
+        """Compute the ordinal logit statistics of the shard.
+
+        Returns:
+            tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient
+                and Hessian.
+
+        """
+        return loglike_derivatives(beta, thresholds, self.x, self.y)
+
+
+# The methods of `ShardWorker` a coordinator may call
+WORKER_METHODS = frozenset(
+    {"load", "counts", "logit_derivatives", "ordinal_derivatives"},
+)
+
+
+def serve_connection(connection: Connection) -> bool:
+    """Answer the requests of a coordinator until it closes the connection.
+
+    Every request is a tuple of a method name of `WORKER_METHODS` and its
+    arguments, and is answered with ("ok", result) or ("error", message).
+
+    Returns:
+        bool: True if the coordinator asked the worker to shut down.
+
+    """
+    worker = ShardWorker()
+    with connection:
+        while True:
+            try:
+                method, *args = connection.recv()
+            except EOFError:
+                return False
+            if method in {"close", "shutdown"}:
+                return method == "shutdown"
+            if method not in WORKER_METHODS:
+                connection.send(("error", f"Unknown method {method!r}"))
+                continue
+
+            try:
+                connection.send(("ok", getattr(worker, method)(*args)))
+            except Exception as e:  # noqa: BLE001
+                connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve(address: tuple[str, int], authkey: bytes) -> None:
+    """Serve coordinators one at a time until one asks to shut down.
+
+    Raises:
+        ValueError: if the authentication key is empty.
+
+    """
+    if not authkey:
+        msg = "A shard worker needs an authentication key"
+        raise ValueError(msg)
+
+    with Listener(address, authkey=authkey) as listener:
+        logger.info("Serving shard worker on %s:%d", *listener.address)
+        while not serve_connection(listener.accept()):
+            pass
+
+
+class Transport:
+    """Connections to the shard workers of a fit."""
+
+    def __init__(self, connections: Sequence[Connection]) -> None:
+        """Use open connections to workers."""
+        self.connections = list(connections)
+
+    def __enter__(self) -> Self:
+        """Return the transport.
+
+        Returns:
+            Transport: the transport.
+
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the connections."""
+        self.close()
+
+    def request(self, method: str, *args: object) -> list:
+        """Call a method of every worker, which all run concurrently.
+
+        Returns:
+            list: the result of every worker.
+
+        """
+        return self.request_each(method, [args] * len(self.connections))
+
+    def request_each(self, method: str, args: Sequence[tuple]) -> list:
+        """Call a method of every worker with arguments of its own.
+
+        The requests are sent to all workers before waiting for any reply, so
+        the workers compute concurrently.
+
+        Raises:
+            RuntimeError: if a worker failed.
+
+        Returns:
+            list: the result of every worker.
+
+        """
+        for connection, worker_args in zip(self.connections, args, strict=True):
+            connection.send((method, *worker_args))
+        replies = [connection.recv() for connection in self.connections]
+
+        errors = [result for status, result in replies if status == "error"]
+        if errors:
+            msg = f"{len(errors)} shard worker(s) failed: {errors[0]}"
+            raise RuntimeError(msg)
+
+        return [result for _, result in replies]
+
+    def close(self) -> None:
+        """Release the workers and close the connections."""
+        for connection in self.connections:
+            with contextlib.suppress(OSError):
+                connection.send(("close",))
+            connection.close()
+        self.connections = []
+
+
+class LocalProcessTransport(Transport):
+    """Shard workers running as processes of this machine."""
+
+    def __init__(self, n_workers: int) -> None:
+        """Start the worker processes."""
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        connections, self.processes = [], []
+        for _ in range(n_workers):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=serve_connection,
+                args=(worker_connection,),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            self.processes.append(process)
+
+        super().__init__(connections)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        super().close()
+        for process in self.processes:
+            process.join()
+
+
+class SocketTransport(Transport):
+    """Shard workers started with `serve`, possibly on other machines."""
+
+    def __init__(self, addresses: Sequence[tuple[str, int]], authkey: bytes) -> None:
+        """Connect to the workers."""
+        super().__init__([Client(address, authkey=authkey) for address in addresses])
+
+
+def load_shards(transport: Transport, paths: Sequence[str], model: str) -> int:
+    """Let every worker load its shard.
+
+    The paths are those of the shards on the machines of the workers.
+
+    Returns:
+        int: the number of rows of all shards.
+
+    """
+    return sum(transport.request_each("load", [(str(p), model) for p in paths]))
+
+
+def _sum_statistics(
+    partials: list[tuple[float, np.ndarray, np.ndarray]],
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """Merge the statistics of the shards.
+
+    Returns:
+        tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient and
+            Hessian of all rows.
+
+    """
+    llfs, grads, hessians = zip(*partials, strict=True)
+    return float(sum(llfs)), np.sum(grads, axis=0), np.sum(hessians, axis=0)
+
+
+@instrument
+def fit_distributed_logit(
+    transport: Transport,
+    n_params: int,
+    tol: float = 1e-8,
+    maxiter: int = 35,
+) -> LogitFit:
+    """Fit the binary logit model to the shards loaded by the workers.
+
+    Returns:
+        LogitFit: the estimates, equal to those of `fit_logit` on all rows.
+
+    """
+    return newton_logit(
+        lambda p: _sum_statistics(transport.request("logit_derivatives", p)),
+        np.zeros(n_params),
+        tol=tol,
+        maxiter=maxiter,
+    )
+
+
+@instrument
+def fit_distributed_ordinal_logit(
+    transport: Transport,
+    n_beta: int,
+    tol: float = 1e-8,
+    maxiter: int = 100,
+) -> OrdinalLogitFit:
+    """Fit the ordinal logit model to the shards loaded by the workers.
+
+    Returns:
+        OrdinalLogitFit: the estimates, equal to those of `fit_ordinal_logit`
+            on all rows.
+
+    """
+    counts = np.sum(transport.request("counts"), axis=0)
+
+    return newton_ordinal_logit(
+        lambda b, c: _sum_statistics(transport.request("ordinal_derivatives", b, c)),
+        np.zeros(n_beta),
+        thresholds_from_counts(counts),
+        tol=tol,
+        maxiter=maxiter,
+    )
+
+
+def fit_shards(
+    transport: Transport,
+    paths: Sequence[str | Path],
+    model: str,
+) -> LogitFit | OrdinalLogitFit:
+    """Load the shards on the workers and fit a model to them.
+
+    Returns:
+        LogitFit | OrdinalLogitFit: the estimates.
+
+    """
+    n_rows = load_shards(transport, [str(p) for p in paths], model)
+    logger.info("Loaded %d rows on %d workers", n_rows, len(transport.connections))
+    if model == "binary":
+        n_params = len(binary_logistic_regression.PREDICTORS) + 1
+        return fit_distributed_logit(transport, n_params)
+
+    n_beta = len(ordinal_logistic_regression.PREDICTORS)
+    return fit_distributed_ordinal_logit(transport, n_beta)
+
+
+def param_names(model: str) -> list[str]:
+    """Name the parameters of a model fitted by `fit_shards`.
+
+    Returns:
+        list[str]: the names, in the order of the estimates.
+
+    """
+    if model == "binary":
+        return ["const", *binary_logistic_regression.PREDICTORS]
+
+    levels = list(OBESITY_LEVEL_ENCODING.values())
+    return [
+        *ordinal_logistic_regression.PREDICTORS,
+        *(f"{low}/{high}" for low, high in pairwise(levels)),
+    ]
+
+
+def _address(text: str) -> tuple[str, int]:
+    """Parse a HOST:PORT address.
+
+    Returns:
+        tuple[str, int]: the host and port.
+
+    """
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Serve a shard worker, or fit a model over shards."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    authkey = os.environ.get("SDA_AUTHKEY")
+    authkey_help = "key shared by the coordinator and workers; default $SDA_AUTHKEY"
+
+    worker = commands.add_parser("serve", help="serve a shard worker")
+    worker.add_argument("--host", default="localhost")
+    worker.add_argument("--port", type=int, default=6000)
+    worker.add_argument("--authkey", default=authkey, help=authkey_help)
+
+    fit = commands.add_parser("fit", help="fit a model over shards")
+    fit.add_argument("shards", nargs="+", help="raw CSV shard of every worker")
+    fit.add_argument("--model", choices=MODELS, default="binary")
+    fit.add_argument(
+        "--connect",
+        type=_address,
+        nargs="+",
+        help="HOST:PORT of every worker; by default local processes are started",
+    )
+    fit.add_argument("--authkey", default=authkey, help=authkey_help)
+    args = parser.parse_args(argv)
+
+    if (args.command == "serve" or args.connect) and not args.authkey:
+        parser.error("--authkey or SDA_AUTHKEY is required to serve or connect")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "serve":
+        serve((args.host, args.port), args.authkey.encode())
+        return
+
+    if args.connect:
+        transport = SocketTransport(args.connect, args.authkey.encode())
+    else:
+        transport = LocalProcessTransport(len(args.shards))
+    with transport:
+        result = fit_shards(transport, args.shards, args.model)
+
+    table = pd.DataFrame(
+        {"coef": result.params, "std_err": np.sqrt(np.diag(result.cov_params))},
+        index=param_names(args.model),
+    )
+    logger.info("Log-likelihood: %.4f", result.llf)
+    logger.info("Iterations: %d, converged: %s", result.iterations, result.converged)
+    logger.info(table.to_string(float_format="{:.4f}".format))
+
+
+if __name__ == "__main__":
+    main()
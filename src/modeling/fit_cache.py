@@ -0,0 +1,188 @@
+"""Disk cache of model fits, keyed on the data and the specification of a fit.
+
+A fit is keyed on a hash of its kind, the names of its parameters, the solver
+options, and the contents of the design matrix and target. A fit whose key is
+unchanged is read from the cache instead of being fitted again, and its
+statsmodels results are rebuilt from the cached estimates.
+
+Every fit is stored as an uncompressed npz file of its estimates: the
+parameters, their covariance and the fit statistics. The cache is bounded in
+size; when it grows past its limit, the least recently used fits are removed.
+
+Copyright (C) 2025.
+"""
+
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+import numpy as np
+
+CACHE_DIR = "data/cache/fits"
+MAX_BYTES = 64 << 20
+
+Fit = TypeVar("Fit")
+
+
+def fit_key(
+    kind: str,
+    x: np.ndarray,
+    y: np.ndarray,
+    names: Sequence[str],
+    options: Mapping[str, Any],
+) -> str:
+    """Hash everything that determines a fit.
+
+    Args:
+        kind (str): the model and link, e.g. "logit".
+        x (np.ndarray): the design matrix.
+        y (np.ndarray): the target.
+        names (Sequence[str]): the names of the columns of the design matrix,
+            in order.
+        options (Mapping[str, Any]): the solver options.
+
+    Returns:
+        str: the hex SHA-256 digest of the fit.
+
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y)
+
+    digest = hashlib.sha256()
+    for part in (
+        kind,
+        json.dumps([str(name) for name in names]),
+        json.dumps(options, sort_keys=True, default=str),
+        json.dumps([x.shape, str(y.dtype), y.shape]),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(x.tobytes())
+    digest.update(y.tobytes())
+
+    return digest.hexdigest()
+
+
+class FitCache:
+    """A size-bounded directory of fits, evicted least recently used first.
+
+    A fit is a dataclass of arrays and scalars, e.g. a `LogitFit` or an
+    `OrdinalLogitFit`. Reading a fit marks it as used by updating the
+    modification time of its file. While the cache is disabled, nothing is read
+    or written, e.g. so that benchmarks time the fits themselves.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = CACHE_DIR,
+        max_bytes: int = MAX_BYTES,
+    ) -> None:
+        """Set up the cache in a directory.
+
+        Args:
+            directory (str | Path): the directory of the fit files.
+            max_bytes (int): the size the fit files are kept under.
+
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = True
+
+    @contextmanager
+    def disabled(self) -> Iterator[None]:
+        """Disable the cache within a with block.
+
+        Yields:
+            None: while the cache is disabled.
+
+        """
+        enabled, self.enabled = self.enabled, False
+        try:
+            yield
+        finally:
+            self.enabled = enabled
+
+    def _path(self, key: str) -> Path:
+        """Find the file of a fit.
+
+        Returns:
+            Path: the path of the fit file.
+
+        """
+        return self.directory / f"{key[:32]}.npz"
+
+    def get(self, key: str, fit_type: type[Fit]) -> Fit | None:
+        """Read a fit from the cache.
+
+        A fit file that cannot be read or does not match the fit type, e.g. a
+        truncated file or one written by an older version, is removed and
+        treated as not cached.
+
+        Returns:
+            Fit | None: the fit, or None if it is not cached.
+
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                values = {
+                    name: saved[name] if saved[name].ndim else saved[name].item()
+                    for name in saved.files
+                }
+            fit = fit_type(**values)
+            path.touch()
+        except FileNotFoundError:
+            return None
+        except Exception:  # noqa: BLE001
+            path.unlink(missing_ok=True)
+            return None
+
+        return fit
+
+    def put(self, key: str, fit: object) -> None:
+        """Write a fit to the cache, replacing it atomically.
+
+        The least recently used fits are then removed until the cache is under
+        its size limit.
+        """
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz",
+        )
+        np.savez(tmp_path, **dataclasses.asdict(fit))  # pyright: ignore[reportArgumentType]
+        tmp_path.replace(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used fits until the cache fits its limit."""
+        files = []
+        for path in self.directory.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if ".tmp" not in path.suffixes:
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+FIT_CACHE = FitCache()
@@ -3,13 +3,20 @@
 Copyright (C) 2025.
 """
 
+from __future__ import annotations
+
 import logging
+from typing import TYPE_CHECKING
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.instrumentation import instrument
+from src.modeling.design_matrix import MODEL_DESIGN, design_matrix
+from src.modeling.ordinal_newton import fit_ordered_model
+from src.reporting import log_to_file
 
-import pandas as pd
-from statsmodels.miscmodels.ordinal_model import (
-    OrderedModel,
-    OrderedResults,
-)
+if TYPE_CHECKING:
+    import pandas as pd
+    from statsmodels.miscmodels.ordinal_model import OrderedResults
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,7 @@ logger = logging.getLogger(__name__)
 DATASET_PATH = "data/obesity_cleaned_final.csv"
 
 
+@instrument
 def read_data(filename: str) -> pd.DataFrame:
     """Read the dataset.
 
@@ -24,9 +32,10 @@ def read_data(filename: str) -> pd.DataFrame:
         pd.DataFrame: the dataset as a pandas dataframe.
 
     """
-    return pd.read_csv(filename, sep=";")
+    return load_cleaned_data(filename)
 
 
+@instrument
 def prepare_for_ordinal_regression_with_interactions(
     df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -38,42 +47,14 @@ def prepare_for_ordinal_regression_with_interactions(
     """
     y: pd.DataFrame = df["Obesity_Level"]
 
-    # Base predictors
-    predictors = [
-        "Gender",
-        "Age",
-        "Height",
-        "Weight",
-        "family_history_with_overweight",
-        "FAVC",
-        "FCVC",
-        "NCP",
-        "CAEC",
-        "SMOKE",
-        "CH2O",
-        "SCC",
-        "FAF",
-        "TUE",
-        "CALC",
-        "MTRANS_Automobile",
-        "MTRANS_Bike",
-        "MTRANS_Motorbike",
-        "MTRANS_Public_Transportation",
-    ]
-
-    x = df[predictors].copy()
-
-    # Define key lifestyle factors for interaction
-    # These were chosen based on their significance in the previous lifestyle model
-    lifestyle_interaction_vars = ["FCVC", "NCP", "CAEC", "SMOKE", "CH2O", "FAF"]
-
-    # Create interaction terms
-    for col in lifestyle_interaction_vars:
-        x[f"family_history_x_{col}"] = x["family_history_with_overweight"] * x[col]
+    # Base predictors and their interactions with the family history, a view
+    # of the shared design matrix
+    x: pd.DataFrame = design_matrix(df).frame(MODEL_DESIGN.names()[1:])
 
     return x, y
 
 
+@instrument
 def run_ordinal_logistic_regression(
     x: pd.DataFrame,
     y: pd.DataFrame,
@@ -84,19 +65,12 @@ def run_ordinal_logistic_regression(
         OrderedResultsWrapper: the results of the ordinary logistic regression
 
     """
-    model = OrderedModel(y, x, distr="logit")
-
-    return model.fit(method="bfgs")
+    return fit_ordered_model(x, y)
 
 
 def main() -> None:
     """Read + prepare dataset, perform ordinal logistic regression + interactions."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(message)s",
-        filename="results/interaction_model_summary.log",
-        filemode="w",
-    )
+    log_to_file(logger, "results/interaction_model_summary.log")
     df = read_data(DATASET_PATH)
 
     x, y = prepare_for_ordinal_regression_with_interactions(df)
@@ -0,0 +1,299 @@
+"""Search the pairwise interactions of the ordinal model's predictors.
+
+Every pairwise product of the base predictors is a candidate interaction. The
+candidates are ranked with Rao score tests, which need only the per-row
+derivatives of the model without the interaction: the score of a new column z
+is sum(-z * (da + db)), and its information follows from the same per-row
+second derivatives. The tests of all candidates are computed together as
+matrix products over the candidate columns, so ranking every candidate costs
+about as much as one Newton step of the model.
+
+Forward selection then fits only the best-ranked candidates, in parallel and
+starting from the current estimates, adds the one with the largest likelihood
+ratio if it is significant, and ranks the remaining candidates again against
+the extended model.
+
+Copyright (C) 2025.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from itertools import combinations
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.modeling.ordinal_logistic_regression import prepare_for_ordinal_regression
+from src.modeling.ordinal_newton import (
+    OrdinalLogitFit,
+    fit_ordered_model,
+    fit_ordinal_logit,
+    link_derivatives,
+    loglike_derivatives,
+    thresholds_from_params,
+)
+from src.modeling.parallel import make_executor
+from src.reporting import log_to_file
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from statsmodels.miscmodels.ordinal_model import OrderedResults
+
+logger = logging.getLogger(__name__)
+
+# Number of best-ranked candidates fitted in every selection step
+N_FITTED = 8
+MAX_TERMS = 6
+ALPHA = 0.05
+
+
+@dataclass
+class InteractionSearch:
+    """The interactions chosen by forward selection and the final model."""
+
+    scores: pd.DataFrame
+    steps: pd.DataFrame
+    selected: list[str]
+    result: OrderedResults
+
+
+def interaction_candidates(x: pd.DataFrame) -> pd.DataFrame:
+    """Create all pairwise products of the predictors.
+
+    Products that are constant, such as those of mutually exclusive dummies,
+    are left out.
+
+    Returns:
+        pd.DataFrame: the candidate interaction columns.
+
+    """
+    values = x.to_numpy(dtype=np.float64)
+    first, second = np.array(list(combinations(range(x.shape[1]), 2))).T
+    products = values[:, first] * values[:, second]
+    names = [
+        f"{x.columns[i]}_x_{x.columns[j]}" for i, j in zip(first, second, strict=True)
+    ]
+
+    varying = np.ptp(products, axis=0) > 0
+    return pd.DataFrame(
+        products[:, varying],
+        index=x.index,
+        columns=np.array(names)[varying],
+    )
+
+
+def score_tests(
+    x: np.ndarray,
+    y: np.ndarray,
+    params: np.ndarray,
+    candidates: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compute Rao score tests of adding each candidate column to a fitted model.
+
+    Args:
+        x (np.ndarray): the (rows x predictors) design matrix of the model.
+        y (np.ndarray): the response category of every row, coded 0..J-1.
+        params (np.ndarray): the estimates of the model, in the parametrization
+            of `OrderedModel`.
+        candidates (np.ndarray): the (rows x candidates) candidate columns.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the score statistic and p-value of every
+            candidate, NaN for candidates that are collinear with the model.
+
+    """
+    n_beta = x.shape[1]
+    beta = params[:n_beta]
+    thresholds = thresholds_from_params(params[n_beta:])
+    d = link_derivatives(beta, thresholds, x, y)
+    _, _, hess = loglike_derivatives(beta, thresholds, x, y)
+
+    # a and b both decrease by z when the coefficient of z increases
+    score = -candidates.T @ (d.da + d.db)
+    info_new = -(candidates**2).T @ (d.haa + 2 * d.hab + d.hbb)
+    info_cross = candidates.T @ (
+        (d.haa + d.hab)[:, None] * d.grad_a + (d.hab + d.hbb)[:, None] * d.grad_b
+    )
+
+    # The information left after adjusting for the estimated parameters
+    adjusted = np.linalg.solve(-hess, info_cross.T)
+    variance = info_new - np.sum(info_cross * adjusted.T, axis=1)
+    valid = variance > 1e-10 * np.maximum(info_new, 1)
+
+    stat = np.full(len(score), np.nan)
+    stat[valid] = score[valid] ** 2 / variance[valid]
+
+    return stat, chi2.sf(stat, 1)
+
+
+# Design matrix, candidates and target shared by all fits in a worker process
+_worker_data: dict[str, np.ndarray | int] = {}
+
+
+def _init_worker(
+    x: np.ndarray,
+    candidates: np.ndarray,
+    y: np.ndarray,
+    n_levels: int,
+) -> None:
+    """Store the data of the fits in a worker process."""
+    _worker_data.update(x=x, candidates=candidates, y=y, n_levels=n_levels)
+
+
+def _design(selected: Sequence[int]) -> np.ndarray:
+    """Combine the base predictors with the selected candidates.
+
+    Returns:
+        np.ndarray: the design matrix.
+
+    """
+    x, candidates = _worker_data["x"], _worker_data["candidates"]
+    return np.hstack((x, candidates[:, list(selected)]))  # pyright: ignore[reportIndexIssue]
+
+
+def _fit_with(
+    selected: list[int],
+    start_params: np.ndarray,
+) -> OrdinalLogitFit:
+    """Fit the ordinal model with the base predictors and some candidates.
+
+    Returns:
+        OrdinalLogitFit: the estimates.
+
+    """
+    return fit_ordinal_logit(
+        _design(selected),
+        _worker_data["y"],  # pyright: ignore[reportArgumentType]
+        n_levels=_worker_data["n_levels"],  # pyright: ignore[reportArgumentType]
+        start_params=start_params,
+    )
+
+
+def _extend_params(params: np.ndarray, n_beta: int) -> np.ndarray:
+    """Add a zero coefficient for a new column before the thresholds.
+
+    Returns:
+        np.ndarray: the starting values of the extended model.
+
+    """
+    return np.concatenate((params[:n_beta], [0.0], params[n_beta:]))
+
+
+def forward_selection(  # noqa: PLR0913
+    x: pd.DataFrame,
+    y: pd.Series,
+    candidates: pd.DataFrame,
+    *,
+    n_fitted: int = N_FITTED,
+    max_terms: int = MAX_TERMS,
+    alpha: float = ALPHA,
+    max_workers: int | None = None,
+) -> InteractionSearch:
+    """Select interactions by forward selection guided by score tests.
+
+    Every step ranks the remaining candidates by their score test against the
+    current model, fits the `n_fitted` best in parallel, each starting from the
+    current estimates, and adds the candidate with the largest likelihood
+    ratio. Selection stops after `max_terms` terms, when no candidate is left,
+    or when the best likelihood ratio test is not significant at `alpha`,
+    Bonferroni-corrected for the number of remaining candidates.
+
+    Returns:
+        InteractionSearch: the initial ranking of the candidates, the
+            selection steps and the final model.
+
+    """
+    from statsmodels.miscmodels.ordinal_model import OrderedModel  # noqa: PLC0415
+
+    model = OrderedModel(y, x, distr="logit")
+    x_values, y_codes = model.exog, model.endog.astype(np.intp)
+    z_values = candidates.to_numpy(dtype=np.float64)
+    names = list(candidates.columns)
+
+    fit = fit_ordinal_logit(x_values, y_codes, n_levels=model.k_levels)
+    stat, pvalue = score_tests(x_values, y_codes, fit.params, z_values)
+    scores = pd.DataFrame({"score": stat, "p_value": pvalue}, index=names)
+
+    selected: list[int] = []
+    steps = []
+    executor = make_executor(
+        max_workers,
+        _init_worker,
+        (x_values, z_values, y_codes, model.k_levels),
+        preload=__name__,
+    )
+    with executor:
+        while len(selected) < max_terms:
+            remaining = np.setdiff1d(np.arange(len(names)), selected)
+            if remaining.size == 0:
+                break
+            if selected:
+                design = np.hstack((x_values, z_values[:, selected]))
+                rest = z_values[:, remaining]
+                stat, _ = score_tests(design, y_codes, fit.params, rest)
+            else:
+                stat = scores["score"].to_numpy()[remaining]
+            ranked = remaining[np.argsort(-np.nan_to_num(stat, nan=-1))][:n_fitted]
+
+            start = _extend_params(fit.params, x_values.shape[1] + len(selected))
+            futures = {
+                j: executor.submit(_fit_with, [*selected, j], start) for j in ranked
+            }
+            fits = {j: future.result() for j, future in futures.items()}
+            best = max(fits, key=lambda j: fits[j].llf)
+
+            lr_stat = 2 * (fits[best].llf - fit.llf)
+            lr_pvalue = chi2.sf(lr_stat, 1)
+            if lr_pvalue >= alpha / len(remaining):
+                break
+
+            selected.append(int(best))
+            fit = fits[best]
+            steps.append(
+                {
+                    "term": names[best],
+                    "lr_stat": lr_stat,
+                    "lr_pvalue": lr_pvalue,
+                    "llf": fit.llf,
+                },
+            )
+
+    selected_names = [names[j] for j in selected]
+    result = fit_ordered_model(
+        pd.concat((x, candidates[selected_names]), axis=1),
+        y,
+        start_params=fit.params,
+    )
+
+    return InteractionSearch(
+        scores=scores.sort_values("score", ascending=False),
+        steps=pd.DataFrame(steps, columns=["term", "lr_stat", "lr_pvalue", "llf"]),
+        selected=selected_names,
+        result=result,
+    )
+
+
+def main() -> None:
+    """Rank all interactions of the ordinal model and select the strongest."""
+    log_to_file(logger, "results/interaction_screen_summary.log")
+    df = load_cleaned_data()
+    x, y = prepare_for_ordinal_regression(df)
+
+    search = forward_selection(x, y, interaction_candidates(x), max_workers=1)
+
+    logger.info("--- Score Tests of Pairwise Interactions (Top 20) ---")
+    logger.info(search.scores.head(20).to_string(float_format="{:.4g}".format))
+    logger.info("\n--- Forward Selection ---")
+    logger.info(search.steps.to_string(float_format="{:.4g}".format))
+    logger.info("\n--- Selected Interaction Model Summary ---")
+    logger.info(search.result.summary().as_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Newton solvers for the binary logit model.
+
+Besides a single fit, the batched solver fits many weighted versions of the
+same logit model at once: every row of the weight matrix gives the weights of
+the observations in one fit, e.g. the resample counts of a bootstrap
+replicate. Gradients and Hessians of all fits are computed together with
+batched matrix products. The chunked solver fits a model to rows that do not
+fit in memory together, summing the gradients and Hessians of chunks of rows.
+
+Copyright (C) 2025.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+from scipy.special import expit, log_expit
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from statsmodels.discrete.discrete_model import Logit, LogitResults
+
+
+@dataclass
+class LogitFit:
+    """The estimates of a fitted binary logit model."""
+
+    params: np.ndarray
+    cov_params: np.ndarray
+    llf: float
+    iterations: int
+    converged: bool
+
+
+def logit_derivatives(
+    params: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """Compute the log-likelihood of a logit model with its gradient and Hessian.
+
+    Returns:
+        tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient and
+            Hessian.
+
+    """
+    eta = x @ params
+    prob = expit(eta)
+    llf = float(np.sum(y * log_expit(eta) + (1 - y) * log_expit(-eta)))
+    grad = x.T @ (y - prob)
+    hess = -(x.T * (prob * (1 - prob))) @ x
+
+    return llf, grad, hess
+
+
+def fit_logit_batch(  # noqa: PLR0913
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray,
+    start_params: np.ndarray | None = None,
+    *,
+    tol: float = 1e-8,
+    maxiter: int = 35,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fit a batch of weighted logit models with Newton's method.
+
+    Fits stop updating once their largest parameter change is below `tol`.
+
+    Args:
+        x (np.ndarray): the (rows x parameters) design matrix, with constant.
+        y (np.ndarray): the binary target.
+        weights (np.ndarray): the (fits x rows) weights of every fit.
+        start_params (np.ndarray | None): the starting values shared by all
+            fits, e.g. the estimates on the full data. Zero by default.
+        tol (float): the convergence tolerance on the parameter change.
+        maxiter (int): the maximum number of Newton steps.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the (fits x parameters) estimates and
+            whether every fit converged.
+
+    """
+    n_fits = weights.shape[0]
+    params = np.zeros((n_fits, x.shape[1]))
+    if start_params is not None:
+        params[:] = start_params
+    converged = np.zeros(n_fits, dtype=bool)
+
+    for _ in range(maxiter):
+        active = ~converged
+        if not active.any():
+            break
+
+        w = weights[active]
+        prob = expit(params[active] @ x.T)
+        grad = (w * (y - prob)) @ x
+        info = np.einsum("bn,ni,nj->bij", w * prob * (1 - prob), x, x)
+        try:
+            step = np.linalg.solve(info, grad[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            # Separated resamples can have singular information matrices
+            step = np.einsum("bij,bj->bi", np.linalg.pinv(info), grad)
+
+        params[active] += step
+        converged[active] = np.max(np.abs(step), axis=1) < tol
+
+    return params, converged
+
+
+def accumulate_logit_derivatives(
+    params: np.ndarray,
+    chunks: Iterable[tuple[np.ndarray, np.ndarray]],
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """Sum the log-likelihood, gradient and Hessian over chunks of rows.
+
+    Only one chunk and the (parameters x parameters) totals are held in memory
+    at a time, so the rows do not have to fit in memory together.
+
+    Returns:
+        tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient and
+            Hessian of all rows.
+
+    """
+    llf, grad, hess = 0.0, np.zeros(len(params)), np.zeros((len(params),) * 2)
+    for x, y in chunks:
+        chunk_llf, chunk_grad, chunk_hess = logit_derivatives(
+            params,
+            np.asarray(x, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+        )
+        llf += chunk_llf
+        grad += chunk_grad
+        hess += chunk_hess
+
+    return llf, grad, hess
+
+
+def newton_logit(
+    derivatives: Callable[[np.ndarray], tuple[float, np.ndarray, np.ndarray]],
+    params: np.ndarray,
+    *,
+    tol: float,
+    maxiter: int,
+) -> LogitFit:
+    """Maximize a logit log-likelihood with Newton's method.
+
+    The derivatives are computed by a function of the parameters, so the rows
+    can be held in memory, streamed in chunks or spread over shard workers.
+
+    Returns:
+        LogitFit: the estimates.
+
+    """
+    converged = False
+    iterations = 0
+    llf, grad, hess = derivatives(params)
+    while iterations < maxiter:
+        iterations += 1
+        step = np.linalg.lstsq(-hess, grad, rcond=None)[0]
+        params = params + step
+        llf, grad, hess = derivatives(params)
+        if np.max(np.abs(step)) < tol:
+            converged = True
+            break
+
+    return LogitFit(
+        params=params,
+        cov_params=np.linalg.pinv(-hess),
+        llf=llf,
+        iterations=iterations,
+        converged=converged,
+    )
+
+
+def fit_logit(
+    x: np.ndarray,
+    y: np.ndarray,
+    start_params: np.ndarray | None = None,
+    *,
+    tol: float = 1e-8,
+    maxiter: int = 35,
+) -> LogitFit:
+    """Fit a single logit model with Newton's method.
+
+    Returns:
+        LogitFit: the estimates.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    params = np.zeros(x.shape[1]) if start_params is None else np.array(start_params)
+
+    return newton_logit(
+        lambda p: logit_derivatives(p, x, y),
+        params,
+        tol=tol,
+        maxiter=maxiter,
+    )
+
+
+def fit_logit_chunked(
+    chunks: Callable[[], Iterable[tuple[np.ndarray, np.ndarray]]],
+    n_params: int,
+    start_params: np.ndarray | None = None,
+    *,
+    tol: float = 1e-8,
+    maxiter: int = 35,
+) -> LogitFit:
+    """Fit a single logit model with Newton's method, one chunk at a time.
+
+    Every iteration goes over all chunks of rows and sums their gradients and
+    Hessians, which is all the Newton step needs. Memory use grows with the
+    square of the number of parameters and the size of a chunk, but not with
+    the number of rows. The steps are those of `fit_logit` on all rows.
+
+    Args:
+        chunks (Callable): returns a new iterable of (design matrix, target)
+            chunks, with constant, on every call.
+        n_params (int): the number of parameters.
+        start_params (np.ndarray | None): the starting values, zero by default.
+        tol (float): the convergence tolerance on the parameter change.
+        maxiter (int): the maximum number of Newton steps.
+
+    Returns:
+        LogitFit: the estimates.
+
+    """
+    params = np.zeros(n_params) if start_params is None else np.array(start_params)
+
+    return newton_logit(
+        lambda p: accumulate_logit_derivatives(p, chunks()),
+        params,
+        tol=tol,
+        maxiter=maxiter,
+    )
+
+
+def logit_results(model: Logit, fit: LogitFit) -> LogitResults:
+    """Wrap a fit in the statsmodels results of a `Logit` model.
+
+    This gives access to `summary()`, `predict()` and the other statsmodels
+    results without optimizing the model again.
+
+    Returns:
+        BinaryResultsWrapper: the statsmodels results.
+
+    """
+    from statsmodels.base.model import LikelihoodModelResults  # noqa: PLC0415
+    from statsmodels.discrete.discrete_model import (  # noqa: PLC0415
+        BinaryResultsWrapper,
+        LogitResults,
+    )
+
+    mlefit = LikelihoodModelResults(model, fit.params, fit.cov_params, scale=1.0)
+    mlefit.mle_retvals = {
+        "fopt": -fit.llf / len(model.endog),
+        "iterations": fit.iterations,
+        "converged": fit.converged,
+    }
+    mlefit.mle_settings = {"optimizer": "newton", "start_params": None}
+
+    return BinaryResultsWrapper(LogitResults(model, mlefit))
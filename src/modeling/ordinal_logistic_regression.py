@@ -3,15 +3,23 @@
 Copyright (C) 2025.
 """
 
-import pandas as pd
-from statsmodels.miscmodels.ordinal_model import (
-    OrderedModel,
-    OrderedResults,
-)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from src.data_preparation.prepare_data import load_cleaned_data
+from src.instrumentation import instrument
+from src.modeling.design_matrix import PREDICTORS, design_matrix
+from src.modeling.ordinal_newton import fit_ordered_model
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from statsmodels.miscmodels.ordinal_model import OrderedResults
 
 DATASET_PATH = "data/obesity_cleaned_final.csv"
 
 
+@instrument
 def read_data(filename: str) -> pd.DataFrame:
     """Read the dataset.
 
@@ -19,9 +27,10 @@ def read_data(filename: str) -> pd.DataFrame:
         pd.DataFrame: the dataset as a pandas dataframe.
 
     """
-    return pd.read_csv(filename, sep=";")
+    return load_cleaned_data(filename)
 
 
+@instrument
 def prepare_for_ordinal_regression(
     df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
@@ -34,34 +43,13 @@ def prepare_for_ordinal_regression(
     # Ordinal target
     y: pd.DataFrame = df["Obesity_Level"]
 
-    # Predictors
-    x: pd.DataFrame = df[
-        [
-            "Gender",
-            "Age",
-            "Height",
-            "Weight",
-            "family_history_with_overweight",
-            "FAVC",
-            "FCVC",
-            "NCP",
-            "CAEC",
-            "SMOKE",
-            "CH2O",
-            "SCC",
-            "FAF",
-            "TUE",
-            "CALC",
-            "MTRANS_Automobile",
-            "MTRANS_Bike",
-            "MTRANS_Motorbike",
-            "MTRANS_Public_Transportation",
-        ]
-    ]
+    # Predictors, a view of the shared design matrix
+    x: pd.DataFrame = design_matrix(df).frame(PREDICTORS)
 
     return x, y
 
 
+@instrument
 def run_ordinal_logistic_regression(
     x: pd.DataFrame,
     y: pd.DataFrame,
@@ -72,9 +60,7 @@ def run_ordinal_logistic_regression(
         OrderedResultsWrapper: the results of the ordinary logistic regression
 
     """
-    model = OrderedModel(y, x, distr="logit")
-
-    return model.fit(method="bfgs")
+    return fit_ordered_model(x, y)
 
 
 def main() -> None:
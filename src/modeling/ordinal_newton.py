@@ -0,0 +1,474 @@
+"""Newton solver for the ordinal (cumulative) logit model.
+
+The model is the one fitted by statsmodels' `OrderedModel` with
+`distr="logit"`:
+
+    P(y <= j | x) = F(c_j - x'beta),  with F the logistic CDF,
+
+for increasing thresholds c_0 < ... < c_{J-2}. The score and Hessian of the
+log-likelihood have closed forms, so every Newton step costs a few matrix
+products over the rows instead of the numerical derivatives used by the
+generic optimizers.
+
+Internally the solver works with the thresholds themselves. Results are
+reported in the parametrization of `OrderedModel`, in which the first
+threshold is kept and the others are replaced by the log of their increments,
+so parameters and standard errors can be compared with statsmodels directly.
+
+Copyright (C) 2025.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+from scipy.special import expit, logit
+
+from src.modeling.fit_cache import FIT_CACHE, fit_key
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    import pandas as pd
+    from statsmodels.miscmodels.ordinal_model import OrderedModel, OrderedResults
+
+# Smallest probability used for a response category, to keep logs finite
+MIN_PROB = 1e-300
+
+# Smallest fraction of a Newton step tried before giving up on the step, e.g.
+# when the Hessian is nearly singular
+MIN_STEP_SIZE = 1e-10
+
+# Version of the solver, part of the fit cache key; bump it when a change of
+# the solver changes its estimates, so that cached fits are not reused
+SOLVER_VERSION = 1
+
+
+@dataclass
+class OrdinalLogitFit:
+    """The estimates of a fitted ordinal logit model.
+
+    Parameters are in the parametrization of `OrderedModel`: the coefficients,
+    followed by the first threshold and the logs of the threshold increments.
+    """
+
+    params: np.ndarray
+    cov_params: np.ndarray
+    llf: float
+    iterations: int
+    converged: bool
+    evaluations: int
+
+
+@dataclass
+class LinkDerivatives:
+    """Per-row derivatives of the log-likelihood of the ordinal logit.
+
+    Every row's log-likelihood is log(F(a) - F(b)), with a and b the distances
+    of the linear predictor to the upper and lower threshold of the observed
+    category. `grad_a` and `grad_b` hold the gradients of a and b with respect
+    to the coefficients and thresholds.
+    """
+
+    logp: np.ndarray
+    da: np.ndarray
+    db: np.ndarray
+    haa: np.ndarray
+    hbb: np.ndarray
+    hab: np.ndarray
+    grad_a: np.ndarray
+    grad_b: np.ndarray
+
+    def score_obs(self) -> np.ndarray:
+        """Compute the score of every row.
+
+        Returns:
+            np.ndarray: the (rows x parameters) matrix of scores.
+
+        """
+        return self.grad_a * self.da[:, None] + self.grad_b * self.db[:, None]
+
+
+def thresholds_from_params(threshold_params: np.ndarray) -> np.ndarray:
+    """Convert `OrderedModel` threshold parameters to thresholds.
+
+    Returns:
+        np.ndarray: the increasing thresholds.
+
+    """
+    increments = np.concatenate(
+        (threshold_params[:1], np.exp(threshold_params[1:])),
+    )
+    return np.cumsum(increments)
+
+
+def params_from_thresholds(thresholds: np.ndarray) -> np.ndarray:
+    """Convert thresholds to `OrderedModel` threshold parameters.
+
+    Returns:
+        np.ndarray: the first threshold followed by the log increments.
+
+    """
+    return np.concatenate((thresholds[:1], np.log(np.diff(thresholds))))
+
+
+def link_derivatives(
+    beta: np.ndarray,
+    thresholds: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+) -> LinkDerivatives:
+    """Compute the per-row derivatives of the ordinal logit log-likelihood.
+
+    Args:
+        beta (np.ndarray): the coefficients.
+        thresholds (np.ndarray): the increasing thresholds.
+        x (np.ndarray): the (rows x predictors) design matrix.
+        y (np.ndarray): the response category of every row, coded 0..J-1.
+
+    Returns:
+        LinkDerivatives: the derivatives of every row's log-likelihood.
+
+    """
+    n_thresholds = len(thresholds)
+    eta = x @ beta
+    cuts = np.concatenate(([-np.inf], thresholds, [np.inf]))
+    cdf_a = expit(cuts[y + 1] - eta)
+    cdf_b = expit(cuts[y] - eta)
+    pdf_a = cdf_a * (1 - cdf_a)
+    pdf_b = cdf_b * (1 - cdf_b)
+    prob = np.maximum(cdf_a - cdf_b, MIN_PROB)
+
+    da = pdf_a / prob
+    db = -pdf_b / prob
+    haa = pdf_a * (1 - 2 * cdf_a) / prob - da**2
+    hbb = -pdf_b * (1 - 2 * cdf_b) / prob - db**2
+    hab = -da * db
+
+    # a = c_y - x'beta and b = c_{y-1} - x'beta; the outermost "thresholds" are
+    # infinite and have no column
+    rows = np.arange(len(y))
+    upper = np.zeros((len(y), n_thresholds))
+    lower = np.zeros((len(y), n_thresholds))
+    has_upper = y < n_thresholds
+    has_lower = y > 0
+    upper[rows[has_upper], y[has_upper]] = 1
+    lower[rows[has_lower], y[has_lower] - 1] = 1
+
+    return LinkDerivatives(
+        logp=np.log(prob),
+        da=da,
+        db=db,
+        haa=haa,
+        hbb=hbb,
+        hab=hab,
+        grad_a=np.hstack((-x, upper)),
+        grad_b=np.hstack((-x, lower)),
+    )
+
+
+def loglike_derivatives(
+    beta: np.ndarray,
+    thresholds: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray | None = None,
+) -> tuple[float, np.ndarray, np.ndarray]:
+    """Compute the log-likelihood with its gradient and Hessian.
+
+    The derivatives are with respect to the coefficients followed by the
+    thresholds. Rows can be weighted, e.g. by bootstrap resample counts.
+
+    Returns:
+        tuple[float, np.ndarray, np.ndarray]: the log-likelihood, gradient and
+            Hessian.
+
+    """
+    d = link_derivatives(beta, thresholds, x, y)
+    w = np.ones(len(y)) if weights is None else weights
+
+    llf = float(w @ d.logp)
+    grad = d.grad_a.T @ (w * d.da) + d.grad_b.T @ (w * d.db)
+    cross = d.grad_a.T @ ((w * d.hab)[:, None] * d.grad_b)
+    hess = (
+        d.grad_a.T @ ((w * d.haa)[:, None] * d.grad_a)
+        + d.grad_b.T @ ((w * d.hbb)[:, None] * d.grad_b)
+        + cross
+        + cross.T
+    )
+
+    return llf, grad, hess
+
+
+def start_thresholds(y: np.ndarray, n_levels: int) -> np.ndarray:
+    """Compute starting thresholds from the observed category frequencies.
+
+    Returns:
+        np.ndarray: the thresholds of the model without predictors.
+
+    """
+    return thresholds_from_counts(np.bincount(y, minlength=n_levels))
+
+
+def thresholds_from_counts(counts: np.ndarray) -> np.ndarray:
+    """Compute starting thresholds from the number of rows in every category.
+
+    Returns:
+        np.ndarray: the thresholds of the model without predictors.
+
+    """
+    freq = counts / counts.sum()
+    return logit(np.clip(np.cumsum(freq)[:-1], 1e-6, 1 - 1e-6))
+
+
+def threshold_jacobian(thresholds: np.ndarray, n_params: int) -> np.ndarray:
+    """Differentiate the `OrderedModel` parameters with respect to the thresholds.
+
+    Returns:
+        np.ndarray: the Jacobian of (beta, c_0, log(c_1 - c_0), ...) with respect
+            to (beta, c_0, c_1, ...).
+
+    """
+    n_beta = n_params - len(thresholds)
+    jac = np.eye(n_params)
+    for k, gap in enumerate(np.diff(thresholds), start=1):
+        jac[n_beta + k, n_beta + k] = 1 / gap
+        jac[n_beta + k, n_beta + k - 1] = -1 / gap
+
+    return jac
+
+
+def params_covariance(
+    thresholds: np.ndarray,
+    hessian: np.ndarray,
+) -> np.ndarray:
+    """Invert the Hessian and transform it to the `OrderedModel` parameters.
+
+    Returns:
+        np.ndarray: the covariance matrix of the `OrderedModel` parameters.
+
+    """
+    jac = threshold_jacobian(thresholds, hessian.shape[0])
+    return jac @ np.linalg.pinv(-hessian) @ jac.T
+
+
+def fit_ordinal_logit(  # noqa: PLR0913
+    x: np.ndarray,
+    y: np.ndarray,
+    n_levels: int | None = None,
+    *,
+    start_params: np.ndarray | None = None,
+    weights: np.ndarray | None = None,
+    tol: float = 1e-8,
+    maxiter: int = 100,
+) -> OrdinalLogitFit:
+    """Fit an ordinal logit model with Newton's method.
+
+    Every step is halved until it increases the log-likelihood and keeps the
+    thresholds increasing.
+
+    Args:
+        x (np.ndarray): the (rows x predictors) design matrix, no constant.
+        y (np.ndarray): the response category of every row, coded 0..J-1.
+        n_levels (int | None): the number of categories J, by default the
+            largest observed category plus one.
+        start_params (np.ndarray | None): starting values in the parametrization
+            of `OrderedModel`, e.g. from a related fit.
+        weights (np.ndarray | None): optional weights of the rows.
+        tol (float): the convergence tolerance on the Newton decrement.
+        maxiter (int): the maximum number of Newton steps.
+
+    Returns:
+        OrdinalLogitFit: the estimates.
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.intp)
+    if n_levels is None:
+        n_levels = int(y.max()) + 1
+    n_beta = x.shape[1]
+
+    if start_params is None:
+        beta = np.zeros(n_beta)
+        thresholds = start_thresholds(y, n_levels)
+    else:
+        beta = np.array(start_params[:n_beta], dtype=np.float64)
+        thresholds = thresholds_from_params(np.asarray(start_params[n_beta:]))
+
+    return newton_ordinal_logit(
+        lambda b, c: loglike_derivatives(b, c, x, y, weights),
+        beta,
+        thresholds,
+        tol=tol,
+        maxiter=maxiter,
+    )
+
+
+def newton_ordinal_logit(
+    derivatives: Callable[
+        [np.ndarray, np.ndarray],
+        tuple[float, np.ndarray, np.ndarray],
+    ],
+    beta: np.ndarray,
+    thresholds: np.ndarray,
+    *,
+    tol: float = 1e-8,
+    maxiter: int = 100,
+) -> OrdinalLogitFit:
+    """Maximize an ordinal logit log-likelihood with Newton's method.
+
+    The derivatives are computed by a function of the coefficients and the
+    thresholds, so the rows can be held in memory or spread over shard
+    workers. Every step is halved until it increases the log-likelihood and
+    keeps the thresholds increasing.
+
+    Returns:
+        OrdinalLogitFit: the estimates.
+
+    """
+    n_beta = len(beta)
+    llf, grad, hess = derivatives(beta, thresholds)
+    evaluations = 1
+    converged = False
+    iterations = 0
+    while iterations < maxiter:
+        iterations += 1
+        try:
+            step = np.linalg.solve(-hess, grad)
+        except np.linalg.LinAlgError:
+            # Not identified, e.g. a predictor that is constant in a resample
+            break
+        decrement = float(grad @ step)
+        if decrement / 2 < tol:
+            converged = True
+            break
+
+        size = 1.0
+        while size > MIN_STEP_SIZE:
+            new_beta = beta + size * step[:n_beta]
+            new_thresholds = thresholds + size * step[n_beta:]
+            if np.all(np.diff(new_thresholds) > 0):
+                new = derivatives(new_beta, new_thresholds)
+                evaluations += 1
+                if new[0] >= llf:
+                    break
+            size /= 2
+        else:
+            break
+
+        beta, thresholds = new_beta, new_thresholds
+        llf, grad, hess = new
+
+    params = np.concatenate((beta, params_from_thresholds(thresholds)))
+    return OrdinalLogitFit(
+        params=params,
+        cov_params=params_covariance(thresholds, hess),
+        llf=llf,
+        iterations=iterations,
+        converged=converged,
+        evaluations=evaluations,
+    )
+
+
+def ordinal_fit_key(  # noqa: PLR0913
+    x: np.ndarray,
+    y: np.ndarray,
+    n_levels: int,
+    names: Sequence[str],
+    *,
+    start_params: np.ndarray | None = None,
+    tol: float = 1e-8,
+    maxiter: int = 100,
+) -> str:
+    """Key an ordinal logit fit of `fit_ordinal_logit` in the fit cache.
+
+    The key covers the solver options and `SOLVER_VERSION`, so a fit with other
+    options or by another version of the solver is not read from the cache.
+
+    Returns:
+        str: the hex SHA-256 digest of the fit.
+
+    """
+    options = {
+        "distr": "logit",
+        "method": "newton",
+        "n_levels": int(n_levels),
+        "start_params": None if start_params is None else list(start_params),
+        "tol": float(tol),
+        "maxiter": int(maxiter),
+        "solver": SOLVER_VERSION,
+    }
+    return fit_key("ordinal_logit", x, np.asarray(y, dtype=np.intp), names, options)
+
+
+def ordinal_logit_results(
+    model: OrderedModel,
+    fit: OrdinalLogitFit,
+) -> OrderedResults:
+    """Wrap a fit in the statsmodels results of an `OrderedModel`.
+
+    This gives access to `summary()`, `aic`, `bic`, `predict()` and the other
+    statsmodels results without optimizing the model again.
+
+    Returns:
+        OrderedResultsWrapper: the statsmodels results.
+
+    """
+    from statsmodels.base.model import LikelihoodModelResults  # noqa: PLC0415
+    from statsmodels.miscmodels.ordinal_model import (  # noqa: PLC0415
+        OrderedResults,
+        OrderedResultsWrapper,
+    )
+
+    mlefit = LikelihoodModelResults(model, fit.params, fit.cov_params, scale=1.0)
+    mlefit.mle_retvals = {
+        "fopt": -fit.llf / model.nobs,
+        "iterations": fit.iterations,
+        "fcalls": fit.evaluations,
+        "converged": fit.converged,
+    }
+    mlefit.mle_settings = {"optimizer": "newton", "start_params": None}
+
+    result = OrderedResults(model, mlefit)
+    result.hasconst = 0
+
+    return OrderedResultsWrapper(result)
+
+
+def fit_ordered_model(
+    x: pd.DataFrame,
+    y: pd.Series,
+    start_params: np.ndarray | None = None,
+) -> OrderedResults:
+    """Fit an ordinal logit `OrderedModel` with the Newton solver.
+
+    A fit of the same data, predictors and starting values is read from the fit
+    cache instead of being fitted again.
+
+    Returns:
+        OrderedResultsWrapper: the statsmodels results of the fitted model.
+
+    """
+    from statsmodels.miscmodels.ordinal_model import OrderedModel  # noqa: PLC0415
+
+    model = OrderedModel(y, x, distr="logit")
+    key = ordinal_fit_key(
+        model.exog,
+        model.endog,
+        model.k_levels,
+        model.exog_names,
+        start_params=start_params,
+    )
+    fit = FIT_CACHE.get(key, OrdinalLogitFit)
+    if fit is None:
+        fit = fit_ordinal_logit(
+            model.exog,
+            model.endog,
+            n_levels=model.k_levels,
+            start_params=start_params,
+        )
+        FIT_CACHE.put(key, fit)
+
+    return ordinal_logit_results(model, fit)
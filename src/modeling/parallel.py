@@ -0,0 +1,123 @@
+"""Executors for spreading model fits over worker processes.
+
+Copyright (C) 2025.
+"""
+
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Self
+
+import numpy as np
+
+
+class InlineExecutor(Executor):
+    """Run tasks in the calling process, with the interface of an executor."""
+
+    def __init__(self, initializer: Callable, initargs: tuple) -> None:
+        """Run the initializer in the calling process."""
+        initializer(*initargs)
+
+    def submit(self, fn: Callable, /, *args: object, **kwargs: object) -> Future:
+        """Run a task right away.
+
+        Returns:
+            Future: the finished task.
+
+        """
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:  # noqa: BLE001
+            future.set_exception(e)
+
+        return future
+
+
+def make_executor(
+    max_workers: int | None,
+    initializer: Callable,
+    initargs: tuple,
+    preload: str,
+) -> Executor:
+    """Create a process pool whose workers share data set up by an initializer.
+
+    Workers fork from a server process that has imported the `preload` module
+    once, so they start without importing pandas and statsmodels again. The
+    initializer arguments are sent to every worker once, instead of with every
+    task.
+
+    Args:
+        max_workers (int | None): the number of worker processes; 1 runs all
+            tasks in the calling process.
+        initializer (Callable): sets up the data shared by the tasks.
+        initargs (tuple): the arguments of the initializer.
+        preload (str): the module that defines the tasks.
+
+    Returns:
+        Executor: the executor.
+
+    """
+    if max_workers == 1:
+        return InlineExecutor(initializer, initargs)
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([preload])
+    return ProcessPoolExecutor(
+        max_workers,
+        mp_context=context,
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+class SharedArray:
+    """A numpy array in shared memory that worker processes can attach to.
+
+    The creating process owns the memory and frees it when the array is closed.
+    Workers attach with `SharedArray.attach(shared.spec)`, which maps the same
+    memory without copying the data.
+    """
+
+    def __init__(self, array: np.ndarray) -> None:
+        """Copy an array into a new block of shared memory."""
+        self._memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.array = np.ndarray(array.shape, array.dtype, buffer=self._memory.buf)
+        self.array[...] = array
+        self.spec = (self._memory.name, array.shape, array.dtype.str)
+
+    def __enter__(self) -> Self:
+        """Return the shared array.
+
+        Returns:
+            SharedArray: the shared array.
+
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Free the shared memory."""
+        self.close()
+
+    def close(self) -> None:
+        """Free the shared memory."""
+        del self.array
+        self._memory.close()
+        self._memory.unlink()
+
+    @staticmethod
+    def attach(
+        spec: tuple[str, tuple[int, ...], str],
+    ) -> tuple[SharedMemory, np.ndarray]:
+        """Map a shared array created by another process.
+
+        The memory must be kept referenced for as long as the array is used.
+
+        Returns:
+            tuple[SharedMemory, np.ndarray]: the shared memory and the array.
+
+        """
+        name, shape, dtype = spec
+        memory = SharedMemory(name, track=False)
+        return memory, np.ndarray(shape, np.dtype(dtype), buffer=memory.buf)
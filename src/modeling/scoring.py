@@ -0,0 +1,337 @@
+"""Export fitted models and score raw survey rows with NumPy alone.
+
+`export_model` writes a fitted binary or ordinal logit model to a JSON file
+with its coefficients, thresholds and predictor order, and with the encodings
+`clean_data` applies to every raw column a predictor is derived from. A
+`Scorer` loads that file and turns raw survey rows, as in the raw CSV, into
+class probabilities. Scoring needs only NumPy and the standard library, so it
+starts without importing pandas or statsmodels and does not refit the model.
+
+Raw files are read in chunks of lines; every chunk is split into columns,
+encoded with lookup tables and scored with vectorized array operations.
+
+Copyright (C) 2025.
+"""
+
+import csv
+import json
+from collections.abc import Iterator, Mapping, Sequence
+from itertools import islice
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+
+FORMAT_VERSION = 1
+CHUNKSIZE = 100_000
+MODEL_DIR = "results/models"
+
+
+def _predictor_sources() -> dict[str, dict[str, Any]]:
+    """Describe how every cleaned column is derived from the raw columns.
+
+    Returns:
+        dict[str, dict[str, Any]]: the raw column of every cleaned column, with
+            the encoding of categorical columns or the level of a dummy.
+
+    """
+    from src.data_preparation.prepare_data import (  # noqa: PLC0415
+        CATEGORICAL_ENCODINGS,
+        MTRANS_CATEGORIES,
+        RAW_NUMERIC_COLUMNS,
+    )
+
+    sources: dict[str, dict[str, Any]] = {
+        column: {"column": column} for column in RAW_NUMERIC_COLUMNS
+    }
+    for column, encoding in CATEGORICAL_ENCODINGS.items():
+        sources[column] = {"column": column, "encoding": encoding}
+    for category in MTRANS_CATEGORIES:
+        sources[f"MTRANS_{category}"] = {"column": "MTRANS", "equals": category}
+
+    return sources
+
+
+def model_spec(result: Any) -> dict[str, Any]:  # noqa: ANN401
+    """Describe a fitted statsmodels logit or ordinal logit model.
+
+    Args:
+        result: the results of `run_binary_logistic_regression` or of
+            `run_ordinal_logistic_regression`.
+
+    Raises:
+        ValueError: if a predictor cannot be derived from the raw columns.
+
+    Returns:
+        dict[str, Any]: the model in the export format.
+
+    """
+    from src.data_preparation.prepare_data import (  # noqa: PLC0415
+        OBESITY_LEVEL_ENCODING,
+    )
+    from src.modeling.ordinal_newton import thresholds_from_params  # noqa: PLC0415
+
+    params = result.params
+    if hasattr(result.model, "k_levels"):
+        n_beta = len(params) - (result.model.k_levels - 1)
+        levels = sorted(OBESITY_LEVEL_ENCODING, key=OBESITY_LEVEL_ENCODING.get)
+        spec = {
+            "kind": "ordinal",
+            "classes": levels,
+            "intercept": 0.0,
+            "thresholds": thresholds_from_params(params.iloc[n_beta:].to_numpy()),
+        }
+        coefficients = params.iloc[:n_beta]
+    else:
+        spec = {
+            "kind": "binary",
+            "classes": ["not_obese", "obese"],
+            "intercept": float(params.get("const", 0.0)),
+            "thresholds": [],
+        }
+        coefficients = params.drop("const", errors="ignore")
+
+    sources = _predictor_sources()
+    unknown = [name for name in coefficients.index if name not in sources]
+    if unknown:
+        msg = f"Predictors {unknown} cannot be derived from the raw columns"
+        raise ValueError(msg)
+
+    return {
+        "format_version": FORMAT_VERSION,
+        **spec,
+        "thresholds": [float(c) for c in spec["thresholds"]],
+        "predictors": [
+            {"name": name, **sources[name], "coefficient": float(value)}
+            for name, value in coefficients.items()
+        ],
+    }
+
+
+def export_model(result: Any, path: str | Path) -> None:  # noqa: ANN401
+    """Write a fitted model to a JSON file that a `Scorer` can load."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with Path(path).open("w") as f:
+        json.dump(model_spec(result), f, indent=2)
+
+
+def _expit(x: np.ndarray) -> np.ndarray:
+    """Compute the logistic function without overflow.
+
+    Returns:
+        np.ndarray: 1 / (1 + exp(-x)).
+
+    """
+    z = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1 / (1 + z), z / (1 + z))
+
+
+def _split_fields(lines: list[str], delimiter: str, n_columns: int) -> list[str]:
+    """Split lines of a delimited file into one flat list of fields.
+
+    Lines without quotes are split with `str.split`, which is much faster than
+    the `csv` module; chunks that contain quotes or blank lines are parsed with
+    `csv`.
+
+    Raises:
+        ValueError: if a row does not have as many fields as the header.
+
+    Returns:
+        list[str]: the fields of all lines, row by row.
+
+    """
+    text = "".join(lines)
+    if '"' not in text:
+        fields = text.replace("\r\n", "\n").rstrip("\n").replace("\n", delimiter)
+        flat = fields.split(delimiter)
+        if len(flat) == len(lines) * n_columns:
+            return flat
+
+    rows = [row for row in csv.reader(lines, delimiter=delimiter) if row]
+    if any(len(row) != n_columns for row in rows):
+        msg = f"Rows do not all have the {n_columns} columns of the header"
+        raise ValueError(msg)
+
+    return [field for row in rows for field in row]
+
+
+class Scorer:
+    """Predict class probabilities of an exported model from raw survey rows."""
+
+    def __init__(self, spec: Mapping[str, Any]) -> None:
+        """Set up scoring for a model in the export format.
+
+        Raises:
+            ValueError: if the model was exported in another format version.
+
+        """
+        if spec.get("format_version") != FORMAT_VERSION:
+            msg = f"Unsupported model format version {spec.get('format_version')!r}"
+            raise ValueError(msg)
+
+        self.kind: str = spec["kind"]
+        self.classes: list[str] = list(spec["classes"])
+        self.predictors: list[dict[str, Any]] = list(spec["predictors"])
+        self.coefficients = np.array([p["coefficient"] for p in self.predictors])
+        self.intercept = float(spec["intercept"])
+        self.thresholds = np.array(spec["thresholds"], dtype=np.float64)
+        self.columns = sorted({p["column"] for p in self.predictors})
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Load a model written by `export_model`.
+
+        Returns:
+            Scorer: the scorer of the model.
+
+        """
+        with Path(path).open() as f:
+            return cls(json.load(f))
+
+    def design_matrix(self, columns: Mapping[str, Sequence]) -> np.ndarray:
+        """Encode raw columns into the predictors of the model.
+
+        Args:
+            columns (Mapping[str, Sequence]): the raw values of every column;
+                categorical values as strings, numeric values as numbers or
+                strings.
+
+        Raises:
+            ValueError: if a categorical column contains a value that has no
+                encoding.
+
+        Returns:
+            np.ndarray: the (rows x predictors) design matrix.
+
+        """
+        n_rows = len(next(iter(columns.values())))
+        x = np.empty((n_rows, len(self.predictors)))
+        for j, predictor in enumerate(self.predictors):
+            values = columns[predictor["column"]]
+            if "encoding" in predictor:
+                encoding = predictor["encoding"]
+                try:
+                    x[:, j] = np.fromiter(map(encoding.__getitem__, values), float)
+                except KeyError as e:
+                    msg = f"Column {predictor['column']!r} has unknown value {e}"
+                    raise ValueError(msg) from None
+            elif "equals" in predictor:
+                x[:, j] = np.fromiter(map(predictor["equals"].__eq__, values), bool)
+            else:
+                x[:, j] = np.asarray(values, dtype=np.float64)
+
+        return x
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        """Predict the probability of every class from the design matrix.
+
+        Returns:
+            np.ndarray: the (rows x classes) probabilities.
+
+        """
+        eta = x @ self.coefficients + self.intercept
+        if self.kind == "binary":
+            prob = _expit(eta)
+            return np.column_stack((1 - prob, prob))
+
+        cdf = _expit(self.thresholds[None, :] - eta[:, None])
+        ones = np.ones((len(eta), 1))
+        return np.diff(np.hstack((0 * ones, cdf, ones)), axis=1)
+
+    def score(self, columns: Mapping[str, Sequence]) -> np.ndarray:
+        """Predict the probability of every class from raw columns.
+
+        Returns:
+            np.ndarray: the (rows x classes) probabilities.
+
+        """
+        return self.predict_proba(self.design_matrix(columns))
+
+    def score_csv(
+        self,
+        path: str | Path,
+        chunksize: int = CHUNKSIZE,
+        delimiter: str = ",",
+    ) -> Iterator[np.ndarray]:
+        """Score a file of raw survey rows in chunks.
+
+        Yields:
+            np.ndarray: the (rows x classes) probabilities of every chunk.
+
+        """
+        with Path(path).open(newline="") as f:
+            header = next(csv.reader(f, delimiter=delimiter))
+            positions = [header.index(column) for column in self.columns]
+            while lines := list(islice(f, chunksize)):
+                fields = _split_fields(lines, delimiter, len(header))
+                yield self.score(
+                    {
+                        column: fields[position :: len(header)]
+                        for column, position in zip(
+                            self.columns,
+                            positions,
+                            strict=True,
+                        )
+                    },
+                )
+
+    def score_file(
+        self,
+        path: str | Path,
+        out_path: str | Path,
+        chunksize: int = CHUNKSIZE,
+    ) -> int:
+        """Score a file of raw survey rows and write the probabilities as CSV.
+
+        Returns:
+            int: the number of rows scored.
+
+        """
+        n_rows = 0
+        with Path(out_path).open("w", newline="") as f:
+            f.write(",".join(self.classes) + "\n")
+            for prob in self.score_csv(path, chunksize):
+                np.savetxt(f, prob, delimiter=",", fmt="%.6g")
+                n_rows += len(prob)
+
+        return n_rows
+
+
+def export_models(model_dir: str | Path = MODEL_DIR) -> dict[str, Path]:
+    """Fit the binary and ordinal models on the cleaned data and export them.
+
+    Returns:
+        dict[str, Path]: the file of every exported model.
+
+    """
+    from src.data_preparation.prepare_data import load_cleaned_data  # noqa: PLC0415
+    from src.modeling import (  # noqa: PLC0415
+        binary_logistic_regression,
+        ordinal_logistic_regression,
+    )
+
+    df = load_cleaned_data()
+    results = {
+        "binary": binary_logistic_regression.run_binary_logistic_regression(
+            *binary_logistic_regression.prepare_for_binary_regression(df),
+        ),
+        "ordinal": ordinal_logistic_regression.run_ordinal_logistic_regression(
+            *ordinal_logistic_regression.prepare_for_ordinal_regression(df),
+        ),
+    }
+
+    paths = {}
+    for name, result in results.items():
+        paths[name] = Path(model_dir) / f"{name}_model.json"
+        export_model(result, paths[name])
+
+    return paths
+
+
+def main() -> None:
+    """Fit the binary and ordinal models and export them."""
+    export_models()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""Run the complete analysis as a dependency graph of stages in one process.
+
+Every stage runs the `main` function of one of the analysis modules and
+declares the files it reads and writes. A stage depends on the stages that
+write its inputs, and stages that do not depend on each other run concurrently
+on a pool of worker threads. Stages that declare the same resource are never
+run at the same time. Figures are drawn without the global state of pyplot, so
+the stages that draw them run concurrently as well.
+
+A stage is skipped when its inputs and code are unchanged since its last
+successful run and all of its outputs still exist.
+
+Every run writes a trace of the time and memory spent in every stage, and in
+the instrumented functions they call, to `results/traces`, where the traces of
+the last `MAX_TRACES` runs are kept.
+
+Copyright (C) 2025.
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import logging
+import threading
+from collections.abc import Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+
+from src.data_preparation.columnar_cache import fingerprint_file
+from src.data_preparation.prepare_data import (
+    CACHE_DIR,
+    CLEANED_DATA_PATH,
+    RAW_DATA_PATH,
+)
+from src.instrumentation import TRACER, span
+
+logger = logging.getLogger(__name__)
+
+STATE_PATH = "results/.pipeline_state.json"
+CACHE_MANIFEST_PATH = f"{CACHE_DIR}/manifest.json"
+
+# Number of runs whose traces are kept in the trace directory
+MAX_TRACES = 20
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A step of the analysis pipeline."""
+
+    name: str
+    module: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    resources: frozenset[str] = field(default_factory=frozenset)
+
+
+CLEANED_DATA = (CLEANED_DATA_PATH, CACHE_MANIFEST_PATH)
+
+STAGES = (
+    Stage(
+        "prepare_data",
+        "src.data_preparation.prepare_data",
+        inputs=(RAW_DATA_PATH,),
+        outputs=CLEANED_DATA,
+    ),
+    Stage(
+        "cube",
+        "src.exploratory_analysis.cube",
+        inputs=CLEANED_DATA,
+        outputs=("results/cube_summary.log",),
+    ),
+    Stage(
+        "family_history",
+        "src.exploratory_analysis.family_history",
+        inputs=CLEANED_DATA,
+        outputs=("results/family_history_vs_obesity.png",),
+    ),
+    Stage(
+        "lifestyle",
+        "src.exploratory_analysis.lifestyle",
+        inputs=CLEANED_DATA,
+        outputs=tuple(
+            f"results/lifestyle_{var}.png"
+            for var in ["FAF", "FCVC", "TUE", "CALC", "CH2O"]
+        ),
+    ),
+    Stage(
+        "contingency_heatmap",
+        "src.exploratory_analysis.contingency_heatmap",
+        inputs=CLEANED_DATA,
+        outputs=("results/contingency.png", "results/heatmap.png"),
+    ),
+    Stage(
+        "chi_square",
+        "src.modeling.chi_square",
+        inputs=CLEANED_DATA,
+        outputs=("results/chi_square_summary.log",),
+    ),
+    Stage(
+        "association_matrix",
+        "src.modeling.association_matrix",
+        inputs=CLEANED_DATA,
+        outputs=("results/association_matrix_summary.log",),
+    ),
+    Stage(
+        "nonparametric",
+        "src.modeling.nonparametric",
+        inputs=CLEANED_DATA,
+        outputs=("results/nonparametric_tests_summary.log",),
+    ),
+    Stage(
+        "binary_logistic_regression",
+        "src.modeling.binary_logistic_regression",
+        inputs=CLEANED_DATA,
+        outputs=("results/binary_logistic_regression_summary.txt",),
+    ),
+    Stage(
+        "export_models",
+        "src.modeling.scoring",
+        inputs=CLEANED_DATA,
+        outputs=(
+            "results/models/binary_model.json",
+            "results/models/ordinal_model.json",
+        ),
+    ),
+    Stage(
+        "cross_validation",
+        "src.modeling.cross_validation",
+        inputs=CLEANED_DATA,
+        outputs=("results/cross_validation_summary.log",),
+    ),
+    Stage(
+        "compare_hereditary_lifestyle",
+        "src.modeling.compare_hereditary_lifestyle",
+        inputs=CLEANED_DATA,
+        outputs=("results/hereditary_vs_lifestyle_summary.log",),
+    ),
+    Stage(
+        "interaction_model",
+        "src.modeling.interaction_model",
+        inputs=CLEANED_DATA,
+        outputs=("results/interaction_model_summary.log",),
+    ),
+    Stage(
+        "interaction_screen",
+        "src.modeling.interaction_screen",
+        inputs=CLEANED_DATA,
+        outputs=("results/interaction_screen_summary.log",),
+    ),
+)
+
+
+def dependencies(stages: Iterable[Stage]) -> dict[str, set[str]]:
+    """Find the stages that write the inputs of every stage.
+
+    Raises:
+        ValueError: if two stages write the same file.
+
+    Returns:
+        dict[str, set[str]]: the names of the stages every stage depends on.
+
+    """
+    stages = list(stages)
+    producers: dict[str, str] = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                msg = f"{output} is written by {producers[output]} and {stage.name}"
+                raise ValueError(msg)
+            producers[output] = stage.name
+
+    return {
+        stage.name: {producers[i] for i in stage.inputs if i in producers}
+        for stage in stages
+    }
+
+
+def _imported_modules(path: str) -> set[str]:
+    """Find the project modules a source file imports, also inside functions.
+
+    Returns:
+        set[str]: the names of the imported `src.` modules and of the names
+            imported from them, which may be submodules.
+
+    """
+    tree = ast.parse(Path(path).read_text(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+
+    return {name for name in names if name.startswith("src.")}
+
+
+def _module_file(name: str) -> str | None:
+    """Find the source file of a module without importing it.
+
+    Returns:
+        str | None: the path of the source file, or None if `name` is not a
+            module, e.g. a function imported from a module.
+
+    """
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+
+    origin = None if spec is None else spec.origin
+    return origin if origin is not None and origin.endswith(".py") else None
+
+
+def _code_files(module: ModuleType) -> set[str]:
+    """Find the source files of a stage module and the project modules it uses.
+
+    Imports are followed transitively, including the imports inside functions,
+    so a change to any project module the stage may run invalidates it.
+
+    Returns:
+        set[str]: the paths of the source files.
+
+    """
+    files = {str(module.__file__)}
+    pending = list(files)
+    while pending:
+        for name in _imported_modules(pending.pop()):
+            source = _module_file(name)
+            if source is not None and source not in files:
+                files.add(source)
+                pending.append(source)
+
+    return files
+
+
+class FingerprintCache:
+    """Fingerprints of files, recomputed only when a file's size or time changes."""
+
+    def __init__(self, known: dict[str, dict] | None = None) -> None:
+        """Start from previously computed fingerprints."""
+        self.known = dict(known or {})
+        self._lock = threading.Lock()
+
+    def __call__(self, path: str) -> str | None:
+        """Fingerprint a file.
+
+        Returns:
+            str | None: the fingerprint, or None if the file does not exist.
+
+        """
+        if not Path(path).exists():
+            return None
+
+        stat = Path(path).stat()
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            entry = self.known.get(path)
+        if entry is None or entry["stat"] != key:
+            entry = {"stat": key, "sha256": fingerprint_file(path)}
+            with self._lock:
+                self.known[path] = entry
+
+        return entry["sha256"]
+
+
+class Pipeline:
+    """Run the stages of the analysis in dependency order."""
+
+    def __init__(
+        self,
+        stages: Iterable[Stage] = STAGES,
+        state_path: str | Path = STATE_PATH,
+        max_workers: int = 4,
+    ) -> None:
+        """Set up a pipeline of stages."""
+        self.stages = {stage.name: stage for stage in stages}
+        self.dependencies = dependencies(self.stages.values())
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self._resource_locks: dict[str, threading.Lock] = {}
+        self._state_lock = threading.Lock()
+
+        state = {}
+        if self.state_path.exists():
+            with self.state_path.open() as f:
+                state = json.load(f)
+        self.signatures: dict[str, str] = state.get("signatures", {})
+        self.fingerprint = FingerprintCache(state.get("files"))
+
+    def signature(self, stage: Stage) -> str:
+        """Combine the fingerprints of the inputs and code of a stage.
+
+        Returns:
+            str: the signature of the stage.
+
+        """
+        module = importlib.import_module(stage.module)
+        digest = hashlib.sha256()
+        for path in [*stage.inputs, *sorted(_code_files(module))]:
+            digest.update(f"{path}={self.fingerprint(path)}\n".encode())
+
+        return digest.hexdigest()
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        """Check whether a stage can be skipped.
+
+        Returns:
+            bool: True if the stage's inputs and code are unchanged since its last
+                successful run and all of its outputs exist.
+
+        """
+        return self.signatures.get(stage.name) == self.signature(stage) and all(
+            Path(output).exists() for output in stage.outputs
+        )
+
+    def run_stage(self, stage: Stage, *, force: bool = False) -> bool:
+        """Run a single stage unless it is up to date.
+
+        Returns:
+            bool: True if the stage was run, False if it was skipped.
+
+        """
+        if not force and self.is_up_to_date(stage):
+            logger.info("Skipping %s (up to date)", stage.name)
+            return False
+
+        locks = [self._resource_locks[r] for r in sorted(stage.resources)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            logger.info("Running %s", stage.name)
+            for output in stage.outputs:
+                Path(output).parent.mkdir(parents=True, exist_ok=True)
+            with span(stage.name):
+                importlib.import_module(stage.module).main()
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        self.signatures[stage.name] = self.signature(stage)
+        self.save_state()
+        return True
+
+    def save_state(self) -> None:
+        """Write the signatures of the successful stages to the state file."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._state_lock:
+            state = {"signatures": self.signatures, "files": self.fingerprint.known}
+            with self.state_path.open("w") as f:
+                json.dump(state, f, indent=2)
+
+    def run(self, *, force: bool = False) -> dict[str, str]:
+        """Run all stages, running independent stages concurrently.
+
+        A stage whose dependencies failed is not run.
+
+        Raises:
+            ValueError: if the stages have circular dependencies.
+
+        Returns:
+            dict[str, str]: the status of every stage: "ran", "skipped",
+                "failed" or "blocked".
+
+        """
+        for stage in self.stages.values():
+            for resource in stage.resources:
+                self._resource_locks.setdefault(resource, threading.Lock())
+
+        status: dict[str, str] = {}
+        pending = dict(self.dependencies)
+        running: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                self._submit_ready(executor, pending, running, status, force=force)
+                if not running:
+                    if pending:
+                        msg = f"Circular dependencies between {sorted(pending)}"
+                        raise ValueError(msg)
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    status[name] = _stage_status(name, future)
+
+        return status
+
+    def _submit_ready(
+        self,
+        executor: ThreadPoolExecutor,
+        pending: dict[str, set[str]],
+        running: dict[Future, str],
+        status: dict[str, str],
+        *,
+        force: bool,
+    ) -> None:
+        """Submit the pending stages whose dependencies have all finished.
+
+        A pending stage whose dependencies failed is marked as blocked instead.
+        """
+        for name, deps in list(pending.items()):
+            if any(status.get(d) in {"failed", "blocked"} for d in deps):
+                status[name] = "blocked"
+                del pending[name]
+            elif all(d in status for d in deps):
+                future = executor.submit(self.run_stage, self.stages[name], force=force)
+                running[future] = name
+                del pending[name]
+
+
+def _stage_status(name: str, future: Future) -> str:
+    """Get the status of a finished stage.
+
+    Returns:
+        str: "failed" if the stage raised, "ran" if it was run and "skipped" if
+            it was up to date.
+
+    """
+    if future.exception() is not None:
+        logger.error("Stage %s failed", name, exc_info=future.exception())
+        return "failed"
+
+    return "ran" if future.result() else "skipped"
+
+
+def write_traces(*, flamegraph: bool = False, keep: int = MAX_TRACES) -> Path:
+    """Write the trace of this run and remove the traces of older runs.
+
+    The traces of the `keep` most recent runs are kept.
+
+    Returns:
+        Path: the path of the JSON trace.
+
+    """
+    path = TRACER.default_path(".json")
+    TRACER.write_trace(path)
+    if flamegraph:
+        TRACER.write_folded(TRACER.default_path(".folded"))
+
+    # Trace names start with the start time of their run, so they sort by age
+    runs = sorted({trace.stem for trace in path.parent.glob("*.json")})
+    for stem in runs[:-keep]:
+        for old in path.parent.glob(f"{stem}.*"):
+            old.unlink(missing_ok=True)
+
+    return path
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the analysis pipeline.
+
+    Raises:
+        SystemExit: if a stage failed.
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="run every stage, even if it is up to date",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="number of stages to run concurrently (default: 4)",
+    )
+    parser.add_argument(
+        "--flamegraph",
+        action="store_true",
+        help="also write the trace as folded stacks for flame graph tools",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Stages draw from worker threads, which requires a non-interactive backend
+    import matplotlib as mpl  # noqa: PLC0415
+
+    mpl.use("Agg")
+
+    status = Pipeline(max_workers=args.workers).run(force=args.force)
+    logger.info("Wrote the trace to %s", write_traces(flamegraph=args.flamegraph))
+    if any(s in {"failed", "blocked"} for s in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
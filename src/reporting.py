@@ -0,0 +1,26 @@
+"""Helpers for writing analysis reports to the results directory.
+
+Copyright (C) 2025.
+"""
+
+import logging
+from pathlib import Path
+
+
+def log_to_file(logger: logging.Logger, filename: str | Path) -> None:
+    """Send the messages of a logger to a file, replacing its previous file.
+
+    Unlike `logging.basicConfig`, this only configures the given logger, so
+    several analyses can write their own log files from within one process.
+    """
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.FileHandler):
+            logger.removeHandler(handler)
+            handler.close()
+
+    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.FileHandler(filename, mode="w")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
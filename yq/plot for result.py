@@ -1,4 +1,5 @@
 import matplotlib.pyplot as plt
+from pathlib import Path
 import pandas as pd
 data= {"variable": ["Family history","SMOKE","FAVC","CAEC"],"coef": [1.3358,-0.9382,0.7846,-1.1108],"ci_lower": [1.042,-1.667,0.437,-1.340],"ci_upper": [1.629,-0.209,1.132,-0.881]}
 df=pd.DataFrame(data)
@@ -11,4 +12,7 @@ plt.gca().invert_yaxis()
 plt.xlabel("Log-odds (β)")
 plt.title("Logistic Regression Coefficient Plot")
 plt.tight_layout()
-plt.show()
+figures= Path(__file__).parent / "figures"
+figures.mkdir(exist_ok=True)
+plt.savefig(figures / "coefficient_plot.png",dpi=300)
+plt.close()